@@ -0,0 +1,121 @@
+# api/analytics.py
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse
+from fastapi.middleware.cors import CORSMiddleware
+from typing import Optional
+import os, sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import zones, wbal, intervals, gps, decimate, telemetry
+from utils.settings import get_ftp, get_hr_max
+
+app = FastAPI()
+telemetry.install(app)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+@app.get("/api/analytics/zones")
+def zone_rollups(
+    kind: str = Query("power", pattern="^(power|hr)$"),
+    period: str = Query("week", pattern="^(week|month)$"),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    ftp: Optional[float] = Query(None, gt=0),
+    hr_max: Optional[int] = Query(None, gt=0),
+):
+    """Time in zone (seconds) per week or month, from stored rollups."""
+    threshold = (ftp or get_ftp()) if kind == "power" else (hr_max or get_hr_max())
+    try:
+        rows = zones.rollups(kind, threshold, period, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse({
+        "kind": kind,
+        "period": period,
+        "threshold": threshold,
+        "zones": zones.labels(kind),
+        "edges": zones.zone_edges(kind, threshold).round(1).tolist(),
+        "periods": rows,
+    })
+
+
+@app.get("/api/analytics/cp")
+def critical_power(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    type: Optional[str] = None,
+):
+    """CP / W′ fitted to the best efforts of rides dated in [start, end]."""
+    fit = wbal.fit_window(start, end, [t for t in type.split(",") if t] if type else None)
+    if fit is None:
+        raise HTTPException(status_code=404, detail="Not enough 2–20 min efforts in this window")
+    return JSONResponse(fit)
+
+
+@app.get("/api/analytics/wbal/{ride_id}")
+def ride_wbal(
+    ride_id: str,
+    cp: Optional[float] = Query(None, gt=0),
+    w_prime: Optional[float] = Query(None, gt=0),
+    model: str = Query("differential", pattern="^(differential|integral)$"),
+    points: int = Query(1000, ge=10, le=20000),
+):
+    """W′ balance for one ride (min/max-decimated to about ``points``); CP / W′ default to the
+    fit over the 90 days up to the ride."""
+    try:
+        result = wbal.stored_ride_wbal(ride_id, cp, w_prime, model)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Ride not found")
+    t, balance = decimate.decimate(result.pop("time"), result.pop("wbal"), points, "minmax")
+    result.update(time=t.tolist(), wbal=np.round(balance, 1).tolist())
+    return JSONResponse(result)
+
+
+@app.get("/api/analytics/intervals")
+def search_intervals(
+    kind: str = Query("effort", pattern="^(effort|peak)$"),
+    min_duration: Optional[int] = Query(None, ge=0),
+    max_duration: Optional[int] = Query(None, ge=0),
+    min_power: Optional[float] = None,
+    max_power: Optional[float] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    order: str = Query("avg_power", pattern="^(avg_power|np_power|duration_s|date)$"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Detected efforts or peak windows across the library, e.g. every 5-min peak above 300 W this year."""
+    rows = intervals.search(kind, min_duration, max_duration, min_power, max_power, start, end, order, limit)
+    return JSONResponse({"kind": kind, "intervals": rows})
+
+
+@app.get("/api/analytics/intervals/{ride_id}")
+def ride_intervals(ride_id: str, kind: Optional[str] = Query(None, pattern="^(effort|peak)$")):
+    """One ride's stored efforts and peak windows, by start time."""
+    return JSONResponse({"ride_id": ride_id, "intervals": intervals.for_ride(ride_id, kind)})
+
+
+@app.get("/api/analytics/area")
+def rides_through_area(
+    bbox: str = Query(..., description="west,south,east,north in degrees"),
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    exact: bool = True,
+    limit: Optional[int] = Query(None, ge=1),
+):
+    """Rides whose GPS track passes through the box (``exact=false``: whose bounding box overlaps it)."""
+    try:
+        west, south, east, north = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be west,south,east,north")
+    if south > north or west > east:
+        raise HTTPException(status_code=400, detail="bbox must be west,south,east,north")
+    rides = gps.rides_through(south, north, west, east, start, end, exact, limit)
+    return JSONResponse({"bbox": [west, south, east, north], "rides": rides})
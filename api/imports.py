@@ -0,0 +1,50 @@
+# api/imports.py
+from typing import List
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from fastapi.middleware.cors import CORSMiddleware
+import os, sys, shutil, tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import bulk_import, telemetry
+
+app = FastAPI()
+telemetry.install(app)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+@app.post("/api/imports")
+def start_import(files: List[UploadFile] = File(...)):
+    """Import uploaded rides (.fit, .fit.gz, .json, or one ZIP export) in the background; poll the job."""
+    names = [os.path.basename(f.filename or "") for f in files]
+    zips = [n for n in names if n.lower().endswith(".zip")]
+    if zips and len(files) > 1:
+        raise HTTPException(status_code=400, detail="Upload one ZIP export or any number of ride files")
+    if not zips and not any(n.lower().endswith(bulk_import.SUPPORTED) for n in names):
+        raise HTTPException(status_code=400, detail=f"No supported files ({', '.join(bulk_import.SUPPORTED)})")
+
+    uploads = os.path.join(bulk_import.IMPORT_DIR, "uploads")
+    os.makedirs(uploads, exist_ok=True)
+    target = tempfile.mkdtemp(dir=uploads)
+    for f, name in zip(files, names):
+        with open(os.path.join(target, name), "wb") as out:
+            shutil.copyfileobj(f.file, out)
+    source = os.path.join(target, zips[0]) if zips else target
+    job = bulk_import.start_import(source, cleanup=target)
+    return JSONResponse(job, status_code=202)
+
+
+@app.get("/api/imports/{job_id}")
+def import_status(job_id: str):
+    """Progress (total / done / imported / skipped / failed) and per-file errors of an import job."""
+    try:
+        return JSONResponse(bulk_import.load_status(job_id))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown import job")
@@ -0,0 +1,15 @@
+# api/metrics.py
+from fastapi import FastAPI
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import telemetry
+
+app = FastAPI()
+telemetry.install(app)
+
+
+@app.get("/api/metrics")
+def metrics():
+    """Prometheus text exposition of every process's timers and counters."""
+    return telemetry.metrics_response()
@@ -1,11 +1,19 @@
 # api/report.py
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from vercel_python_runtime import Vercel
-import os
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import ride_store
+from utils.report_jobs import get_queue
+from utils.batch_reports import select_rides, iter_batch_zip
+from utils import telemetry
 
 app = FastAPI()
+telemetry.install(app)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,15 +25,48 @@ app.add_middleware(
 
 @app.post("/api/report/generate/{filename}")
 def generate_report(filename: str):
-    """Placeholder: generate a simple PDF or dummy file."""
-    path = os.path.join("ride_data/raw", filename)
-    if not os.path.exists(path):
+    """Queue a PDF report; poll the returned job until it is done, then download it."""
+    if not ride_store.ride_exists(filename):
         raise HTTPException(status_code=404, detail="Ride not found")
 
-    output_path = f"/tmp/{filename}_report.txt"
-    with open(output_path, "w") as f:
-        f.write(f"Report for {filename}\nGenerated successfully on Vercel.")
+    job = get_queue().submit(filename)
+    return JSONResponse(job, status_code=200 if job["state"] == "done" else 202)
+
+
+@app.get("/api/report/jobs/{job_id}")
+def report_status(job_id: str):
+    """Job state: queued / running / done / failed."""
+    try:
+        return JSONResponse(get_queue().status(job_id))
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown report job")
+
+
+@app.get("/api/report/jobs/{job_id}/download")
+def download_report(job_id: str):
+    """The finished PDF (409 while the job is still rendering)."""
+    queue = get_queue()
+    try:
+        path = queue.result_path(job_id)
+        ride_id = queue.status(job_id)["ride_id"]
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown report job")
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return FileResponse(path, media_type="application/pdf", filename=f"{ride_id}_report.pdf")
+
+
+@app.get("/api/report/batch")
+def batch_report(start: Optional[str] = None, end: Optional[str] = None,
+                 type: Optional[str] = None, ids: Optional[str] = Query(None, description="Comma-separated ride ids")):
+    """ZIP of a season summary plus one PDF per selected ride, streamed as reports finish."""
+    ride_ids = [ride_store.ride_id_from_name(i) for i in ids.split(",") if i] if ids else None
+    types = type.split(",") if type else None
+    if not select_rides(ride_ids, start, end, types):
+        raise HTTPException(status_code=404, detail="No rides match the selection")
 
-    return FileResponse(output_path, media_type="text/plain", filename="report.txt")
+    name = "_".join(p for p in ("rides", start, end) if p) + ".zip"
+    return StreamingResponse(iter_batch_zip(ride_ids, start, end, types), media_type="application/zip",
+                             headers={"Content-Disposition": f'attachment; filename="{name}"'})
 
 handler = Vercel(app)
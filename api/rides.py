@@ -1,10 +1,17 @@
 # api/rides.py
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-import os, json
+import os, sys, hashlib
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import ride_store, catalog, decimate, gps, wire, telemetry
 
 app = FastAPI()
+telemetry.install(app)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,39 +21,86 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+_DEMO_RIDES = [
+    {"ride_id": f"demo_ride_00{i}", "name": f"Demo Ride {i}", "date": None, "type": "Ride"}
+    for i in (1, 2, 3)
+]
+
+
+def _csv(value: str):
+    return [v for v in value.split(",") if v] if value else None
+
+
 @app.get("/api/rides")
-def list_rides():
-    """List available rides, with demo fallback for Vercel."""
-    rides_dir = "ride_data/raw"
-
-    if os.path.exists(rides_dir):
-        rides = [
-            f for f in os.listdir(rides_dir)
-            if f.endswith((".fit", ".csv", ".json"))
-        ]
-    else:
+def list_rides(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    sort: str = "date",
+    order: str = "desc",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    type: Optional[str] = None,
+    min_distance: Optional[float] = None,
+    max_distance: Optional[float] = None,
+    min_tss: Optional[float] = None,
+    max_tss: Optional[float] = None,
+):
+    """Paginated ride summaries from the catalog, with demo fallback for Vercel.
+
+    Responses carry ETag / Last-Modified derived from the catalog's last
+    change, so an unchanged listing revalidates as 304 Not Modified.
+    """
+    changed = catalog.changed_at()
+    etag = '"' + hashlib.sha1(f"{changed!r}|{request.url.query}".encode()).hexdigest()[:20] + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if changed:
+        headers["Last-Modified"] = formatdate(changed, usegmt=True)
+
+    inm = request.headers.get("if-none-match")
+    ims = request.headers.get("if-modified-since")
+    if inm is not None:
+        if etag in [t.strip() for t in inm.split(",")] or inm.strip() == "*":
+            return Response(status_code=304, headers=headers)
+    elif ims and changed:
+        try:
+            if int(changed) <= parsedate_to_datetime(ims).timestamp():
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    try:
+        page = catalog.page_rides(
+            sort=sort, desc=order.lower() != "asc", limit=limit, cursor=cursor,
+            start=start, end=end, types=_csv(type),
+            min_distance=min_distance, max_distance=max_distance, min_tss=min_tss, max_tss=max_tss,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filtered = any(v is not None for v in (start, end, type, min_distance, max_distance, min_tss, max_tss))
+    if not page["total"] and not filtered:
         # ✅ fallback demo rides so frontend isn’t empty
-        rides = [
-            "demo_ride_001.json",
-            "demo_ride_002.json",
-            "demo_ride_003.json"
-        ]
+        page = {"rides": _DEMO_RIDES, "next_cursor": None, "total": len(_DEMO_RIDES)}
 
-    return JSONResponse({"rides": rides})
+    return JSONResponse(page, headers=headers)
 
 
-@app.get("/api/rides/{filename}")
-def get_ride(filename: str):
-    """Return file data or demo JSON if not found."""
-    path = os.path.join("ride_data/raw", filename)
+def _negotiated(request: Request, doc: dict) -> Response:
+    """Binary (application/x-ride-streams) or JSON, compressed per Accept-Encoding."""
+    body, headers = wire.render(doc, request.headers.get("accept", ""), request.headers.get("accept-encoding", ""))
+    return Response(content=body, headers=headers, media_type=headers.pop("Content-Type"))
+
 
-    if os.path.exists(path):
+@app.get("/api/rides/{filename}")
+def get_ride(filename: str, request: Request):
+    """Return ride data or demo JSON if not found."""
+    if ride_store.ride_exists(filename):
         try:
-            with open(path) as f:
-                data = json.load(f)
+            data = ride_store.load_ride(filename)
         except Exception:
-            data = {"message": f"Loaded {filename} (not JSON readable)"}
-        return JSONResponse(data)
+            return JSONResponse({"message": f"Loaded {filename} (not JSON readable)"})
+        return _negotiated(request, data)
 
     # Demo data fallback for cloud deployment
     return JSONResponse({
@@ -58,3 +112,33 @@ def get_ride(filename: str):
         "normalized_power": 229,
         "note": "Demo ride data for Vercel deployment."
     })
+
+
+@app.get("/api/rides/{filename}/streams")
+def get_streams(filename: str, request: Request, keys: str = "watts,heartrate", points: int = 1000,
+                method: str = "lttb"):
+    """Chart-sized streams: each key decimated to about ``points`` samples."""
+    if not ride_store.ride_exists(filename):
+        raise HTTPException(status_code=404, detail=f"Ride not found: {filename}")
+    if method not in decimate.METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {', '.join(decimate.METHODS)}")
+
+    wanted = [k for k in keys.split(",") if k]
+    streams = decimate.ride_streams(filename, wanted, points, method)
+    meta = ride_store.load_meta(filename).get("_meta", {})
+    return _negotiated(request, {
+        "ride_id": ride_store.ride_id_from_name(filename),
+        "meta": meta,
+        "points": decimate.level_for(points),
+        "method": method,
+        "streams": {k: {"x": x.astype(np.float32), "y": y.astype(np.float32)} for k, (x, y) in streams.items()},
+    })
+
+
+@app.get("/api/rides/{filename}/track")
+def get_track(filename: str, zoom: Optional[int] = Query(None, ge=0, le=22)):
+    """Map-sized GPS track: an encoded polyline simplified for ``zoom`` (the most detailed level when omitted)."""
+    track = gps.track(filename, zoom)
+    if track is None:
+        raise HTTPException(status_code=404, detail=f"No GPS track for {filename}")
+    return JSONResponse(track)
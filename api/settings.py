@@ -0,0 +1,53 @@
+# api/settings.py
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel, Field
+from typing import Optional
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import thresholds, telemetry
+from utils.settings import get_ftp, get_hr_max, set_ftp, set_hr_max
+
+app = FastAPI()
+telemetry.install(app)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+class SettingsChange(BaseModel):
+    ftp: Optional[float] = Field(None, gt=0)
+    hr_max: Optional[int] = Field(None, gt=0)
+    since: Optional[str] = None  # ISO date the values take effect (default: today)
+
+
+def _current() -> dict:
+    history = thresholds.histories()
+    return {"ftp": get_ftp(), "hr_max": get_hr_max(),
+            "history": {kind: [list(r) for r in rows] for kind, rows in history.items()}}
+
+
+@app.get("/api/settings")
+def read_settings():
+    """FTP and HR max in effect today, plus their dated history."""
+    return JSONResponse(_current())
+
+
+@app.put("/api/settings")
+def update_settings(change: SettingsChange):
+    """Record new FTP / HR max values; stored rides are re-scored with them from ``since`` on."""
+    try:
+        if change.ftp is not None:
+            set_ftp(change.ftp, change.since)
+        if change.hr_max is not None:
+            set_hr_max(change.hr_max, change.since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse(_current())
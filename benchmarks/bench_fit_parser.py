@@ -0,0 +1,102 @@
+# ===============================================================
+# ⏱️ BENCHMARK — streaming FIT decoder vs. legacy parser
+# ===============================================================
+#
+#   python -m benchmarks.bench_fit_parser [hours ...]
+
+import io
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from fitparse import FitFile
+from benchmarks.fit_writer import write_fit
+from utils.fit_parser import parse_fit_to_json, _decode_fitparse
+
+
+def legacy_parse_fit_to_json(file):
+    """The pre-streaming implementation, kept verbatim for comparison."""
+    f=FitFile(io.BytesIO(file.read()))
+    t,p,h,s,d=[],[],[],[],[]
+    start=None
+    for r in f.get_messages('record'):
+        v={d.name:d.value for d in r}
+        if 'timestamp' in v:
+            t.append(pd.to_datetime(v['timestamp']).tz_localize(None))
+            if start is None: start=t[-1]
+        p.append(float(v.get('power',np.nan)))
+        h.append(float(v.get('heart_rate',np.nan)))
+        s.append(float(v.get('speed',np.nan)))
+        d.append(float(v.get('distance',np.nan)))
+    if not t: raise ValueError('No timestamp data.')
+    t0=pd.Series(t); time_s=(t0-t0.iloc[0]).dt.total_seconds().tolist()
+    avg_pw=np.nanmean(p); avg_hr=np.nanmean(h); dist=np.nanmax(d)
+    dur=time_s[-1] if time_s else 0
+    meta={"id":str(int(time.time())),"name":file.name.replace('.fit',''),
+          "distance_m":float(dist),"moving_time_s":float(dur),
+          "average_watts":float(avg_pw),"average_heartrate":float(avg_hr),
+          "start_date":pd.to_datetime(start).isoformat(),"type":"Ride"}
+    return {"time":{"data":time_s},"watts":{"data":p},"heartrate":{"data":h},
+            "velocity_smooth":{"data":s},"distance":{"data":d},"_meta":meta}
+
+
+def synthetic_fit(hours: float, seed: int = 0) -> bytes:
+    n = int(hours * 3600)
+    rng = np.random.default_rng(seed)
+    t = np.arange(n, dtype=float)
+    speed = np.clip(8 + rng.normal(0, 1, n).cumsum() * 0.01, 0, 20)
+    streams = {
+        "time_s": t,
+        "power": np.clip(rng.normal(200, 60, n), 0, 1500),
+        "heart_rate": np.clip(rng.normal(140, 10, n), 60, 200),
+        "cadence": np.clip(rng.normal(88, 6, n), 0, 140),
+        "speed": speed,
+        "distance": np.cumsum(speed),
+        "altitude": 200 + 50 * np.sin(t / 900),
+        "position_lat": (45.0 + t * 1e-5) / (180.0 / 2**31),
+        "position_long": (-122.0 + t * 1e-5) / (180.0 / 2**31),
+        "temperature": np.full(n, 21.0),
+    }
+    buf = io.BytesIO()
+    write_fit(buf, 1_746_000_000, streams)
+    return buf.getvalue()
+
+
+def _fileobj(data: bytes):
+    f = io.BytesIO(data)
+    f.name = "bench.fit"
+    return f
+
+
+def _run(fn, data: bytes):
+    """(output, seconds, peak traced bytes); timing and memory are measured in separate runs."""
+    t0 = time.perf_counter()
+    out = fn(_fileobj(data))
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn(_fileobj(data))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def _fitparse_only(f):
+    return _decode_fitparse(f.read())
+
+
+def main(hours_list):
+    print(f"{'hours':>5} {'records':>8} {'MB':>5} | {'legacy s':>8} {'peak MB':>7} | {'native s':>8} {'peak MB':>7} "
+          f"| {'fallback s':>10} | speedup")
+    for hours in hours_list:
+        data = synthetic_fit(hours)
+        old, t_old, m_old = _run(legacy_parse_fit_to_json, data)
+        new, t_new, m_new = _run(parse_fit_to_json, data)
+        _, t_fb, _ = _run(_fitparse_only, data)
+        assert len(old["time"]["data"]) == len(new["time"]["data"])
+        print(f"{hours:>5} {len(new['time']['data']):>8} {len(data) / 1e6:>5.1f} | {t_old:>8.2f} {m_old / 1e6:>7.1f} "
+              f"| {t_new:>8.3f} {m_new / 1e6:>7.1f} | {t_fb:>10.2f} | {t_old / t_new:>6.0f}x")
+
+
+if __name__ == "__main__":
+    main([float(h) for h in sys.argv[1:]] or [1, 3, 6])
@@ -0,0 +1,141 @@
+# ===============================================================
+# 🧾 REPORT BENCHMARK — pyplot + temp PNGs vs Figure/Agg in memory
+# ===============================================================
+#
+#   python -m benchmarks.bench_report [hours] [--reports N] [--workers W]
+#
+# Renders full two-page PDF reports for a synthetic ride (and a synthetic
+# 200-ride catalog for page 2) with the previous pyplot chart code and with
+# utils.charts, then renders N reports across W worker processes.
+
+import os
+import sys
+import time
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+
+# ---------------------------------------------------------------
+# previous chart code (global pyplot state, raw samples, mktemp PNGs)
+# ---------------------------------------------------------------
+
+def legacy_ride_chart(df, cols):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(6.2, 3))
+    for col in cols:
+        plt.plot(df["time_s"], df[col], label=col.capitalize())
+    plt.xlabel("Time (s)")
+    plt.ylabel("Value")
+    plt.title("Ride Data")
+    plt.legend()
+    plt.tight_layout()
+
+    chart_path = tempfile.mktemp(suffix=".png")
+    plt.savefig(chart_path, dpi=150)
+    plt.close()
+    return chart_path
+
+
+def legacy_trend_chart(weekly):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(6, 3))
+    plt.plot(weekly["date"], weekly["distance_km"], label="Weekly Distance (km)")
+    plt.plot(weekly["date"], weekly["tss"], label="Weekly TSS")
+    plt.title("Training Volume & Stress Trends")
+    plt.xlabel("Week")
+    plt.legend()
+    plt.tight_layout()
+    chart2_path = tempfile.mktemp(suffix=".png")
+    plt.savefig(chart2_path, dpi=150)
+    plt.close()
+    return chart2_path
+
+
+# ---------------------------------------------------------------
+# fixtures
+# ---------------------------------------------------------------
+
+def synthetic_df(hours: float, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n = int(hours * 3600)
+    return pd.DataFrame({
+        "time_s": np.arange(n, dtype=float),
+        "watts": np.clip(rng.normal(210, 60, n), 0, None),
+        "heartrate": np.clip(rng.normal(145, 12, n), 60, 200),
+        "speed_mph": np.clip(rng.normal(19, 3, n), 0, None),
+    })
+
+
+def seed_catalog(n: int = 200):
+    from utils import catalog
+
+    days = pd.date_range("2025-01-01", periods=n, freq="D")
+    catalog.upsert_rows([{"ride_id": f"ride_{i}", "date": d.date().isoformat(), "start_date": d.isoformat(),
+                          "name": f"Ride {i}", "type": "Ride", "distance_m": 40000.0 + i,
+                          "moving_time_s": 5400.0, "average_watts": 200.0, "np_power": 215.0}
+                         for i, d in enumerate(days)])
+    conn = catalog.connect()
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO catalog_info VALUES ('built_at', 'bench')")
+    conn.close()
+
+
+METRICS = {"distance_mi": 40.0, "duration_min": 180, "avg_speed": 19.0, "avg_power": 210, "np_power": 225,
+           "intensity_factor": 0.8, "tss": 190, "avg_hr": 145, "max_hr": 180,
+           "hr_zone_dist": {"Z1": 10.0, "Z2": 40.0, "Z3": 30.0, "Z4": 15.0, "Z5": 5.0}}
+
+
+def render(hours: float, path: str, legacy: bool = False) -> str:
+    from utils import charts, pdf_generator
+
+    if not legacy:
+        return pdf_generator.generate_ride_report(synthetic_df(hours), METRICS, "Bench Ride", pdf_path=path, ftp=250)
+    current = charts.ride_chart, charts.trend_chart
+    charts.ride_chart, charts.trend_chart = legacy_ride_chart, legacy_trend_chart
+    try:
+        return pdf_generator.generate_ride_report(synthetic_df(hours), METRICS, "Bench Ride", pdf_path=path, ftp=250)
+    finally:
+        charts.ride_chart, charts.trend_chart = current
+
+
+def _best(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv):
+    hours = float(argv[0]) if argv and not argv[0].startswith("--") else 3
+    reports = int(argv[argv.index("--reports") + 1]) if "--reports" in argv else 8
+    workers = int(argv[argv.index("--workers") + 1]) if "--workers" in argv else (os.cpu_count() or 1)
+
+    tmp = tempfile.mkdtemp()
+    os.chdir(tmp)
+    seed_catalog()
+    out = os.path.join(tmp, "r.pdf")
+
+    before_tmp = len(os.listdir(tempfile.gettempdir()))
+    t_new = _best(lambda: render(hours, out))
+    t_old = _best(lambda: render(hours, out, legacy=True))
+    leaked = len(os.listdir(tempfile.gettempdir())) - before_tmp
+    print(f"⏱️ {hours:g} h ride, one report:  pyplot {t_old:.2f}s  →  Figure/Agg {t_new:.2f}s  "
+          f"({t_old / t_new:.1f}x); legacy left {leaked} temp PNGs behind")
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(render, [hours] * reports, [os.path.join(tmp, f"r{i}.pdf") for i in range(reports)]))
+    wall = time.perf_counter() - t0
+    print(f"🧵 {reports} reports on {workers} workers: {wall:.2f}s ({reports / wall:.1f} reports/s)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
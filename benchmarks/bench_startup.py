@@ -0,0 +1,147 @@
+# ===============================================================
+# 🥶 STARTUP BENCHMARK — cold-start cost per API endpoint
+# ===============================================================
+#
+#   python -m benchmarks.bench_startup [--repeat 5] [--json out.json] [--baseline old.json]
+#
+# Each endpoint runs in a fresh interpreter (as a serverless function would):
+# import its API module, then serve one request through the ASGI app, against
+# a small synthetic library. Wall times are medians over --repeat runs; one
+# extra run under ``python -X importtime`` attributes import cost to the
+# heaviest top-level packages. Heavy packages an endpoint must not load
+# (e.g. matplotlib for ride listing) are reported, and make the exit status 1.
+
+import os
+import sys
+import json
+import tempfile
+import statistics
+import subprocess
+from benchmarks import synthetic
+from benchmarks.bench_suite import compare
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ("pandas", "matplotlib", "reportlab", "streamlit", "fitparse", "requests", "PIL", "plotly")
+NO_REPORT_DEPS = ("matplotlib", "reportlab", "streamlit", "pandas")
+
+# (name, module to import, request path or None, query, packages it must not load)
+ENDPOINTS = [
+    ("GET /api/rides", "api.rides", "/api/rides", "limit=50", NO_REPORT_DEPS),
+    ("GET /api/rides/{id}", "api.rides", "/api/rides/{ride}", "", NO_REPORT_DEPS),
+    ("GET /api/rides/{id}/streams", "api.rides", "/api/rides/{ride}/streams", "points=1000", NO_REPORT_DEPS),
+    ("GET /api/report/jobs/{id}", "api.report", "/api/report/jobs/unknown", "", NO_REPORT_DEPS),
+    ("GET /api/metrics", "api.metrics", "/api/metrics", "", NO_REPORT_DEPS),
+    ("GET /api/settings", "api.settings", "/api/settings", "", NO_REPORT_DEPS),
+    ("report worker", "utils.pdf_generator", None, "", ()),
+    ("import worker", "utils.bulk_import", None, "", ("matplotlib", "reportlab", "streamlit")),
+]
+
+_SNIPPET = r'''
+import sys, json, time, asyncio
+
+async def _call(app, path, query):
+    scope = {{"type": "http", "asgi": {{"version": "3.0"}}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": query.encode(), "headers": [(b"host", b"bench")],
+             "server": ("bench", 80), "client": ("127.0.0.1", 1)}}
+    status = []
+
+    async def receive():
+        return {{"type": "http.request", "body": b"", "more_body": False}}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0] if status else None
+
+t0 = time.perf_counter()
+sys.stderr.write("@@import\n")
+import {module} as m
+t1 = time.perf_counter()
+sys.stderr.write("@@request\n")
+status = asyncio.run(_call(m.app, {path!r}, {query!r})) if {path!r} else None
+t2 = time.perf_counter()
+print(json.dumps({{"import_s": t1 - t0, "request_s": t2 - t1, "status": status, "modules": len(sys.modules),
+                  "heavy": sorted(p for p in {heavy!r} if p in sys.modules)}}))
+'''
+
+
+def _run(snippet: str, cwd: str, importtime: bool = False):
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", snippet]
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    return subprocess.run(cmd, cwd=cwd, env=env, capture_output=True, text=True)
+
+
+def _top_imports(stderr: str, limit: int = 5) -> dict:
+    """Import self-time summed by root package, heaviest first, per phase of ``-X importtime`` output."""
+    phases, phase = {}, None
+    for line in stderr.splitlines():
+        if line.startswith("@@"):
+            phase = line[2:]
+            continue
+        if phase is None or not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            root = name.strip().split(".")[0]
+            totals = phases.setdefault(phase, {})
+            totals[root] = totals.get(root, 0) + int(self_us) / 1000
+    return {p: sorted(((ms, pkg) for pkg, ms in v.items()), reverse=True)[:limit] for p, v in phases.items()}
+
+
+def run(repeat: int = 5, data_dir: str = None) -> tuple:
+    data_dir = data_dir or tempfile.mkdtemp(prefix="bench_startup_")
+    cwd = os.getcwd()
+    os.chdir(data_dir)
+    try:
+        ride = synthetic.seed_store(20, hours=(0.5, 1.0))[0]
+    finally:
+        os.chdir(cwd)
+
+    results, violations = [], []
+    print(f"{'endpoint':<30} {'import ms':>9} {'request ms':>10} {'total ms':>9} {'modules':>7}  heavy packages")
+    for name, module, path, query, forbid in ENDPOINTS:
+        snippet = _SNIPPET.format(module=module, path=path and path.format(ride=ride), query=query, heavy=HEAVY)
+        runs = [_run(snippet, data_dir) for _ in range(repeat)]
+        failed = next((r for r in runs if r.returncode != 0), None)
+        if failed is not None:
+            print(f"{name:<30} skipped: {failed.stderr.strip().splitlines()[-1]}")
+            continue
+        stats = [json.loads(r.stdout.strip().splitlines()[-1]) for r in runs]
+        imp = statistics.median(s["import_s"] for s in stats)
+        req = statistics.median(s["request_s"] for s in stats)
+        heavy = stats[0]["heavy"]
+        bad = [p for p in heavy if p in forbid]
+        print(f"{name:<30} {imp * 1e3:>9.0f} {req * 1e3:>10.0f} {(imp + req) * 1e3:>9.0f} "
+              f"{stats[0]['modules']:>7}  {', '.join(heavy) or '-'}" + (f"  ❌ must not load {bad}" if bad else ""))
+        breakdown = _top_imports(_run(snippet, data_dir, importtime=True).stderr)
+        for phase, top in breakdown.items():
+            print(f"{'':<4}{phase:<8} " + ", ".join(f"{pkg} {ms:.0f}ms" for ms, pkg in top))
+        results.append({"case": name, "size": "cold start", "seconds": imp + req, "import_s": imp,
+                        "request_s": req, "status": stats[0]["status"], "heavy": heavy, "peak_mb": None})
+        violations += [(name, p) for p in bad]
+    return results, violations
+
+
+def main(argv):
+    def opt(name, default):
+        return argv[argv.index(name) + 1] if name in argv else default
+
+    results, violations = run(int(opt("--repeat", 5)), opt("--data", None))
+    if opt("--json", None):
+        with open(opt("--json", None), "w") as f:
+            json.dump(results, f, indent=1)
+    status = 1 if violations else 0
+    if opt("--baseline", None):
+        with open(opt("--baseline", None)) as f:
+            regressions = compare(results, json.load(f), float(opt("--tolerance", 0.25)))
+        for case, size, field, old, new in regressions:
+            print(f"⚠️ {case}: cold start {old * 1e3:.0f}ms → {new * 1e3:.0f}ms ({new / old - 1:+.0%})")
+        status = status or (1 if regressions else 0)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
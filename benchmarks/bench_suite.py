@@ -0,0 +1,183 @@
+# ===============================================================
+# 📊 BENCHMARK SUITE — hot paths at several sizes, with baselines
+# ===============================================================
+#
+#   python -m benchmarks.bench_suite [--hours 1,3,6] [--library 100,1000] [--repeat 3]
+#                                    [--data DIR] [--json out.json] [--baseline old.json]
+#                                    [--tolerance 0.25] [--quick]
+#
+# Per-ride cases run on synthetic rides of each duration; library cases run
+# against a synthetic ride store of each size (built once under --data, or a
+# temporary directory, and reused on later runs). Every case reports best wall
+# time, throughput and peak traced memory. With --baseline, cases slower or
+# hungrier than the baseline by more than --tolerance are listed and the exit
+# status is 1, so the suite can gate a change.
+
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+import tracemalloc
+from benchmarks import synthetic
+
+
+def _measure(fn, repeat: int):
+    """(best seconds, peak traced bytes); timing and memory are measured in separate runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def _fileobj(data: bytes):
+    f = io.BytesIO(data)
+    f.name = "bench.fit"
+    return f
+
+
+def _library(root: str, n: int, hours, progress=True) -> float:
+    """chdir into a seeded store of ``n`` rides; returns build seconds (0 if reused)."""
+    path = os.path.join(root, f"library_{n}_{hours[0]:g}-{hours[1]:g}")
+    os.makedirs(path, exist_ok=True)
+    os.chdir(path)
+    if os.path.exists(".complete"):
+        return 0.0
+
+    def show(done, total):
+        print(f"\r🧪 seeding {done}/{total} rides", end="", flush=True)
+
+    t0 = time.perf_counter()
+    synthetic.seed_store(n, hours, progress=show if progress else None)
+    open(".complete", "w").close()
+    print()
+    return time.perf_counter() - t0
+
+
+def ride_cases(hours: float):
+    """(case, units, unit name, fn) for one synthetic ride of ``hours``."""
+    from utils.ride_analysis_utils import strava_json_to_df, compute_ride_metrics
+    from utils.fit_parser import parse_fit_to_json
+    from utils.pdf_generator import generate_ride_report
+    from utils.power_curve import power_1hz
+    from utils.wbal import wbal
+    from utils.intervals import detect
+    from utils.gps import ride_track
+
+    data = synthetic.strava_ride(hours, seed=1)
+    fit = synthetic.fit_bytes(hours, seed=1)
+    df = strava_json_to_df(data)
+    metrics = compute_ride_metrics(df, ftp=250, hr_max=190)
+    n = len(df)
+    power = power_1hz(df["time_s"].to_numpy(), df["watts"].to_numpy())
+    pdf = os.path.join(tempfile.gettempdir(), f"bench_suite_{os.getpid()}.pdf")
+    return [
+        ("strava_json_to_df", n, "samples", lambda: strava_json_to_df(data)),
+        ("compute_ride_metrics", n, "samples", lambda: compute_ride_metrics(df, ftp=250, hr_max=190)),
+        ("wbal[differential]", n, "samples", lambda: wbal(power, 250, 20000)),
+        ("wbal[integral]", n, "samples", lambda: wbal(power, 250, 20000, "integral")),
+        ("detect_intervals", n, "samples", lambda: detect(power, 250)),
+        ("simplify_track", n, "samples", lambda: ride_track(data["latlng"]["data"])),
+        ("parse_fit_to_json", n, "samples", lambda: parse_fit_to_json(_fileobj(fit))),
+        ("generate_ride_report", 1, "reports",
+         lambda: generate_ride_report(df, metrics, "Bench Ride", pdf_path=pdf, ftp=250)),
+    ]
+
+
+def library_cases(n: int):
+    """(case, units, unit name, fn) against the store in the current directory."""
+    from utils import catalog, gps
+    from utils.data_loader import list_rides, stream_values
+    from utils.metrics import build_tss_dataframe
+
+    rides = list_rides()
+    half = [r["ride_id"] for r in catalog.query_rides()][: n // 2]
+    gps.rebuild()  # libraries seeded before the GPS index
+    area = gps.track(catalog.query_rides()[0]["ride_id"])["bbox"]  # rides crossing one ride's bounding box
+    return [
+        ("list_rides", n, "rides", list_rides),
+        ("stream_values[watts]", n, "rides", lambda: stream_values(rides, "watts")),
+        ("build_tss_dataframe", n, "rides", build_tss_dataframe),
+        ("build_tss_dataframe[subset]", len(half), "rides", lambda: build_tss_dataframe(half)),
+        ("rides_through", n, "rides", lambda: gps.rides_through(*area)),
+    ]
+
+
+def run(hours_list, library_sizes, repeat: int = 3, data_root: str = None, library_hours=(0.25, 1.0)) -> list:
+    results = []
+
+    def record(case, size, units, unit, fn, reps=repeat):
+        seconds, peak = _measure(fn, reps)
+        row = {"case": case, "size": size, "units": units, "unit": unit, "seconds": seconds,
+               "per_s": units / seconds if seconds else float("inf"), "peak_mb": peak / 1e6}
+        results.append(row)
+        print(f"{case:<28} {size:>8} {seconds:>9.4f} {row['per_s']:>12,.0f} {unit:<8} {row['peak_mb']:>8.1f}")
+
+    cwd = os.getcwd()
+    data_root = data_root or os.path.join(tempfile.gettempdir(), "cyclingdashboard_bench")
+    print(f"{'case':<28} {'size':>8} {'best s':>9} {'throughput':>12} {'':<8} {'peak MB':>8}")
+    try:
+        for n in library_sizes:
+            built = _library(data_root, n, library_hours)
+            if built:
+                results.append({"case": "seed_store", "size": f"{n} rides", "units": n, "unit": "rides",
+                                "seconds": built, "per_s": n / built, "peak_mb": None})
+                print(f"{'seed_store (ingest)':<28} {n:>8} {built:>9.2f} {n / built:>12,.1f} rides")
+            for case, units, unit, fn in library_cases(n):
+                record(case, f"{n} rides", units, unit, fn)
+
+        # page 2 of a report summarises the library: use the smallest one
+        _library(data_root, min(library_sizes) if library_sizes else 100, library_hours)
+        for hours in hours_list:
+            for case, units, unit, fn in ride_cases(hours):
+                record(case, f"{hours:g} h", units, unit, fn, 1 if case == "generate_ride_report" else repeat)
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def compare(results: list, baseline: list, tolerance: float = 0.25) -> list:
+    """Cases slower or using more memory than the baseline by more than ``tolerance``."""
+    base = {(r["case"], str(r["size"])): r for r in baseline}
+    regressions = []
+    for r in results:
+        b = base.get((r["case"], str(r["size"])))
+        if b is None or r["case"] == "seed_store":
+            continue
+        for field in ("seconds", "peak_mb"):
+            if b.get(field) and r.get(field) is not None and r[field] > b[field] * (1 + tolerance):
+                regressions.append((r["case"], r["size"], field, b[field], r[field]))
+    return regressions
+
+
+def main(argv):
+    def opt(name, default):
+        return argv[argv.index(name) + 1] if name in argv else default
+
+    quick = "--quick" in argv
+    hours = [float(h) for h in opt("--hours", "1" if quick else "1,3,6").split(",") if h]
+    sizes = [int(n) for n in opt("--library", "50" if quick else "100,1000").split(",") if n]
+    results = run(hours, sizes, int(opt("--repeat", 1 if quick else 3)), opt("--data", None))
+
+    if opt("--json", None):
+        with open(opt("--json", None), "w") as f:
+            json.dump(results, f, indent=1)
+    if opt("--baseline", None):
+        with open(opt("--baseline", None)) as f:
+            regressions = compare(results, json.load(f), float(opt("--tolerance", 0.25)))
+        for case, size, field, old, new in regressions:
+            print(f"⚠️ {case} @ {size}: {field} {old:.4g} → {new:.4g} ({new / old - 1:+.0%})")
+        print("✅ no regressions" if not regressions else f"❌ {len(regressions)} regression(s)")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,57 @@
+# ===============================================================
+# 📡 WIRE BENCHMARK — JSON vs binary ride payloads
+# ===============================================================
+#
+#   python -m benchmarks.bench_wire [hours ...]
+#
+# Encodes a full-resolution synthetic ride the way api/rides.py answers
+# (JSON fallback vs application/x-ride-streams, raw and gzip) and reports
+# payload size and server-side serialization time.
+
+import sys
+import time
+import gzip
+import numpy as np
+from utils import wire
+
+
+def synthetic_ride(hours: float, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    n = int(hours * 3600)
+    speed = np.clip(rng.normal(8.5, 1.2, n), 0, None).astype(np.float32)
+    return {
+        "name": "Synthetic Ride",
+        "time": {"data": np.arange(n, dtype=np.float64)},
+        "watts": {"data": np.clip(rng.normal(210, 60, n), 0, None).round().astype(np.float32)},
+        "heartrate": {"data": np.clip(rng.normal(145, 12, n), 60, 200).round().astype(np.float32)},
+        "cadence": {"data": np.clip(rng.normal(88, 8, n), 0, None).round().astype(np.float32)},
+        "velocity_smooth": {"data": speed},
+        "distance": {"data": np.cumsum(speed, dtype=np.float64)},
+        "altitude": {"data": (100 + np.cumsum(rng.normal(0, 0.2, n))).astype(np.float32)},
+        "latlng": {"data": np.column_stack([45 + np.cumsum(rng.normal(0, 1e-5, n)),
+                                            7 + np.cumsum(rng.normal(0, 1e-5, n))])},
+    }
+
+
+def _time(fn, repeat: int = 3) -> tuple:
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def run(hours: float):
+    doc = synthetic_ride(hours)
+    print(f"\n⏱️ {hours:g} h ride ({len(doc['time']['data']):,} samples)")
+    for label, fn in (("json", lambda: wire.to_json(doc)), ("binary", lambda: wire.encode(doc))):
+        t_enc, body = _time(fn)
+        t_gz, gz = _time(lambda: gzip.compress(body, compresslevel=5), repeat=1)
+        print(f"  {label:<7} {len(body) / 1e6:7.2f} MB  encode {t_enc * 1e3:7.1f} ms   "
+              f"gzip {len(gz) / 1e6:6.2f} MB (+{t_gz * 1e3:.0f} ms)")
+
+
+if __name__ == "__main__":
+    for h in [float(a) for a in sys.argv[1:]] or [1, 6]:
+        run(h)
@@ -0,0 +1,160 @@
+# ===============================================================
+# 🧪 STRAVA STUB — local stand-in for the activities/streams endpoints
+# ===============================================================
+#
+# Serves /athlete/activities and /activities/<id>/streams with Strava's
+# X-RateLimit-Limit / X-RateLimit-Usage headers, answering 429 once a
+# window is spent, so utils.strava_client can be exercised offline:
+#
+#   python -m benchmarks.strava_stub [n_activities] [--latency 0.05]
+#
+# runs a full sync against the stub into a temporary ride_data directory
+# and reports wall time, request count and throttling.
+
+import os
+import re
+import sys
+import json
+import time
+import calendar
+import tempfile
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+
+
+class StubState:
+    """Fake athlete with ``n`` rides and Strava-style rate limit accounting."""
+
+    def __init__(self, n: int = 200, short_limit: int = 600, daily_limit: int = 30000,
+                 latency: float = 0.0, ride_seconds: int = 3600, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        t0 = 1735689600  # 2025-01-01
+        self.activities = [{
+            "id": 1000 + i,
+            "name": f"Stub Ride {i}",
+            "type": "Ride" if i % 7 else "Run",
+            "start_date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(t0 + i * 86400 // 2)),
+            "distance": float(rng.uniform(20e3, 80e3)),
+            "moving_time": ride_seconds,
+        } for i in range(n)]
+        self.short_limit, self.daily_limit = short_limit, daily_limit
+        self.short_used = self.daily_used = 0
+        self.latency, self.ride_seconds, self.seed = latency, ride_seconds, seed
+        self.requests = self.throttled = 0
+        self.lock = threading.Lock()
+
+    def count(self) -> bool:
+        with self.lock:
+            self.requests += 1
+            if self.short_used >= self.short_limit or self.daily_used >= self.daily_limit:
+                self.throttled += 1
+                return False
+            self.short_used += 1
+            self.daily_used += 1
+            return True
+
+    def reset_window(self):
+        with self.lock:
+            self.short_used = 0
+
+    def streams(self, activity_id: int) -> dict:
+        rng = np.random.default_rng(self.seed + activity_id)
+        n = self.ride_seconds
+        watts = np.clip(rng.normal(200, 40, n), 0, None).round()
+        speed = np.clip(rng.normal(8.5, 1.0, n), 0, None)
+        return {
+            "time": {"data": list(range(n))},
+            "watts": {"data": watts.tolist()},
+            "heartrate": {"data": np.clip(rng.normal(140, 10, n), 60, 200).round().tolist()},
+            "velocity_smooth": {"data": speed.round(2).tolist()},
+            "distance": {"data": np.cumsum(speed).round(1).tolist()},
+            "altitude": {"data": (100 + np.cumsum(rng.normal(0, 0.2, n))).round(1).tolist()},
+        }
+
+
+def _handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so connection pooling shows up
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code: int, body):
+            payload = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("X-RateLimit-Limit", f"{state.short_limit},{state.daily_limit}")
+            self.send_header("X-RateLimit-Usage", f"{state.short_used},{state.daily_used}")
+            if code == 429:
+                self.send_header("Retry-After", "1")
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if state.latency:
+                time.sleep(state.latency)
+            if not self.headers.get("Authorization", "").startswith("Bearer "):
+                return self._send(401, {"message": "Authorization Error"})
+            if not state.count():
+                return self._send(429, {"message": "Rate Limit Exceeded"})
+            url = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path == "/athlete/activities":
+                after = int(q.get("after", 0))
+                per_page, page = min(int(q.get("per_page", 30)), 200), int(q.get("page", 1))
+                acts = [a for a in state.activities
+                        if calendar.timegm(time.strptime(a["start_date"], "%Y-%m-%dT%H:%M:%SZ")) > after]
+                return self._send(200, acts[(page - 1) * per_page: page * per_page])
+            m = re.fullmatch(r"/activities/(\d+)/streams", url.path)
+            if m:
+                return self._send(200, state.streams(int(m.group(1))))
+            self._send(404, {"message": "Record Not Found"})
+
+    return Handler
+
+
+def serve(state: StubState):
+    """Start the stub on a free local port; returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _main(argv):
+    n = int(argv[0]) if argv and argv[0].isdigit() else 200
+    latency = float(argv[argv.index("--latency") + 1]) if "--latency" in argv else 0.05
+    # small 15-minute window so throttling + backoff are exercised
+    state = StubState(n=n, short_limit=max(n // 2, 10), latency=latency, ride_seconds=1800)
+    server, base_url = serve(state)
+
+    from utils.strava_client import StravaClient, RateLimiter, sync_rides
+
+    def fake_sleep(seconds):
+        # the stub's window is reset instead of waiting out a real quarter hour
+        state.reset_window()
+        time.sleep(min(seconds, 0.01))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            client = StravaClient("stub-token", base_url=base_url, limiter=RateLimiter(sleep=fake_sleep))
+            t0 = time.perf_counter()
+            result = sync_rides(client, after=0)
+            elapsed = time.perf_counter() - t0
+            client.close()
+        finally:
+            os.chdir(cwd)
+    server.shutdown()
+
+    print(f"synced {result['new']} rides in {elapsed:.2f}s "
+          f"({result['pages']} pages, {result['requests']} client requests, "
+          f"{state.throttled} answered 429, {result['failed']} failed)")
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
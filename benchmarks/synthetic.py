@@ -0,0 +1,243 @@
+# ===============================================================
+# 🧪 SYNTHETIC RIDES — deterministic Strava / FIT test data
+# ===============================================================
+#
+# Rides are generated from a seed, so every run of a benchmark sees the
+# same bytes. Each ride is a sequence of effort blocks (endurance, tempo,
+# threshold, VO2 intervals, coasting) over rolling terrain; speed follows
+# from power and grade, heart rate lags power, and GPS follows a wandering
+# heading. Real-world artefacts are optional:
+#
+#   dropouts  runs of missing heart rate / power samples (NaN / null)
+#   pauses    auto-pause gaps where the time stream jumps ahead
+#   spikes    isolated power and heart-rate outliers
+#
+#   python -m benchmarks.synthetic <out_dir> [--rides 10000] [--format json|fit|store]
+#                                  [--hours 0.75-4] [--hz 1] [--seed 0]
+
+import io
+import os
+import sys
+import json
+import time
+import numpy as np
+import pandas as pd
+from benchmarks.fit_writer import write_fit
+
+START = 1735718400  # 2025-01-01T08:00:00Z
+
+# (share of ride time, fraction of FTP, block length range in seconds)
+_BLOCKS = {
+    "endurance": (0.45, 0.65, (600, 2400)),
+    "tempo": (0.20, 0.82, (300, 1200)),
+    "threshold": (0.12, 0.98, (240, 900)),
+    "vo2": (0.08, 1.18, (60, 300)),
+    "coast": (0.15, 0.0, (5, 60)),
+}
+
+_MASS, _CRR, _CDA, _RHO, _G = 82.0, 0.004, 0.32, 1.2, 9.81
+
+
+def _effort(n: int, dt: float, ftp: float, rng) -> np.ndarray:
+    names = list(_BLOCKS)
+    share = np.array([_BLOCKS[k][0] for k in names])
+    out, i = np.empty(n), 0
+    while i < n:
+        name = names[rng.choice(len(names), p=share / share.sum())]
+        _, level, (lo, hi) = _BLOCKS[name]
+        m = min(n - i, max(1, int(rng.integers(lo, hi) / dt)))
+        out[i:i + m] = level * ftp * rng.uniform(0.95, 1.05)
+        i += m
+    return out
+
+
+def _speed(watts: np.ndarray, grade: np.ndarray) -> np.ndarray:
+    """Steady-state speed (m/s) for power and grade: P = v·m·g·(grade + Crr) + ½ρ·CdA·v³."""
+    a = 0.5 * _RHO * _CDA
+    b = _MASS * _G * (grade + _CRR)
+    v = np.full_like(watts, 8.0)
+    for _ in range(12):  # Newton on f(v) = a·v³ + b·v − P
+        v -= (a * v ** 3 + b * v - watts) / (3 * a * v ** 2 + b)
+        v = np.clip(v, 0.5, 25.0)
+    return v
+
+
+def _lag(x: np.ndarray, dt: float, tau: float) -> np.ndarray:
+    return pd.Series(x).ewm(alpha=min(1.0, dt / tau), adjust=False).mean().to_numpy(copy=True)
+
+
+def ride_streams(hours: float = 1.0, hz: float = 1.0, seed: int = 0, ftp: float = 250, hr_max: int = 190,
+                 dropouts: bool = True, pauses: bool = True, spikes: bool = True) -> dict:
+    """Stream arrays keyed by Strava stream name (``latlng`` is n×2)."""
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / hz
+    n = max(2, int(hours * 3600 * hz))
+
+    target = _effort(n, dt, ftp, rng)
+    watts = np.clip(_lag(target, dt, 3.0) * (1 + 0.08 * rng.standard_normal(n)), 0, None)
+    watts[target == 0] = 0.0
+
+    phase = rng.uniform(0, 2 * np.pi, 3)
+    x = np.arange(n) * dt
+    grade = (0.04 * np.sin(x / 1400 + phase[0]) + 0.025 * np.sin(x / 330 + phase[1])
+             + 0.01 * np.sin(x / 90 + phase[2]))
+    velocity = _lag(_speed(np.maximum(watts, 40.0 * (target > 0)), grade), dt, 8.0)
+    velocity[target == 0] = _lag(velocity, dt, 20.0)[target == 0]  # coasting rolls on
+    distance = np.cumsum(velocity * dt)
+    altitude = 120 + np.cumsum(grade * velocity * dt)
+
+    rest = 55.0
+    hr_target = rest + (hr_max - rest) * np.clip(0.45 + 0.45 * watts / ftp, 0.3, 1.0)
+    heartrate = _lag(hr_target, dt, 35.0) + np.linspace(0, 6, n) + rng.normal(0, 1.2, n)
+    cadence = np.where(watts > 0, np.clip(rng.normal(88, 5, n) + 6 * (watts / ftp - 0.7), 50, 125), 0.0)
+
+    heading = rng.uniform(0, 2 * np.pi) + np.cumsum(rng.normal(0, 0.02, n) * np.sqrt(dt))
+    lat0, lng0 = 45.0 + rng.uniform(-1, 1), -122.0 + rng.uniform(-1, 1)
+    step = velocity * dt
+    lat = lat0 + np.cumsum(step * np.cos(heading)) / 111_320
+    lng = lng0 + np.cumsum(step * np.sin(heading)) / (111_320 * np.cos(np.radians(lat0)))
+    temp = 18 + 4 * np.sin(x / 7200 + phase[0]) + rng.normal(0, 0.2, n)
+
+    t = x.copy()
+    if pauses:
+        for i in rng.integers(1, n, int(rng.poisson(hours / 1.5))):
+            t[i:] += rng.uniform(60, 600)
+    if hz <= 1:
+        t = np.round(t)
+    if spikes:
+        k = max(1, n // 20_000)
+        watts[rng.integers(0, n, k)] = rng.uniform(1500, 2500, k)
+        heartrate[rng.integers(0, n, k)] = rng.uniform(215, 240, k)
+    if dropouts:
+        for arr in (heartrate, watts):
+            for i in rng.integers(0, n, int(rng.poisson(1 + hours))):
+                arr[i:i + int(rng.integers(5, 120) * hz) + 1] = np.nan
+
+    return {
+        "time": t, "watts": np.round(watts), "heartrate": np.round(heartrate), "cadence": np.round(cadence),
+        "velocity_smooth": np.round(velocity, 2), "distance": np.round(distance, 1),
+        "altitude": np.round(altitude, 1), "latlng": np.round(np.column_stack([lat, lng]), 6),
+        "temp": np.round(temp),
+    }
+
+
+def _summary(streams: dict, ride_id: int, start: float, name: str) -> dict:
+    t = streams["time"]
+    return {
+        "id": ride_id, "name": name, "type": "Ride", "sport_type": "Ride",
+        "start_date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(start)),
+        "distance": float(np.nanmax(streams["distance"])), "moving_time": float(len(t)),
+        "elapsed_time": float(t[-1]), "average_watts": round(float(np.nanmean(streams["watts"])), 1),
+        "average_heartrate": round(float(np.nanmean(streams["heartrate"])), 1),
+    }
+
+
+def strava_ride(hours: float = 1.0, hz: float = 1.0, seed: int = 0, ride_id: int = None,
+                start: float = None, name: str = None, arrays: bool = False, **kwargs) -> dict:
+    """A ride in the repo's Strava JSON layout (summary fields + ``{"data": [...]}`` streams).
+
+    With ``arrays=True`` streams stay numpy arrays (for the ride store); otherwise they are
+    JSON-ready lists with missing samples as ``None``.
+    """
+    streams = ride_streams(hours, hz, seed, **kwargs)
+    ride_id = 10_000_000 + seed if ride_id is None else ride_id
+    start = START + seed * 86400 if start is None else start
+    data = _summary(streams, ride_id, start, name or f"Synthetic Ride {seed}")
+    for key, arr in streams.items():
+        if arrays:
+            data[key] = {"data": arr}
+        else:
+            values = arr.astype(object)
+            values[pd.isna(arr)] = None
+            data[key] = {"data": values.tolist()}
+    return data
+
+
+def fit_bytes(hours: float = 1.0, seed: int = 0, start: float = None, **kwargs) -> bytes:
+    """The same ride as a FIT activity (1 Hz; FIT timestamps are whole seconds)."""
+    s = ride_streams(hours, 1.0, seed, **kwargs)
+    semicircles = 2 ** 31 / 180.0
+    buf = io.BytesIO()
+    write_fit(buf, START + seed * 86400 if start is None else start, {
+        "time_s": s["time"], "power": s["watts"], "heart_rate": s["heartrate"], "cadence": s["cadence"],
+        "speed": s["velocity_smooth"], "distance": s["distance"], "altitude": s["altitude"],
+        "position_lat": s["latlng"][:, 0] * semicircles, "position_long": s["latlng"][:, 1] * semicircles,
+        "temperature": s["temp"],
+    })
+    return buf.getvalue()
+
+
+# ===============================================================
+# 📚 LIBRARIES
+# ===============================================================
+
+def library_plan(n: int, hours=(0.75, 4.0), seed: int = 0) -> list:
+    """(seed, hours, start) per ride: roughly one ride a day, two on some days."""
+    rng = np.random.default_rng(seed)
+    gaps = rng.choice([0.35, 1.0, 1.0, 1.0, 2.0], n) * 86400
+    starts = START + np.cumsum(gaps) - gaps[0]
+    durations = np.round(rng.uniform(hours[0], hours[1], n), 2)
+    return [(seed * 1_000_003 + i, float(durations[i]), float(starts[i])) for i in range(n)]
+
+
+def write_library(out_dir: str, n: int, fmt: str = "json", hours=(0.75, 4.0), hz: float = 1.0,
+                  seed: int = 0, progress=None) -> int:
+    """Write ``n`` ride files (``json`` or ``fit``) for ``utils.bulk_import``."""
+    os.makedirs(out_dir, exist_ok=True)
+    for i, (s, h, start) in enumerate(library_plan(n, hours, seed)):
+        if fmt == "fit":
+            with open(os.path.join(out_dir, f"synthetic_{i:05d}.fit"), "wb") as f:
+                f.write(fit_bytes(h, s, start=start))
+        else:
+            with open(os.path.join(out_dir, f"activity_{10_000_000 + i}.json"), "w") as f:
+                json.dump(strava_ride(h, hz, s, ride_id=10_000_000 + i, start=start, name=f"Synthetic Ride {i}"), f)
+        if progress:
+            progress(i + 1, n)
+    return n
+
+
+def seed_store(n: int, hours=(0.75, 4.0), hz: float = 1.0, seed: int = 0, progress=None) -> list:
+    """Ingest ``n`` rides straight into the ride store under the current directory."""
+    from utils import pmc
+    from utils.ingest import ingest_ride
+
+    ids = []
+    for i, (s, h, start) in enumerate(library_plan(n, hours, seed)):
+        data = strava_ride(h, hz, s, ride_id=10_000_000 + i, start=start, name=f"Synthetic Ride {i}", arrays=True)
+        ids.append(ingest_ride(data, f"activity_{10_000_000 + i}", refresh_pmc=False))
+        if progress:
+            progress(i + 1, n)
+    pmc.update_from(None)
+    return ids
+
+
+def _cli(argv):
+    if not argv:
+        print("usage: python -m benchmarks.synthetic <out_dir> [--rides N] [--format json|fit|store] "
+              "[--hours 0.75-4] [--hz 1] [--seed 0]")
+        return 2
+
+    def opt(name, default):
+        return argv[argv.index(name) + 1] if name in argv else default
+
+    out, n, fmt = argv[0], int(opt("--rides", 100)), opt("--format", "json")
+    hours = tuple(float(h) for h in opt("--hours", "0.75-4").split("-"))
+    hours = hours * 2 if len(hours) == 1 else hours
+    hz, seed = float(opt("--hz", 1)), int(opt("--seed", 0))
+
+    def show(done, total):
+        print(f"\r🧪 {done}/{total} rides", end="", flush=True)
+
+    t0 = time.perf_counter()
+    if fmt == "store":
+        os.makedirs(out, exist_ok=True)
+        os.chdir(out)
+        seed_store(n, hours, hz, seed, progress=show)
+    else:
+        write_library(out, n, fmt, hours, hz, seed, progress=show)
+    print(f"\n✅ {n} rides in {time.perf_counter() - t0:.1f}s → {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_cli(sys.argv[1:]))
@@ -1,17 +1,66 @@
 // frontend/src/api.js
-export async function listRides() {
-  const res = await fetch(`/api/rides`);
+// Returns { rides, next_cursor, total }; pass next_cursor back as `cursor` for the next page.
+export async function listRides(params = {}) {
+  const query = new URLSearchParams(
+    Object.entries(params).filter(([, v]) => v !== undefined && v !== null && v !== "")
+  );
+  const res = await fetch(`/api/rides${query.toString() ? `?${query}` : ""}`);
   if (!res.ok) throw new Error("Failed to list rides");
   return res.json();
 }
 
-export async function getRide(fname) {
-  const res = await fetch(`/api/rides/${encodeURIComponent(fname)}`);
+// Binary stream format (see utils/wire.py): "RSW1" | u32 header length | header JSON | 8-byte aligned arrays.
+// Arrays come back as typed-array views over the response buffer; the browser handles gzip/br.
+const WIRE_TYPE = "application/x-ride-streams";
+const DTYPES = {
+  "<f4": Float32Array, "<f8": Float64Array, "|b1": Uint8Array, "|u1": Uint8Array,
+  "|i1": Int8Array, "<i2": Int16Array, "<u2": Uint16Array, "<i4": Int32Array, "<u4": Uint32Array,
+};
+
+export function decodeRideStreams(buffer) {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== "RSW1") throw new Error("Not a ride-streams body");
+  const headerLength = view.getUint32(4, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+  const base = 8 + headerLength;
+  const arrays = header.buffers.map((b) => {
+    const Type = DTYPES[b.dtype];
+    if (!Type) throw new Error(`Unsupported dtype ${b.dtype}`);
+    const arr = new Type(buffer, base + b.offset, b.nbytes / Type.BYTES_PER_ELEMENT);
+    arr.shape = b.shape;
+    return arr;
+  });
+  const revive = (v) => {
+    if (Array.isArray(v)) return v.map(revive);
+    if (v && typeof v === "object") {
+      const keys = Object.keys(v);
+      if (keys.length === 1 && keys[0] === "$a") return arrays[v.$a];
+      return Object.fromEntries(keys.map((k) => [k, revive(v[k])]));
+    }
+    return v;
+  };
+  return revive(header.doc);
+}
+
+async function fetchStreams(url) {
+  const res = await fetch(url, { headers: { Accept: `${WIRE_TYPE}, application/json;q=0.5` } });
   if (!res.ok) throw new Error("Ride not found");
-  return res.json();
+  const type = res.headers.get("Content-Type") || "";
+  return type.startsWith(WIRE_TYPE) ? decodeRideStreams(await res.arrayBuffer()) : res.json();
 }
 
-export async function generateReport(fname) {
+export async function getRide(fname) {
+  return fetchStreams(`/api/rides/${encodeURIComponent(fname)}`);
+}
+
+export async function getRideStreams(fname, keys = ["watts", "heartrate"], points = 1000) {
+  const params = new URLSearchParams({ keys: keys.join(","), points: String(points) });
+  return fetchStreams(`/api/rides/${encodeURIComponent(fname)}/streams?${params}`);
+}
+
+// Reports render in the background: submit → poll the job → download the cached PDF.
+export async function generateReport(fname, { pollMs = 750, timeoutMs = 120000 } = {}) {
   const res = await fetch(`/api/report/generate/${encodeURIComponent(fname)}`, {
     method: "POST",
   });
@@ -19,6 +68,56 @@ export async function generateReport(fname) {
     const txt = await res.text();
     throw new Error(`PDF generation failed: ${txt}`);
   }
-  const blob = await res.blob();
-  return blob;
+  let job = await res.json();
+  const deadline = Date.now() + timeoutMs;
+  while (job.state === "queued" || job.state === "running") {
+    if (Date.now() > deadline) throw new Error("PDF generation timed out");
+    await new Promise((r) => setTimeout(r, pollMs));
+    const poll = await fetch(`/api/report/jobs/${job.job_id}`);
+    if (!poll.ok) throw new Error(`PDF generation failed: ${await poll.text()}`);
+    job = await poll.json();
+  }
+  if (job.state !== "done") throw new Error(`PDF generation failed: ${job.error || job.state}`);
+
+  const pdf = await fetch(`/api/report/jobs/${job.job_id}/download`);
+  if (!pdf.ok) throw new Error(`PDF download failed: ${await pdf.text()}`);
+  return pdf.blob();
+}
+
+// Bulk import: upload .fit/.fit.gz/.json files (or one ZIP export) → poll the job until it finishes.
+// onProgress gets the job status ({ total, done, imported, skipped, failed, errors }) after each poll.
+export async function importRides(files, { onProgress, pollMs = 1000 } = {}) {
+  const body = new FormData();
+  for (const file of files) body.append("files", file);
+  const res = await fetch("/api/imports", { method: "POST", body });
+  if (!res.ok) throw new Error(`Import failed: ${await res.text()}`);
+  let job = await res.json();
+  while (job.state === "queued" || job.state === "running") {
+    if (onProgress) onProgress(job);
+    await new Promise((r) => setTimeout(r, pollMs));
+    const poll = await fetch(`/api/imports/${job.job_id}`);
+    if (!poll.ok) throw new Error(`Import failed: ${await poll.text()}`);
+    job = await poll.json();
+  }
+  if (onProgress) onProgress(job);
+  if (job.state !== "done") throw new Error(`Import failed: ${job.error || job.state}`);
+  return job;
+}
+
+// FTP / HR max: { ftp, hr_max, history: { ftp: [[since, value]], hr_max: [...] } }.
+export async function getSettings() {
+  const res = await fetch("/api/settings");
+  if (!res.ok) throw new Error("Failed to load settings");
+  return res.json();
+}
+
+// Records the new values from `since` (default: today); stored rides are re-scored server-side.
+export async function saveSettings({ ftp, hr_max, since } = {}) {
+  const res = await fetch("/api/settings", {
+    method: "PUT",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ ftp, hr_max, since }),
+  });
+  if (!res.ok) throw new Error(`Failed to save settings: ${await res.text()}`);
+  return res.json();
 }
@@ -4,7 +4,13 @@ import DownloadIcon from "@mui/icons-material/Download";
 import SearchIcon from "@mui/icons-material/Search";
 
 export default function RideCard({ ride, onAnalyze, onDownload }) {
-  const displayDate = ride.date ? new Date(ride.date).toLocaleString() : "Unknown date";
+  const when = ride.start_date || ride.date;
+  const displayDate = when ? new Date(when).toLocaleString() : "Unknown date";
+  const details = [
+    ride.distance_m ? `${(ride.distance_m / 1609.34).toFixed(1)} mi` : null,
+    ride.moving_time_s ? `${Math.round(ride.moving_time_s / 60)} min` : null,
+    ride.tss ? `TSS ${Math.round(ride.tss)}` : null,
+  ].filter(Boolean).join(" · ");
   return (
     <Card sx={{ borderRadius: 2, boxShadow: 2 }}>
       <CardContent>
@@ -12,10 +18,11 @@ export default function RideCard({ ride, onAnalyze, onDownload }) {
           <div>
             <Typography variant="h6">{ride.name || "Untitled Ride"}</Typography>
             <Typography variant="body2" color="text.secondary">{displayDate}</Typography>
+            {details && <Typography variant="body2" color="text.secondary">{details}</Typography>}
           </div>
           <Stack direction="row" spacing={1}>
-            <Button variant="outlined" startIcon={<SearchIcon />} onClick={() => onAnalyze(ride.path)}>Analyze</Button>
-            <Button variant="contained" startIcon={<DownloadIcon />} onClick={() => onDownload(ride.path)}>PDF</Button>
+            <Button variant="outlined" startIcon={<SearchIcon />} onClick={() => onAnalyze(ride.ride_id)}>Analyze</Button>
+            <Button variant="contained" startIcon={<DownloadIcon />} onClick={() => onDownload(ride.ride_id)}>PDF</Button>
           </Stack>
         </Stack>
       </CardContent>
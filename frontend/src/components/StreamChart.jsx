@@ -0,0 +1,26 @@
+import React from "react";
+import { Paper, Typography } from "@mui/material";
+
+const WIDTH = 1000;
+const HEIGHT = 180;
+
+export default function StreamChart({ label, x, y, color = "#1976d2" }) {
+  if (!x || x.length < 2) return null;
+  const x0 = x[0], x1 = x[x.length - 1];
+  const yMin = Math.min(...y), yMax = Math.max(...y);
+  const sx = WIDTH / (x1 - x0 || 1);
+  const sy = HEIGHT / (yMax - yMin || 1);
+  // x/y may be typed arrays (binary responses), whose map() cannot return strings
+  const points = Array.from(x, (t, i) => `${((t - x0) * sx).toFixed(1)},${(HEIGHT - (y[i] - yMin) * sy).toFixed(1)}`).join(" ");
+
+  return (
+    <Paper elevation={1} sx={{ p: 2, borderRadius: 2 }}>
+      <Typography variant="subtitle1" sx={{ mb: 1 }}>
+        {label} <Typography component="span" color="text.secondary">({Math.round(yMin)}–{Math.round(yMax)})</Typography>
+      </Typography>
+      <svg viewBox={`0 0 ${WIDTH} ${HEIGHT}`} width="100%" height={HEIGHT} preserveAspectRatio="none">
+        <polyline points={points} fill="none" stroke={color} strokeWidth="1" vectorEffect="non-scaling-stroke" />
+      </svg>
+    </Paper>
+  );
+}
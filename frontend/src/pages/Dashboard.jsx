@@ -1,20 +1,34 @@
 import React, { useEffect, useState } from "react";
-import { Typography, Stack, CircularProgress } from "@mui/material";
-import { listRides, generateReport } from "../api";
+import { Typography, Stack, CircularProgress, Button, LinearProgress, Alert } from "@mui/material";
+import { listRides, generateReport, importRides } from "../api";
 import RideCard from "../components/RideCard";
 
+const PAGE_SIZE = 30;
+
 export default function Dashboard() {
   const [rides, setRides] = useState(null);
+  const [total, setTotal] = useState(0);
+  const [cursor, setCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [importJob, setImportJob] = useState(null);
 
-  useEffect(() => {
-    listRides()
-      .then((data) => setRides(data))
+  function loadPage(after) {
+    setLoading(true);
+    listRides({ limit: PAGE_SIZE, cursor: after })
+      .then((data) => {
+        setRides((prev) => (after ? [...(prev || []), ...data.rides] : data.rides));
+        setTotal(data.total);
+        setCursor(data.next_cursor);
+      })
       .catch((err) => {
         console.error(err);
-        setRides([]);
+        setRides((prev) => prev || []);
       })
       .finally(() => setLoading(false));
+  }
+
+  useEffect(() => {
+    loadPage(null);
   }, []);
 
   function handleAnalyze(path) {
@@ -36,17 +50,60 @@ export default function Dashboard() {
     }
   }
 
+  async function handleImport(event) {
+    const files = Array.from(event.target.files || []);
+    event.target.value = "";
+    if (!files.length) return;
+    try {
+      await importRides(files, { onProgress: (job) => setImportJob({ ...job }) });
+      loadPage(null);
+    } catch (e) {
+      setImportJob((job) => ({ ...(job || {}), state: "failed", error: e.message }));
+    }
+  }
+
+  const importing = importJob && (importJob.state === "queued" || importJob.state === "running");
+
   return (
     <Stack spacing={2}>
       <Typography variant="h4" fontWeight={700}>Cycling Coaching Dashboard</Typography>
-      <Typography color="text.secondary">Recent rides</Typography>
+      <Stack direction="row" spacing={2} alignItems="center">
+        <Button variant="contained" component="label" disabled={importing}>
+          Import rides
+          <input hidden multiple type="file" accept=".fit,.gz,.json,.zip" onChange={handleImport} />
+        </Button>
+        {importJob && (
+          <Typography color="text.secondary">
+            {importJob.done || 0}/{importJob.total || 0} files · {importJob.imported || 0} imported ·{" "}
+            {importJob.skipped || 0} skipped · {importJob.failed || 0} failed
+          </Typography>
+        )}
+      </Stack>
+      {importing && (
+        <LinearProgress
+          variant={importJob.total ? "determinate" : "indeterminate"}
+          value={importJob.total ? (100 * importJob.done) / importJob.total : 0}
+        />
+      )}
+      {importJob && importJob.error && <Alert severity="error">{importJob.error}</Alert>}
+      {importJob && importJob.errors && importJob.errors.length > 0 && (
+        <Alert severity="warning">
+          {importJob.errors.map((e) => (
+            <div key={e.file}>{e.file}: {e.error}</div>
+          ))}
+        </Alert>
+      )}
+      <Typography color="text.secondary">Recent rides{total ? ` (${total})` : ""}</Typography>
       {loading && <CircularProgress />}
       {!loading && rides && rides.length === 0 && <Typography>No rides found</Typography>}
       <Stack spacing={2}>
         {rides && rides.map((r) => (
-          <RideCard key={r.path || r.id} ride={r} onAnalyze={handleAnalyze} onDownload={handleDownload} />
+          <RideCard key={r.ride_id} ride={r} onAnalyze={handleAnalyze} onDownload={handleDownload} />
         ))}
       </Stack>
+      {cursor && !loading && (
+        <Button variant="outlined" onClick={() => loadPage(cursor)}>Load more</Button>
+      )}
     </Stack>
   );
 }
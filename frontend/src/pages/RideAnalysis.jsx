@@ -1,7 +1,14 @@
 import React, { useEffect, useState } from "react";
 import { useParams } from "react-router-dom";
-import { getRide, generateReport } from "../api";
-import { Typography, Button, Stack, CircularProgress, Paper } from "@mui/material";
+import { getRideStreams, generateReport } from "../api";
+import { Typography, Button, Stack, CircularProgress } from "@mui/material";
+import StreamChart from "../components/StreamChart";
+
+const STREAMS = [
+  { key: "watts", label: "Power (W)", color: "#f57c00" },
+  { key: "heartrate", label: "Heart Rate (bpm)", color: "#d32f2f" },
+  { key: "altitude", label: "Altitude (m)", color: "#388e3c" },
+];
 
 export default function RideAnalysis() {
   const { fname } = useParams();
@@ -9,7 +16,8 @@ export default function RideAnalysis() {
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    getRide(fname)
+    // charts only need ~1 point per pixel; the server decimates and caches them
+    getRideStreams(fname, STREAMS.map((s) => s.key), 1000)
       .then((d) => setData(d))
       .catch((e) => console.error(e))
       .finally(() => setLoading(false));
@@ -35,14 +43,13 @@ export default function RideAnalysis() {
 
   return (
     <Stack spacing={2}>
-      <Typography variant="h5" fontWeight={700}>{data.name || "Ride Analysis"}</Typography>
-      <Typography color="text.secondary">{data.start_date_local || data.start_date || ""}</Typography>
+      <Typography variant="h5" fontWeight={700}>{data.meta?.name || "Ride Analysis"}</Typography>
+      <Typography color="text.secondary">{data.meta?.start_date || ""}</Typography>
       <Button variant="contained" onClick={downloadPdf}>Generate & Download PDF</Button>
 
-      <Paper elevation={1} sx={{ p: 2, borderRadius: 2 }}>
-        <Typography variant="subtitle1" sx={{ mb: 1 }}>Raw JSON</Typography>
-        <pre style={{ whiteSpace: "pre-wrap", margin: 0 }}>{JSON.stringify(data, null, 2)}</pre>
-      </Paper>
+      {STREAMS.filter((s) => data.streams[s.key]).map((s) => (
+        <StreamChart key={s.key} label={s.label} color={s.color} x={data.streams[s.key].x} y={data.streams[s.key].y} />
+      ))}
     </Stack>
   );
 }
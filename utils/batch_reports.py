@@ -0,0 +1,175 @@
+# ===============================================================
+# 🗂️ BATCH REPORTS — a PDF per ride for a block/season, as one ZIP
+# ===============================================================
+#
+# The library-wide progress section (page 2 of every report) is computed
+# once and handed to every worker. Ride reports render in a process pool and
+# reuse the report cache (utils.report_jobs), and the ZIP is streamed
+# entry by entry as renders complete:
+#
+#   python -m utils.batch_reports out.zip [--start 2025-01-01] [--end ...]
+#                                         [--type Ride] [--workers N]
+
+import io
+import os
+import sys
+import zipfile
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils import catalog, thresholds
+from utils.report_jobs import report_key, report_path, render_report
+from utils.settings import get_ftp
+from utils.telemetry import timed
+
+
+def select_rides(ride_ids=None, start=None, end=None, types=None) -> list:
+    """Catalog rows for the batch, oldest first."""
+    return catalog.query_rides(ride_ids=ride_ids, start=start, end=end, types=types, order="date ASC")
+
+
+def _arcname(row: dict) -> str:
+    name = "".join(c if c.isalnum() or c in "-_" else "_" for c in (row.get("name") or "ride"))[:60]
+    return f"{row.get('date') or 'undated'}_{name}_{row['ride_id']}.pdf"
+
+
+def render_batch(rows: list, workers: int = None, ftp: float = None, hr_max: int = None,
+                 shared: dict = None, progress=None):
+    """Yield (arcname, pdf path) per ride as reports become available.
+
+    Cached reports are yielded first; the rest render in parallel with the
+    ``shared`` page-2 section (built here if not given). ``progress`` is
+    called with (done, total) after each ride. Unless given, each ride is
+    scored with the FTP and HR max in effect on its date, as in the catalog.
+    """
+    from utils.pdf_generator import build_progress
+
+    history = thresholds.histories()
+    dates = [row.get("date") for row in rows]
+    ftps = [ftp] * len(rows) if ftp else thresholds.values_at("ftp", dates, history["ftp"]).tolist()
+    hr_maxes = [hr_max] * len(rows) if hr_max else thresholds.values_at("hr_max", dates, history["hr_max"]).tolist()
+    todo, done = [], 0
+    for row, r_ftp, r_hr_max in zip(rows, ftps, map(int, hr_maxes)):
+        path = report_path(report_key(row["ride_id"], r_ftp, r_hr_max))
+        if os.path.exists(path):
+            done += 1
+            if progress:
+                progress(done, len(rows))
+            yield _arcname(row), path
+        else:
+            todo.append((row, r_ftp, r_hr_max, path))
+    if not todo:
+        return
+
+    shared = shared or build_progress(ftp or get_ftp())
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render_report, row["ride_id"], r_ftp, r_hr_max, path, shared): row
+                   for row, r_ftp, r_hr_max, path in todo}
+        for fut in as_completed(futures):
+            row = futures[fut]
+            done += 1
+            if progress:
+                progress(done, len(rows))
+            try:
+                yield _arcname(row), fut.result()
+            except Exception as e:
+                yield f"errors/{row['ride_id']}.txt", f"{type(e).__name__}: {e}".encode()
+
+
+@timed("report_render", kind="season")
+def season_summary(rows: list, title: str = "Season Summary", ftp: float = None, shared: dict = None) -> bytes:
+    """Combined season report (ride table + progress section) as PDF bytes."""
+    from utils.pdf_generator import generate_season_report
+
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        generate_season_report(rows, path, title=title, progress=shared, ftp=ftp or get_ftp())
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+# ===============================================================
+# 📦 STREAMED ZIP
+# ===============================================================
+
+class _Sink(io.RawIOBase):
+    """Write-only, unseekable buffer drained after each ZIP entry."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+def iter_zip(entries):
+    """Stream a ZIP built from (arcname, path-or-bytes) pairs, one chunk per entry.
+
+    PDFs are already compressed, so entries are stored rather than deflated.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as z:
+        for arcname, payload in entries:
+            if isinstance(payload, bytes):
+                z.writestr(arcname, payload)
+            else:
+                z.write(payload, arcname)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_batch_zip(ride_ids=None, start=None, end=None, types=None, workers: int = None,
+                   title: str = None, progress=None):
+    """Season summary + one report per selected ride, streamed as ZIP bytes."""
+    from utils.pdf_generator import build_progress
+
+    rows = select_rides(ride_ids, start, end, types)
+    ftp = get_ftp()
+    if title is None:
+        first = start or (rows[0]["date"] if rows else "")
+        last = end or (rows[-1]["date"] if rows else "")
+        title = f"Season Summary {first} – {last}".strip(" –")
+
+    def entries():
+        shared = build_progress(ftp)
+        yield "season_summary.pdf", season_summary(rows, title, ftp, shared)
+        yield from render_batch(rows, workers=workers, shared=shared, progress=progress)
+
+    return iter_zip(entries())
+
+
+def _cli(argv):
+    if not argv:
+        print("usage: python -m utils.batch_reports out.zip [--start D] [--end D] [--type T] [--workers N]")
+        return 2
+
+    def opt(name):
+        return argv[argv.index(name) + 1] if name in argv else None
+
+    workers = int(opt("--workers")) if opt("--workers") else None
+    types = opt("--type").split(",") if opt("--type") else None
+
+    def show(done, total):
+        print(f"\r🧾 {done}/{total} reports", end="", flush=True)
+
+    with open(argv[0], "wb") as f:
+        for chunk in iter_batch_zip(start=opt("--start"), end=opt("--end"), types=types,
+                                    workers=workers, progress=show):
+            f.write(chunk)
+    print(f"\n✅ Wrote {argv[0]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_cli(sys.argv[1:]))
@@ -0,0 +1,275 @@
+# ===============================================================
+# 📦 BULK IMPORT — directories / ZIP exports decoded across cores
+# ===============================================================
+#
+# Worker processes read and decode each file and compute its stream
+# metrics and power curve; the parent process is the only writer and
+# ingests results as they complete. At most WINDOW_PER_WORKER files per
+# worker are in flight, so memory stays flat however large the archive,
+# and FIT files already in the store (their id is the file's hash) are
+# skipped before any worker decodes them. Progress and per-file errors are kept
+# in ride_data/imports/<job_id>.json, served by ``POST /api/imports`` /
+# ``GET /api/imports/{job_id}`` (api/imports.py) and printed by the CLI:
+#
+#   python -m utils.bulk_import <dir-or-zip> [--workers N]
+
+import os
+import io
+import re
+import sys
+import gzip
+import json
+import time
+import uuid
+import hashlib
+import shutil
+import zipfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from utils import ride_store, catalog, pmc
+from utils.ingest import compute_derived, ingest_ride
+from utils.telemetry import count, task_flush
+
+IMPORT_DIR = "ride_data/imports"
+SUPPORTED = (".fit", ".fit.gz", ".json", ".json.gz")
+WINDOW_PER_WORKER = 2
+
+
+# ===============================================================
+# 📂 SOURCES
+# ===============================================================
+
+def _supported(name: str) -> bool:
+    return name.lower().endswith(SUPPORTED) and not os.path.basename(name).startswith(".")
+
+
+def list_entries(source: str) -> list:
+    """Importable files in a directory tree or ZIP archive."""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as z:
+            return sorted(n for n in z.namelist() if _supported(n))
+    entries = []
+    for root, _, files in os.walk(source):
+        entries += [os.path.relpath(os.path.join(root, f), source) for f in files if _supported(f)]
+    return sorted(entries)
+
+
+def _read_entry(source: str, entry: str) -> bytes:
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as z:
+            data = z.read(entry)
+    else:
+        with open(os.path.join(source, entry), "rb") as f:
+            data = f.read()
+    return gzip.decompress(data) if entry.lower().endswith(".gz") else data
+
+
+# ===============================================================
+# ⚙️ WORKER
+# ===============================================================
+
+def _ride_id_for(entry: str, raw: bytes, ride: dict) -> str:
+    """Collision-free id: Strava activity id when present, else the file's content hash."""
+    if _is_fit(entry):
+        return ride["_meta"]["id"]
+    if ride.get("id") is not None and ride.get("type"):
+        return f"activity_{ride['id']}"
+    return "ride_" + hashlib.sha1(raw).hexdigest()[:16]
+
+
+def _is_fit(entry: str) -> bool:
+    return entry.lower().endswith((".fit", ".fit.gz"))
+
+
+@task_flush
+def decode_entry(source: str, entry: str, hr_max: int = None, raw: bytes = None) -> tuple:
+    """Read (unless ``raw`` is given), decode and analyse one file (runs in a worker process)."""
+    from utils.fit_parser import decode_fit
+
+    raw = _read_entry(source, entry) if raw is None else raw
+    if _is_fit(entry):
+        f = io.BytesIO(raw)
+        f.name = os.path.basename(entry).replace(".gz", "")
+        ride = decode_fit(f)
+    else:
+        ride = json.loads(raw)
+    ride_id = _ride_id_for(entry, raw, ride)
+    derived = compute_derived(ride, hr_max) if "time" in ride else None
+    return ride_id, ride, derived
+
+
+# ===============================================================
+# 📊 JOB STATUS
+# ===============================================================
+
+class ImportJob:
+    """Progress + error report for one import, mirrored to a JSON status file."""
+
+    def __init__(self, source: str, job_id: str = None):
+        self.status = {
+            "job_id": job_id or uuid.uuid4().hex[:12],
+            "source": source,
+            "state": "running",
+            "total": 0,
+            "done": 0,
+            "imported": 0,
+            "skipped": 0,
+            "failed": 0,
+            "errors": [],
+            "ride_ids": [],
+            "started_at": time.time(),
+            "finished_at": None,
+        }
+        self._saved_at = 0.0
+
+    @property
+    def path(self) -> str:
+        return os.path.join(IMPORT_DIR, f"{self.status['job_id']}.json")
+
+    def save(self, force: bool = False):
+        now = time.time()
+        if not force and now - self._saved_at < 0.5:
+            return
+        os.makedirs(IMPORT_DIR, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.status, f)
+        os.replace(tmp, self.path)
+        self._saved_at = now
+
+
+def load_status(job_id: str) -> dict:
+    """Current status of an import job (as written by the importer); KeyError if unknown."""
+    path = os.path.join(IMPORT_DIR, f"{job_id}.json")
+    if not re.fullmatch(r"[0-9a-f]{12}", job_id) or not os.path.exists(path):
+        raise KeyError(job_id)
+    with open(path) as f:
+        return json.load(f)
+
+
+# ===============================================================
+# 🚀 RUN
+# ===============================================================
+
+def run_import(source: str, workers: int = None, skip_existing: bool = True,
+               progress=None, job: ImportJob = None) -> dict:
+    """Import every supported file under ``source`` (directory or ZIP).
+
+    ``progress`` is called with the status dict after each file.
+    """
+    from utils.fit_parser import fit_id
+
+    job = job or ImportJob(source)
+    st = job.status
+    st["state"] = "running"
+    entries = list_entries(source)
+    st["total"] = len(entries)
+    job.save(force=True)
+    earliest = None
+
+    def finish(entry, result, error=None):
+        st[result] += 1
+        count("import_files_total", result=result)
+        if error is not None:
+            st["errors"].append({"file": entry, "error": f"{type(error).__name__}: {error}"})
+        st["done"] += 1
+        job.save()
+        if progress:
+            progress(st)
+
+    pending = iter(entries)
+    window = WINDOW_PER_WORKER * (workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+
+        def refill():
+            for entry in pending:
+                raw = None
+                if _is_fit(entry):
+                    try:
+                        raw = _read_entry(source, entry)
+                    except Exception as e:
+                        finish(entry, "failed", e)
+                        continue
+                    if skip_existing and ride_store.ride_exists(fit_id(raw)):
+                        finish(entry, "skipped")
+                        continue
+                futures[pool.submit(decode_entry, source, entry, None, raw)] = entry
+                if len(futures) >= window:
+                    return
+
+        refill()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for fut in done:
+                entry = futures.pop(fut)
+                try:
+                    ride_id, ride, derived = fut.result()
+                    if skip_existing and ride_store.ride_exists(ride_id):
+                        finish(entry, "skipped")
+                        continue
+                    ingest_ride(ride, ride_id, derived=derived, refresh_pmc=False)
+                    st["ride_ids"].append(ride_id)
+                    day = catalog._parse_date((ride.get("_meta") or {}).get("start_date")
+                                              or ride.get("start_date_local") or ride.get("start_date"))
+                    if day and (earliest is None or day < earliest):
+                        earliest = day
+                except Exception as e:
+                    finish(entry, "failed", e)
+                    continue
+                finish(entry, "imported")
+            refill()
+
+    if earliest:
+        pmc.on_ride_changed(earliest)
+    st["state"] = "done"
+    st["finished_at"] = time.time()
+    job.save(force=True)
+    return st
+
+
+def start_import(source: str, workers: int = None, cleanup: str = None) -> dict:
+    """Run ``run_import`` on a background thread (e.g. for an upload); poll ``load_status``.
+
+    ``cleanup`` (a directory or file, e.g. the upload) is deleted once the import ends.
+    """
+    job = ImportJob(source)
+    job.status["state"] = "queued"
+    job.save(force=True)
+
+    def run():
+        try:
+            run_import(source, workers=workers, job=job)
+        except Exception as e:
+            job.status.update(state="failed", error=f"{type(e).__name__}: {e}", finished_at=time.time())
+            job.save(force=True)
+        finally:
+            if cleanup and os.path.isdir(cleanup):
+                shutil.rmtree(cleanup, ignore_errors=True)
+            elif cleanup and os.path.exists(cleanup):
+                os.remove(cleanup)
+
+    threading.Thread(target=run, name=f"import-{job.status['job_id']}", daemon=True).start()
+    return dict(job.status)
+
+
+def _cli(argv):
+    if not argv:
+        print("usage: python -m utils.bulk_import <dir-or-zip> [--workers N]")
+        return 2
+    workers = int(argv[argv.index("--workers") + 1]) if "--workers" in argv else None
+
+    def show(st):
+        print(f"\r📥 {st['done']}/{st['total']}  imported {st['imported']}  "
+              f"skipped {st['skipped']}  failed {st['failed']}", end="", flush=True)
+
+    st = run_import(argv[0], workers=workers, progress=show)
+    print()
+    for err in st["errors"]:
+        print(f"⚠️ {err['file']}: {err['error']}")
+    print(f"✅ Job {st['job_id']} finished in {st['finished_at'] - st['started_at']:.1f}s")
+    return 1 if st["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_cli(sys.argv[1:]))
@@ -0,0 +1,356 @@
+# ===============================================================
+# 📇 RIDE CATALOG — one SQLite row per ride
+# ===============================================================
+#
+# Listing, PMC and the PDF progress page read summary fields from here
+# instead of opening every ride. Ingest keeps rows current; the whole
+# catalog can be rebuilt from the ride store at any time.
+
+import os
+import sys
+import json
+import time
+import base64
+import sqlite3
+import numpy as np
+from datetime import datetime
+from utils import ride_store, thresholds
+from utils.telemetry import timed, count
+
+CATALOG_PATH = "ride_data/catalog.sqlite"
+
+COLUMNS = [
+    "ride_id", "date", "start_date", "name", "type", "distance_m", "moving_time_s",
+    "average_watts", "average_heartrate", "np_power", "tss", "tss_ftp", "mtime", "content_hash", "np_seconds",
+]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rides (
+    ride_id TEXT PRIMARY KEY,
+    date TEXT,
+    start_date TEXT,
+    name TEXT,
+    type TEXT,
+    distance_m REAL,
+    moving_time_s REAL,
+    average_watts REAL,
+    average_heartrate REAL,
+    np_power REAL,
+    tss REAL,
+    tss_ftp REAL,
+    mtime REAL,
+    content_hash TEXT,
+    np_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS rides_date ON rides(date);
+CREATE INDEX IF NOT EXISTS rides_sort_date ON rides(IFNULL(start_date, ''), ride_id);
+CREATE INDEX IF NOT EXISTS rides_sort_distance ON rides(IFNULL(distance_m, -1), ride_id);
+CREATE INDEX IF NOT EXISTS rides_sort_tss ON rides(IFNULL(tss, -1), ride_id);
+CREATE INDEX IF NOT EXISTS rides_sort_duration ON rides(IFNULL(moving_time_s, -1), ride_id);
+CREATE TABLE IF NOT EXISTS catalog_info (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+# listing sort name → key expression (matches an index above; NULLs sort lowest)
+SORTS = {
+    "date": "IFNULL(start_date, '')",
+    "distance": "IFNULL(distance_m, -1)",
+    "tss": "IFNULL(tss, -1)",
+    "duration": "IFNULL(moving_time_s, -1)",
+}
+
+SUMMARY_COLUMNS = [
+    "ride_id", "date", "start_date", "name", "type", "distance_m", "moving_time_s",
+    "average_watts", "average_heartrate", "np_power", "tss",
+]
+
+
+def connect() -> sqlite3.Connection:
+    """Open the catalog (creating it if needed)."""
+    os.makedirs(os.path.dirname(CATALOG_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(CATALOG_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+    if "np_seconds" not in {r["name"] for r in conn.execute("PRAGMA table_info(rides)")}:
+        # catalogs created before rides kept FTP-independent stats; rows fill in on rebuild
+        conn.execute("ALTER TABLE rides ADD COLUMN np_seconds REAL")
+    return conn
+
+
+# ===============================================================
+# 🧮 ROW BUILDING
+# ===============================================================
+
+def _ride_mtime(ride_id: str) -> float:
+    for path in (os.path.join(ride_store.ride_dir(ride_id), ride_store.META_FILE), ride_store._legacy_path(ride_id)):
+        if os.path.exists(path):
+            return os.path.getmtime(path)
+    return 0.0
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).date().isoformat()
+    except Exception:
+        return None
+
+
+def build_row(ride_id: str, summary: dict = None, ftp: float = None) -> dict:
+    """Compute a catalog row from a ride's summary and cached metrics."""
+    from utils.metrics_cache import cached_ride_metrics
+
+    ride_id = ride_store.ride_id_from_name(ride_id)
+    summary = summary if summary is not None else ride_store.load_meta(ride_id)
+    m = summary.get("_meta", {})
+    day = _parse_date(m.get("start_date"))
+    ftp = ftp or thresholds.value_at("ftp", day)
+
+    metrics = cached_ride_metrics(ride_id, ftp=ftp)
+    np_power = metrics.get("np_power")
+    np_power = None if np_power is None or np.isnan(np_power) else np_power
+
+    moving = float(m.get("moving_time_s") or 0)
+    np_seconds = metrics.get("np_seconds") or moving
+    tss = thresholds.training_stress(np_power, np_seconds, ftp)[1] if np_power and np_seconds else None
+    content_hash = (summary.get("_store") or {}).get("hash")
+    if content_hash is None:
+        content_hash = ride_store.content_hash(ride_store.load_streams(ride_id))
+
+    return {
+        "ride_id": ride_id,
+        "date": day,
+        "start_date": m.get("start_date"),
+        "name": m.get("name"),
+        "type": m.get("type"),
+        "distance_m": m.get("distance_m"),
+        "moving_time_s": moving,
+        "average_watts": m.get("average_watts"),
+        "average_heartrate": m.get("average_heartrate"),
+        "np_power": np_power,
+        "tss": tss,
+        "tss_ftp": ftp,
+        "mtime": _ride_mtime(ride_id),
+        "content_hash": content_hash,
+        "np_seconds": np_seconds if np_power else None,
+    }
+
+
+# ===============================================================
+# ✍️ WRITE
+# ===============================================================
+
+def upsert_rows(rows: list, conn: sqlite3.Connection = None):
+    if not rows:
+        return
+    own = conn is None
+    conn = conn or connect()
+    with conn:
+        conn.executemany(
+            f"INSERT OR REPLACE INTO rides ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+            [[r.get(c) for c in COLUMNS] for r in rows],
+        )
+        _touch(conn)
+    if own:
+        conn.close()
+
+
+def upsert_ride(ride_id: str, summary: dict = None):
+    """Insert or refresh one ride's catalog row (and return it)."""
+    row = build_row(ride_id, summary)
+    upsert_rows([row])
+    return row
+
+
+def remove_ride(ride_id: str):
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM rides WHERE ride_id = ?", (ride_store.ride_id_from_name(ride_id),))
+        _touch(conn)
+    conn.close()
+
+
+def rescore(ftp: float = None):
+    """Re-score every row's TSS under ``ftp`` (default: the dated FTP history) in one pass."""
+    conn = connect()
+    rows = conn.execute("SELECT ride_id, date, np_power, np_seconds, moving_time_s FROM rides "
+                        "WHERE np_power IS NOT NULL").fetchall()
+    if rows:
+        ftps = np.full(len(rows), float(ftp)) if ftp else thresholds.values_at("ftp", [r["date"] for r in rows])
+        seconds = [r["np_seconds"] or r["moving_time_s"] or 0 for r in rows]
+        _, tss = thresholds.training_stress([r["np_power"] for r in rows], seconds, ftps)
+        with conn:
+            conn.executemany("UPDATE rides SET tss = ?, tss_ftp = ? WHERE ride_id = ?",
+                             [(float(t) if t else None, float(f), r["ride_id"]) for t, f, r in zip(tss, ftps, rows)])
+            _touch(conn)
+    conn.close()
+    return len(rows)
+
+
+def _touch(conn: sqlite3.Connection):
+    """Record that rows changed (drives listing ETag / Last-Modified)."""
+    conn.execute("INSERT OR REPLACE INTO catalog_info VALUES ('changed_at', ?)", (repr(time.time()),))
+
+
+def rebuild_catalog(full: bool = False, verbose: bool = False) -> int:
+    """Sync the catalog with the store; only changed rides are re-read unless ``full``."""
+    conn = connect()
+    known = {r["ride_id"]: r["mtime"] for r in conn.execute("SELECT ride_id, mtime FROM rides")}
+    ids = ride_store.list_ride_ids()
+    rows = []
+    for ride_id in ids:
+        if not full and known.get(ride_id) == _ride_mtime(ride_id):
+            continue
+        try:
+            rows.append(build_row(ride_id))
+        except Exception as e:
+            count("rebuild_errors_total", index="catalog")
+            if verbose:
+                print(f"⚠️ Could not catalog {ride_id}: {e}")
+    upsert_rows(rows, conn)
+    stale = set(known) - set(ids)
+    with conn:
+        conn.executemany("DELETE FROM rides WHERE ride_id = ?", [(r,) for r in stale])
+        conn.execute("INSERT OR REPLACE INTO catalog_info VALUES ('built_at', ?)", (datetime.now().isoformat(),))
+        if rows or stale:
+            # derived daily series (utils.pmc) must be recomputed
+            conn.execute("DELETE FROM catalog_info WHERE key = 'pmc_params'")
+            _touch(conn)
+    conn.close()
+    if verbose:
+        print(f"✅ Catalog updated: {len(rows)} rides refreshed, {len(stale)} removed")
+    return len(rows)
+
+
+def _ensure_built(conn: sqlite3.Connection):
+    """First use on an existing library: build the catalog from disk."""
+    if conn.execute("SELECT 1 FROM catalog_info WHERE key = 'built_at'").fetchone() is None:
+        rebuild_catalog()
+
+
+# ===============================================================
+# 🔎 QUERY
+# ===============================================================
+
+@timed("catalog_query", query="query_rides")
+def query_rides(ride_ids=None, start=None, end=None, types=None, order: str = "date DESC") -> list:
+    """Catalog rows as dicts, filtered by id list, date range and ride type."""
+    conn = connect()
+    _ensure_built(conn)
+    where, params = [], []
+    wanted = None
+    if ride_ids is not None:
+        wanted = {ride_store.ride_id_from_name(r) for r in ride_ids}
+        if len(wanted) <= 500:
+            where.append(f"ride_id IN ({', '.join('?' * len(wanted))})")
+            params += sorted(wanted)
+    if start is not None:
+        where.append("date >= ?")
+        params.append(str(start))
+    if end is not None:
+        where.append("date <= ?")
+        params.append(str(end))
+    if types:
+        where.append(f"type IN ({', '.join('?' * len(types))})")
+        params += list(types)
+    sql = "SELECT * FROM rides"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    if order in ("date DESC", "date ASC", "ride_id DESC"):
+        sql += f" ORDER BY {order}, ride_id"
+    rows = [dict(r) for r in conn.execute(sql, params)]
+    conn.close()
+    if wanted is not None:
+        rows = [r for r in rows if r["ride_id"] in wanted]
+    return rows
+
+
+def changed_at() -> float:
+    """Unix time of the last catalog change (0 if never written)."""
+    conn = connect()
+    _ensure_built(conn)
+    row = conn.execute("SELECT value FROM catalog_info WHERE key = 'changed_at'").fetchone()
+    conn.close()
+    return float(row["value"]) if row else 0.0
+
+
+def _encode_cursor(sort: str, desc: bool, value, ride_id: str) -> str:
+    raw = json.dumps([sort, desc, value, ride_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str, desc: bool):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        c_sort, c_desc, value, ride_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if c_sort != sort or c_desc != desc:
+        raise ValueError("Cursor does not match the requested sort")
+    return value, ride_id
+
+
+@timed("catalog_query", query="page_rides")
+def page_rides(sort: str = "date", desc: bool = True, limit: int = 50, cursor: str = None,
+               start=None, end=None, types=None, min_distance=None, max_distance=None,
+               min_tss=None, max_tss=None) -> dict:
+    """One page of ride summaries with keyset pagination.
+
+    Returns {"rides", "next_cursor", "total"}; pass ``next_cursor`` back to
+    get the following page. Each page is an index range scan, so its cost
+    does not grow with the library.
+    """
+    if sort not in SORTS:
+        raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+    key = SORTS[sort]
+    where, params = [], []
+    for clause, value in (("date >= ?", start), ("date <= ?", end),
+                          ("distance_m >= ?", min_distance), ("distance_m <= ?", max_distance),
+                          ("tss >= ?", min_tss), ("tss <= ?", max_tss)):
+        if value is not None:
+            where.append(clause)
+            params.append(value if isinstance(value, (int, float)) else str(value))
+    if types:
+        where.append(f"type IN ({', '.join('?' * len(types))})")
+        params += list(types)
+
+    conn = connect()
+    _ensure_built(conn)
+    filters = " WHERE " + " AND ".join(where) if where else ""
+    total = conn.execute(f"SELECT COUNT(*) FROM rides{filters}", params).fetchone()[0]
+
+    page_where, page_params = list(where), list(params)
+    if cursor:
+        value, ride_id = _decode_cursor(cursor, sort, desc)
+        op = "<" if desc else ">"
+        page_where.append(f"({key} {op} ? OR ({key} = ? AND ride_id {op} ?))")
+        page_params += [value, value, ride_id]
+    direction = "DESC" if desc else "ASC"
+    sql = (f"SELECT {', '.join(SUMMARY_COLUMNS)}, {key} AS _key FROM rides"
+           + (" WHERE " + " AND ".join(page_where) if page_where else "")
+           + f" ORDER BY {key} {direction}, ride_id {direction} LIMIT ?")
+    rows = [dict(r) for r in conn.execute(sql, page_params + [limit + 1])]
+    conn.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(sort, desc, rows[-1]["_key"], rows[-1]["ride_id"])
+    for r in rows:
+        del r["_key"]
+    return {"rides": rows, "next_cursor": next_cursor, "total": total}
+
+
+def rides_dataframe(**filters):
+    """Catalog rows as a pandas DataFrame (columns always present)."""
+    import pandas as pd
+
+    return pd.DataFrame(query_rides(**filters), columns=COLUMNS)
+
+
+if __name__ == "__main__":
+    # python -m utils.catalog rebuild [--full]
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        rebuild_catalog(full="--full" in sys.argv, verbose=True)
+    else:
+        print("usage: python -m utils.catalog rebuild [--full]")
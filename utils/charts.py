@@ -0,0 +1,57 @@
+# ===============================================================
+# 📈 CHARTS — report figures via matplotlib's object-oriented API
+# ===============================================================
+#
+# Each chart builds its own Figure on an Agg canvas (no pyplot state
+# machine), so renders are safe in threads and worker processes. Series
+# are decimated to about two points per output pixel before plotting and
+# figures are returned as in-memory PNG buffers — nothing touches disk.
+
+import io
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from utils.decimate import decimate
+
+DPI = 150
+
+
+def _png(fig: Figure, dpi: int = DPI) -> io.BytesIO:
+    FigureCanvasAgg(fig)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi)
+    buf.seek(0)
+    return buf
+
+
+def _points(width_in: float, dpi: int) -> int:
+    return int(width_in * dpi) * 2  # min/max pairs: one per pixel column
+
+
+def ride_chart(df, cols, width_in: float = 6.2, height_in: float = 3, dpi: int = DPI) -> io.BytesIO:
+    """Power / HR / speed over time (the report's page-1 chart)."""
+    fig = Figure(figsize=(width_in, height_in))
+    ax = fig.add_subplot()
+    x = df["time_s"].to_numpy(dtype=np.float64)
+    for col in cols:
+        dx, dy = decimate(x, df[col].to_numpy(dtype=np.float64), _points(width_in, dpi), "minmax")
+        ax.plot(dx, dy, label=col.capitalize())
+    ax.set_xlabel("Time (s)")
+    ax.set_ylabel("Value")
+    ax.set_title("Ride Data")
+    ax.legend()
+    fig.tight_layout()
+    return _png(fig, dpi)
+
+
+def trend_chart(weekly, width_in: float = 6, height_in: float = 3, dpi: int = DPI) -> io.BytesIO:
+    """Weekly distance and TSS (the report's page-2 chart)."""
+    fig = Figure(figsize=(width_in, height_in))
+    ax = fig.add_subplot()
+    ax.plot(weekly["date"], weekly["distance_km"], label="Weekly Distance (km)")
+    ax.plot(weekly["date"], weekly["tss"], label="Weekly TSS")
+    ax.set_title("Training Volume & Stress Trends")
+    ax.set_xlabel("Week")
+    ax.legend()
+    fig.tight_layout()
+    return _png(fig, dpi)
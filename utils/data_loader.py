@@ -1,25 +1,39 @@
-import os, json, pandas as pd
-RAW_DIR='ride_data/raw'
+import numpy as np, pandas as pd
+from utils import ride_store, catalog, histograms, intervals, zones
+from utils.settings import get_ftp, get_hr_max
+RAW_DIR=ride_store.RAW_DIR
 def list_rides():
     rows=[]
-    if not os.path.exists(RAW_DIR): return pd.DataFrame()
-    for f in sorted(os.listdir(RAW_DIR),reverse=True):
-        if not f.endswith('.json'): continue
-        try: data=json.load(open(os.path.join(RAW_DIR,f)))
-        except: continue
-        m=data.get('_meta',{})
-        if not m or not m.get('name') or m['name'].lower().startswith('unnamed'): continue
-        rows.append({'Activity':m['name'],'File':f,
-                     'Distance (mi)':round((m.get('distance_m',0))/1609.34,2),
-                     'Avg Power (W)':m.get('average_watts',0),
-                     'Avg HR (bpm)':m.get('average_heartrate',0)})
+    for m in catalog.query_rides(order='ride_id DESC'):
+        if not m.get('name') or m['name'].lower().startswith('unnamed'): continue
+        rows.append({'Activity':m['name'],'File':m['ride_id'],
+                     'Distance (mi)':round((m.get('distance_m') or 0)/1609.34,2),
+                     'Avg Power (W)':m.get('average_watts') or 0,
+                     'Avg HR (bpm)':m.get('average_heartrate') or 0})
     return pd.DataFrame(rows)
 def stream_values(df,key):
     vals=[]
-    for _,r in df.iterrows():
-        p=os.path.join(RAW_DIR,r['File'])
-        try:
-            d=json.load(open(p))
-            if key in d: vals+=d[key]['data']
+    for rid in df['File'] if 'File' in df else []:
+        try: s=ride_store.load_streams(rid,[key])
         except: continue
-    return vals
+        if key in s: vals.append(np.asarray(s[key]))
+    return np.concatenate(vals) if vals else np.array([])
+def stream_histogram(df,key,start=None,end=None):
+    # binned distribution summed from per-ride histograms; no stream is loaded
+    ids=list(df['File']) if df is not None and 'File' in df else None
+    return histograms.histogram(key,ride_ids=ids,start=start,end=end)
+def zone_rollups(kind='power',period='week',start=None,end=None,threshold=None):
+    # weekly/monthly time in zone (hours) from stored rollups; no stream is loaded
+    threshold=threshold or (get_ftp() if kind=='power' else get_hr_max())
+    rows=zones.rollups(kind,threshold,period,start,end)
+    df=pd.DataFrame([[r['start'],r['rides']]+[s/3600 for s in r['seconds']] for r in rows],
+                    columns=['start','rides']+zones.labels(kind))
+    df['start']=pd.to_datetime(df['start'])
+    return df
+def ride_intervals(ride_id,kind=None):
+    # detected efforts / peak windows for the Ride Analysis tab; stored at ingest
+    return pd.DataFrame(intervals.for_ride(ride_id,kind),columns=intervals.FIELDS+['ftp'])
+def find_intervals(kind='effort',min_duration=None,max_duration=None,min_power=None,start=None,end=None,limit=100):
+    # library-wide interval search (e.g. 5-min peaks above 300 W this year); no stream is loaded
+    rows=intervals.search(kind,min_duration,max_duration,min_power,None,start,end,limit=limit)
+    return pd.DataFrame(rows,columns=['ride_id','date','ftp']+intervals.FIELDS)
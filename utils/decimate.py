@@ -0,0 +1,123 @@
+# ===============================================================
+# 📉 DECIMATE — shape-preserving downsampling for chart streams
+# ===============================================================
+#
+# Two methods, both NumPy over whole buckets:
+#   • "lttb"   Largest-Triangle-Three-Buckets: one point per bucket, the
+#              one spanning the largest triangle with its neighbours
+#   • "minmax" min and max of every bucket (keeps every spike)
+#
+# Requested sizes snap up to a few fixed levels, and each (ride, key,
+# method, level) result is cached under ride_data/cache/decimated/<hash>/,
+# so repeat views of a ride are a single .npy read.
+
+import os
+import numpy as np
+from utils import ride_store
+
+CACHE_DIR = "ride_data/cache/decimated"
+LEVELS = (250, 500, 1000, 2000, 4000)
+METHODS = ("lttb", "minmax")
+
+
+# ===============================================================
+# 🧮 ALGORITHMS
+# ===============================================================
+
+def _clean(x, y):
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    ok = ~(np.isnan(x) | np.isnan(y))
+    return (x, y) if ok.all() else (x[ok], y[ok])
+
+
+def lttb(x, y, n: int) -> np.ndarray:
+    """Indices of the ``n`` points LTTB keeps (first and last always included)."""
+    m = len(y)
+    if n >= m or n < 3:
+        return np.arange(m)
+    # bucket boundaries for the n - 2 inner buckets
+    bounds = np.floor(np.linspace(1, m - 1, n - 1)).astype(np.int64)
+    # each bucket's average point is the "next" vertex of the previous bucket's triangle
+    cx = np.add.reduceat(x[1:m - 1], bounds[:-1] - 1) / np.diff(bounds)
+    cy = np.add.reduceat(y[1:m - 1], bounds[:-1] - 1) / np.diff(bounds)
+    cx, cy = np.append(cx[1:], x[-1]), np.append(cy[1:], y[-1])
+    keep = np.empty(n, dtype=np.int64)
+    keep[0], keep[-1] = 0, m - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = bounds[i], bounds[i + 1]
+        # twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((x[a] - cx[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy[i] - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def minmax(x, y, n: int) -> np.ndarray:
+    """Indices of each bucket's min and max (``n // 2`` buckets), in order."""
+    m = len(y)
+    buckets = max(n // 2, 1)
+    if n >= m:
+        return np.arange(m)
+    size = -(-m // buckets)
+    pad = size * buckets - m
+    grid = np.concatenate([y, np.full(pad, np.nan)]).reshape(buckets, size)
+    base = np.arange(buckets) * size
+    lo = base + np.where(np.isnan(grid), np.inf, grid).argmin(axis=1)
+    hi = base + np.where(np.isnan(grid), -np.inf, grid).argmax(axis=1)
+    idx = np.unique(np.concatenate([lo, hi, [0, m - 1]]))
+    return idx[idx < m]
+
+
+def decimate(x, y, n: int, method: str = "lttb") -> tuple:
+    """(x, y) reduced to about ``n`` points; NaN samples are dropped first."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown decimation method: {method}")
+    x, y = _clean(x, y)
+    idx = (lttb if method == "lttb" else minmax)(x, y, n)
+    return x[idx], y[idx]
+
+
+# ===============================================================
+# 💾 CACHED PER-RIDE LEVELS
+# ===============================================================
+
+def level_for(points: int) -> int:
+    """Smallest cached level that covers ``points`` (capped at the largest)."""
+    return next((lv for lv in LEVELS if lv >= points), LEVELS[-1])
+
+
+def _cache_path(content_hash: str, key: str, method: str, level: int) -> str:
+    return os.path.join(CACHE_DIR, content_hash, f"{key}.{method}.{level}.npy")
+
+
+def ride_streams(ride_id: str, keys, points: int = 1000, method: str = "lttb") -> dict:
+    """Decimated {key: (x, y)} for a stored ride, x being elapsed seconds."""
+    level = level_for(points)
+    content_hash = (ride_store.load_meta(ride_id).get("_store") or {}).get("hash")
+    out, missing = {}, []
+    for key in keys:
+        path = _cache_path(content_hash, key, method, level) if content_hash else None
+        if path and os.path.exists(path):
+            xy = np.load(path)
+            out[key] = (xy[0], xy[1])
+        else:
+            missing.append(key)
+    if not missing:
+        return out
+
+    streams = ride_store.load_streams(ride_id, ["time"] + missing)
+    for key in missing:
+        if key not in streams or key == "latlng":
+            continue
+        y = streams[key]
+        x = streams.get("time", np.arange(len(y)))
+        x, y = decimate(x[:len(y)], y[:len(x)], level, method)
+        out[key] = (x, y)
+        if content_hash:
+            path = _cache_path(content_hash, key, method, level)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = path + ".tmp.npy"
+            np.save(tmp, np.vstack([x, y]))
+            os.replace(tmp, path)
+    return out
@@ -1,25 +1,167 @@
 from fitparse import FitFile
-import pandas as pd, numpy as np, io, time
+from fitparse.processors import FitFileDataProcessor, UTC_REFERENCE
+from datetime import datetime, timezone
+import numpy as np, hashlib, struct, warnings
+from utils.telemetry import timed
+
+# record field → column; speed/altitude prefer their enhanced_* variants
+_FIELDS={'timestamp':0,'power':1,'heart_rate':2,'speed':3,'enhanced_speed':3,'distance':4,'cadence':5,
+         'altitude':6,'enhanced_altitude':6,'position_lat':7,'position_long':8,'temperature':9}
+_NCOLS=10
+_CHUNK=4096
+_SEMICIRCLE_DEG=180.0/2**31
+
+# ===============================================================
+# ⚡ NATIVE PATH — runs of record messages decoded with np.frombuffer
+# ===============================================================
+
+# record (global 20) field number → (name, scale, offset), per the FIT profile
+_RECORD_PROFILE={253:('timestamp',1,0),0:('position_lat',1,0),1:('position_long',1,0),2:('altitude',5,500),
+                 78:('enhanced_altitude',5,500),3:('heart_rate',1,0),4:('cadence',1,0),5:('distance',100,0),
+                 6:('speed',1000,0),73:('enhanced_speed',1000,0),7:('power',1,0),13:('temperature',1,0)}
+# base type → (numpy type, invalid value)
+_BASE_TYPES={0x00:('u1',0xFF),0x01:('i1',0x7F),0x02:('u1',0xFF),0x83:('i2',0x7FFF),0x84:('u2',0xFFFF),
+             0x85:('i4',0x7FFFFFFF),0x86:('u4',0xFFFFFFFF),0x0A:('u1',0),0x8B:('u2',0),0x8C:('u4',0)}
+_RECORD=20
+
+class _Unsupported(Exception):
+    """Layout the native path does not handle; decode with fitparse instead."""
+
+def _definition(buf,pos,hdr):
+    arch=buf[pos+2]; e='>' if arch else '<'
+    gnum=struct.unpack_from(e+'H',buf,pos+3)[0]; nf=buf[pos+5]; p=pos+6
+    names,fmts,invalid,off=['hdr'],['u1'],{},1
+    for i in range(nf):
+        num,size,bt=buf[p],buf[p+1],buf[p+2]; p+=3
+        prof=_RECORD_PROFILE.get(num) if gnum==_RECORD else None
+        base=_BASE_TYPES.get(bt)
+        if prof and base and np.dtype(base[0]).itemsize==size:
+            names.append(prof[0]); fmts.append(e+base[0]); invalid[prof[0]]=base[1]
+        else:
+            names.append(f'_skip{i}'); fmts.append(f'V{size}')
+        off+=size
+    if hdr&0x20:  # developer fields: sized but never decoded
+        for i in range(buf[p]):
+            names.append(f'_dev{i}'); fmts.append(f'V{buf[p+2+3*i]}'); off+=buf[p+2+3*i]
+        p+=1+3*buf[p]
+    return p,(gnum,off,np.dtype({'names':names,'formats':fmts}),invalid)
+
+def _record_chunk(recs,invalid):
+    out=np.full((len(recs),_NCOLS),np.nan)
+    for num,(name,scale,offset) in _RECORD_PROFILE.items():
+        if name not in invalid: continue
+        raw=recs[name]; v=raw.astype(np.float64)
+        v[raw==invalid[name]]=np.nan
+        if scale!=1 or offset: v=v/scale-offset
+        c=_FIELDS[name]
+        if name.startswith('enhanced_'): out[:,c]=np.where(np.isnan(v),out[:,c],v)
+        else: out[:,c]=np.where(np.isnan(out[:,c]),v,out[:,c])
+    return out
+
+def _decode_native(buf):
+    """Decode record messages from a whole FIT buffer (chained files included)."""
+    arr=np.frombuffer(buf,dtype=np.uint8); chunks=[]; start=0
+    while start+12<=len(buf):
+        hsize=buf[start]; dsize=struct.unpack_from('<I',buf,start+4)[0]
+        if buf[start+8:start+12]!=b'.FIT': raise _Unsupported('bad header')
+        pos,end,defs=start+hsize,start+hsize+dsize,{}
+        if end>len(buf): raise _Unsupported('truncated')
+        while pos<end:
+            h=buf[pos]
+            if h&0x80: raise _Unsupported('compressed timestamp header')
+            if h&0x40:
+                pos,defs[h&0x0F]=_definition(buf,pos,h); continue
+            d=defs.get(h&0x0F)
+            if d is None: raise _Unsupported('data before definition')
+            gnum,size,dt,invalid=d
+            if gnum!=_RECORD:
+                pos+=size; continue
+            k=(end-pos)//size
+            miss=np.flatnonzero(arr[pos:pos+k*size:size]!=h)
+            k=int(miss[0]) if len(miss) else k
+            chunks.append(_record_chunk(np.frombuffer(buf,dtype=dt,count=k,offset=pos),invalid))
+            pos+=k*size
+        start=end+2
+    return np.concatenate(chunks) if chunks else np.empty((0,_NCOLS))
+
+# ===============================================================
+# 🐢 FITPARSE PATH — streaming collector for everything else
+# ===============================================================
+
+class _NoCache(list):
+    """FitFile keeps every parsed message; records are consumed as they stream by."""
+    def append(self,_): pass
+
+class _RecordCollector(FitFileDataProcessor):
+    """Write record messages straight into preallocated float64 chunks."""
+    def __init__(self):
+        self.chunks=[]; self.buf=np.full((_CHUNK,_NCOLS),np.nan); self.n=0
+    def process_type_date_time(self,field_data):
+        pass  # keep raw FIT seconds; converted once, vectorized
+    def process_message_record(self,msg):
+        if self.n==_CHUNK:
+            self.chunks.append(self.buf); self.buf=np.full((_CHUNK,_NCOLS),np.nan); self.n=0
+        row=self.buf[self.n]
+        for fd in msg.fields:
+            c=_FIELDS.get(fd.name)
+            if c is not None and fd.value is not None and not isinstance(fd.value,tuple): row[c]=fd.value
+        self.n+=1
+    def array(self):
+        return np.concatenate(self.chunks+[self.buf[:self.n]])
+
+def _decode_fitparse(buf):
+    import io
+    proc=_RecordCollector()
+    f=FitFile(io.BytesIO(buf),data_processor=proc)
+    f._messages=_NoCache()
+    f.parse()
+    return proc.array()
+
+# ===============================================================
+# 📦 PUBLIC API
+# ===============================================================
+
+def _quiet(fn,a):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore',RuntimeWarning)
+        return float(fn(a)) if len(a) else np.nan
+
+def _read(file):
+    if isinstance(file,(bytes,bytearray)): return bytes(file),'ride'
+    if isinstance(file,str):
+        with open(file,'rb') as f: return f.read(),file
+    return file.read(),getattr(file,'name','ride')
+
+def fit_id(buf):
+    """Ride id of a FIT file: derived from its bytes, so it is known before decoding."""
+    return "fit_"+hashlib.sha1(buf).hexdigest()[:16]
+
+@timed('parse',format='fit')
+def decode_fit(file):
+    """Decode a FIT file's record messages into typed NumPy streams (Strava layout)."""
+    buf,name=_read(file)
+    try: a=_decode_native(buf)
+    except (_Unsupported,struct.error,ValueError,IndexError): a=_decode_fitparse(buf)
+    a=a[~np.isnan(a[:,0])]
+    if not len(a): raise ValueError('No timestamp data.')
+    ts=a[:,0]; time_s=ts-ts[0]
+    p,h,s,d=a[:,1],a[:,2],a[:,3],a[:,4]
+    start=datetime.fromtimestamp(UTC_REFERENCE+ts[0],tz=timezone.utc).replace(tzinfo=None)
+    # content-derived id: re-importing a file is idempotent and two files never collide
+    meta={"id":fit_id(buf),"name":str(name).rsplit('/',1)[-1].replace('.fit',''),
+          "distance_m":_quiet(np.nanmax,d),"moving_time_s":float(time_s[-1]),
+          "average_watts":_quiet(np.nanmean,p),"average_heartrate":_quiet(np.nanmean,h),
+          "start_date":start.isoformat(),"type":"Ride"}
+    out={"time":{"data":time_s},"watts":{"data":p},"heartrate":{"data":h},
+         "velocity_smooth":{"data":s},"distance":{"data":d},"_meta":meta}
+    # fields the legacy parser dropped; only kept when the device recorded them
+    for key,col in (('cadence',5),('altitude',6),('temp',9)):
+        if not np.isnan(a[:,col]).all(): out[key]={"data":a[:,col].copy()}
+    if not np.isnan(a[:,7]).all():
+        out["latlng"]={"data":np.column_stack([a[:,7],a[:,8]])*_SEMICIRCLE_DEG}
+    return out
+
 def parse_fit_to_json(file):
-    f=FitFile(io.BytesIO(file.read()))
-    t,p,h,s,d=[],[],[],[],[]
-    start=None
-    for r in f.get_messages('record'):
-        v={d.name:d.value for d in r}
-        if 'timestamp' in v:
-            t.append(pd.to_datetime(v['timestamp']).tz_localize(None))
-            if start is None: start=t[-1]
-        p.append(float(v.get('power',np.nan)))
-        h.append(float(v.get('heart_rate',np.nan)))
-        s.append(float(v.get('speed',np.nan)))
-        d.append(float(v.get('distance',np.nan)))
-    if not t: raise ValueError('No timestamp data.')
-    t0=pd.Series(t); time_s=(t0-t0.iloc[0]).dt.total_seconds().tolist()
-    avg_pw=np.nanmean(p); avg_hr=np.nanmean(h); dist=np.nanmax(d)
-    dur=time_s[-1] if time_s else 0
-    meta={"id":str(int(time.time())),"name":file.name.replace('.fit',''),
-          "distance_m":float(dist),"moving_time_s":float(dur),
-          "average_watts":float(avg_pw),"average_heartrate":float(avg_hr),
-          "start_date":pd.to_datetime(start).isoformat(),"type":"Ride"}
-    return {"time":{"data":time_s},"watts":{"data":p},"heartrate":{"data":h},
-            "velocity_smooth":{"data":s},"distance":{"data":d},"_meta":meta}
+    """JSON-ready version of decode_fit (lists, NaN → None)."""
+    from utils.ride_store import ride_to_json
+    return ride_to_json(decode_fit(file))
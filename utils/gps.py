@@ -0,0 +1,375 @@
+# ===============================================================
+# 🗺️ GPS — simplified ride tracks and a spatial index
+# ===============================================================
+#
+# The full-resolution track is the ride's "latlng" stream (delta-encoded
+# in the ride store, see utils/ride_store.py). What maps need is kept in
+# ride_data/gps.sqlite, built once at ingest:
+#
+#   • the track simplified with Douglas–Peucker for each zoom in ZOOMS, at
+#     a tolerance of TOLERANCE_PX screen pixels (Web Mercator metres per
+#     pixel at the ride's latitude), stored as encoded polylines (the
+#     Google format map libraries decode directly: 1e-5° integer deltas)
+#   • the ride's bounding box, and the bounding box of every CHUNK points
+#     of the finest level, in SQLite R*Tree tables
+#
+# Douglas–Peucker runs once, at the finest tolerance: each kept point
+# records the deviation that split its segment, capped by the split above
+# it, so every coarser level is just "importance > tolerance" (the same
+# points a separate run would keep).
+#
+# "Rides passing through this area" asks the chunk R-tree for candidate
+# chunks. A chunk whose box lies inside the area has a point inside it, so
+# its ride matches without geometry; the rest are settled by clipping the
+# chunk's segments against the area. Neither step loads a stream; answers
+# are exact for the finest level, i.e. to within a couple of metres.
+
+import os
+import sqlite3
+import numpy as np
+from utils import ride_store, catalog
+from utils.telemetry import count
+
+GPS_PATH = "ride_data/gps.sqlite"
+GPS_VERSION = 1
+
+ZOOMS = (8, 11, 14, 16)
+TOLERANCE_PX = 1.0
+CHUNK = 32
+PRECISION = 5  # polyline decimals
+
+_M_PER_DEG = 111_320.0
+_M_PER_PX_Z0 = 156_543.03  # Web Mercator metres per pixel at zoom 0 on the equator
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ride_tracks (
+    track_id INTEGER PRIMARY KEY,
+    ride_id TEXT UNIQUE,
+    date TEXT,
+    content_hash TEXT,
+    version INTEGER,
+    points INTEGER,
+    chunks INTEGER,
+    min_lat REAL,
+    max_lat REAL,
+    min_lng REAL,
+    max_lng REAL
+);
+CREATE INDEX IF NOT EXISTS ride_tracks_date ON ride_tracks (date);
+CREATE TABLE IF NOT EXISTS track_levels (
+    track_id INTEGER,
+    zoom INTEGER,
+    points INTEGER,
+    polyline TEXT,
+    PRIMARY KEY (track_id, zoom)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS ride_boxes USING rtree(track_id, min_lat, max_lat, min_lng, max_lng);
+CREATE VIRTUAL TABLE IF NOT EXISTS track_chunks USING rtree(
+    id, min_lat, max_lat, min_lng, max_lng, +track_id INTEGER, +points INTEGER, +polyline TEXT
+);
+"""
+
+
+def connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(GPS_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(GPS_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# ===============================================================
+# 🔤 POLYLINES
+# ===============================================================
+
+def encode_polyline(latlng, precision: int = PRECISION) -> str:
+    """Encoded polyline (Google format) for an n×2 array of degrees, without per-point loops."""
+    fixes = np.round(np.asarray(latlng, dtype=np.float64).reshape(-1, 2) * 10 ** precision).astype(np.int64)
+    if not len(fixes):
+        return ""
+    steps = np.diff(fixes, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    v = np.where(steps < 0, ~(steps << 1), steps << 1)
+    shifts = 5 * np.arange(7)
+    chunks = (v[:, None] >> shifts) & 0x1F
+    used = np.maximum(1, (v[:, None] >> shifts > 0).sum(axis=1))
+    k = np.arange(7)
+    chunks = chunks | np.where(k < used[:, None] - 1, 0x20, 0)
+    return (chunks[k < used[:, None]] + 63).astype(np.uint8).tobytes().decode("ascii")
+
+
+def _polyline_steps(polyline: str) -> np.ndarray:
+    """The integer steps of an encoded polyline (or of several joined ones), n×2."""
+    b = np.frombuffer(polyline.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+    if not len(b):
+        return np.zeros((0, 2), dtype=np.int64)
+    ends = np.flatnonzero((b & 0x20) == 0)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    pos = np.arange(len(b)) - np.repeat(starts, ends - starts + 1)
+    v = np.add.reduceat((b & 0x1F) << (5 * pos), starts)
+    return np.where(v & 1, ~(v >> 1), v >> 1).reshape(-1, 2)
+
+
+def decode_polyline(polyline: str, precision: int = PRECISION) -> np.ndarray:
+    """n×2 degrees from an encoded polyline."""
+    return np.cumsum(_polyline_steps(polyline), axis=0) / 10 ** precision
+
+
+# ===============================================================
+# ✂️ SIMPLIFICATION
+# ===============================================================
+
+def _metres(latlng: np.ndarray) -> np.ndarray:
+    """Local equirectangular projection (x east, y north, metres); fine at ride scale."""
+    cos = np.cos(np.radians(np.nanmean(latlng[:, 0])))
+    return np.column_stack([latlng[:, 1] * _M_PER_DEG * cos, latlng[:, 0] * _M_PER_DEG])
+
+
+def importance(xy: np.ndarray, floor: float = 0.0) -> np.ndarray:
+    """Douglas–Peucker importance per point: keep ``importance > tol`` for the tolerance-``tol``
+    simplification. Endpoints are inf; points below ``floor`` are 0."""
+    n = len(xy)
+    out = np.zeros(n)
+    if n:
+        out[[0, -1]] = np.inf
+    stack = [(0, n - 1, np.inf)] if n > 2 else []
+    while stack:
+        lo, hi, cap = stack.pop()
+        seg = xy[lo + 1:hi] - xy[lo]
+        chord = xy[hi] - xy[lo]
+        length = np.hypot(*chord)
+        if length > 0:
+            dist = np.abs(seg[:, 0] * chord[1] - seg[:, 1] * chord[0]) / length
+        else:
+            dist = np.hypot(seg[:, 0], seg[:, 1])
+        i = int(np.argmax(dist))
+        if dist[i] <= floor:
+            continue
+        mid = lo + 1 + i
+        out[mid] = min(dist[i], cap)
+        if mid - lo > 1:
+            stack.append((lo, mid, out[mid]))
+        if hi - mid > 1:
+            stack.append((mid, hi, out[mid]))
+    return out
+
+
+def tolerance_m(zoom: int, lat: float) -> float:
+    """Metres covered by TOLERANCE_PX pixels at ``zoom`` and latitude ``lat``."""
+    return TOLERANCE_PX * _M_PER_PX_Z0 * np.cos(np.radians(lat)) / 2 ** zoom
+
+
+def ride_track(latlng) -> dict:
+    """Bounding box and per-zoom polylines for a track (n×2 degrees; rows without a fix are
+    skipped), or None when it has no fixes."""
+    latlng = np.asarray(latlng, dtype=np.float64).reshape(-1, 2)
+    latlng = latlng[~np.isnan(latlng).any(axis=1)]
+    if not len(latlng):
+        return None
+    lat = float(latlng[:, 0].mean())
+    imp = importance(_metres(latlng), tolerance_m(max(ZOOMS), lat))
+    levels = {}
+    for zoom in ZOOMS:
+        keep = latlng[imp > tolerance_m(zoom, lat)]
+        levels[zoom] = (len(keep), encode_polyline(keep))
+    return {"points": len(latlng), "bbox": _bbox(latlng), "levels": levels}
+
+
+def ride_track_from_streams(streams: dict) -> dict:
+    """``ride_track`` for a ride's streams (Strava layout or plain arrays); None without GPS."""
+    value = streams.get("latlng")
+    if isinstance(value, dict):
+        value = value.get("data")
+    if value is None or not len(value):
+        return None
+    return ride_track(np.array(value, dtype=np.float64))
+
+
+def _bbox(latlng: np.ndarray) -> tuple:
+    """(min_lat, max_lat, min_lng, max_lng)"""
+    return (float(latlng[:, 0].min()), float(latlng[:, 0].max()),
+            float(latlng[:, 1].min()), float(latlng[:, 1].max()))
+
+
+def _chunks(latlng: np.ndarray) -> list:
+    """(bbox, points, polyline) per CHUNK segments; consecutive chunks share their end point."""
+    out = []
+    for first in range(0, max(len(latlng) - 1, 1), CHUNK):
+        part = latlng[first:first + CHUNK + 1]
+        out.append((_bbox(part), len(part), encode_polyline(part)))
+    return out
+
+
+def _chunk_ids(track_id: int, n: int) -> list:
+    """R-tree ids of a track's chunks; deterministic so they can be deleted by id."""
+    return [(track_id << 20) + k for k in range(n)]
+
+
+# ===============================================================
+# 💾 STORAGE
+# ===============================================================
+
+def _delete(conn, ride_id: str):
+    row = conn.execute("SELECT track_id, chunks FROM ride_tracks WHERE ride_id = ?", (ride_id,)).fetchone()
+    if row is None:
+        return
+    conn.executemany("DELETE FROM track_chunks WHERE id = ?",
+                     [(i,) for i in _chunk_ids(row["track_id"], row["chunks"])])
+    for sql in ("DELETE FROM ride_boxes WHERE track_id = ?",
+                "DELETE FROM track_levels WHERE track_id = ?", "DELETE FROM ride_tracks WHERE track_id = ?"):
+        conn.execute(sql, (row["track_id"],))
+
+
+def store(ride_id: str, track: dict, day=None, content_hash: str = None):
+    """Replace a ride's stored track (``track`` from ``ride_track``; None stores nothing)."""
+    ride_id = ride_store.ride_id_from_name(ride_id)
+    if day is None:
+        found = catalog.query_rides(ride_ids=[ride_id])
+        day = found[0]["date"] if found else None
+    content_hash = content_hash or (ride_store.load_meta(ride_id).get("_store") or {}).get("hash")
+    conn = connect()
+    with conn:
+        _delete(conn, ride_id)
+        if track is not None:
+            chunks = _chunks(decode_polyline(track["levels"][max(track["levels"])][1]))
+            cur = conn.execute("INSERT INTO ride_tracks VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               (ride_id, day, content_hash, GPS_VERSION, track["points"], len(chunks),
+                                *track["bbox"]))
+            track_id = cur.lastrowid
+            conn.execute("INSERT INTO ride_boxes VALUES (?, ?, ?, ?, ?)", (track_id, *track["bbox"]))
+            conn.executemany("INSERT INTO track_levels VALUES (?, ?, ?, ?)",
+                             [(track_id, z, n, line) for z, (n, line) in track["levels"].items()])
+            conn.executemany("INSERT INTO track_chunks VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                             [(i, *box, track_id, n, line)
+                              for i, (box, n, line) in zip(_chunk_ids(track_id, len(chunks)), chunks)])
+    conn.close()
+
+
+def delete(ride_id: str):
+    conn = connect()
+    with conn:
+        _delete(conn, ride_store.ride_id_from_name(ride_id))
+    conn.close()
+
+
+def on_ride_ingested(ride_id: str, track: dict = None, day=None):
+    """Ingest hook: simplify (unless given) and index a ride's GPS track."""
+    if track is None:
+        track = ride_track_from_streams(ride_store.load_streams(ride_id, ["latlng"]))
+    store(ride_id, track, day)
+
+
+def rebuild(missing_only: bool = True) -> int:
+    """Index rides without a current track (all rides unless ``missing_only``)."""
+    conn = connect()
+    have = {r for (r,) in conn.execute("SELECT ride_id FROM ride_tracks WHERE version = ?", (GPS_VERSION,))}
+    conn.close()
+    done = 0
+    for row in catalog.query_rides():
+        ride_id = row["ride_id"]
+        if missing_only and ride_id in have:
+            continue
+        try:
+            on_ride_ingested(ride_id, day=row["date"])
+            done += 1
+        except Exception:
+            count("rebuild_errors_total", index="gps")
+            continue
+    return done
+
+
+# ===============================================================
+# 🔎 QUERIES
+# ===============================================================
+
+def track(ride_id: str, zoom: int = None) -> dict:
+    """A ride's simplified track for ``zoom`` (the coarsest stored level at least that detailed;
+    the finest when omitted), or None when the ride has no GPS."""
+    conn = connect()
+    head = conn.execute("SELECT * FROM ride_tracks WHERE ride_id = ? AND version = ?",
+                        (ride_store.ride_id_from_name(ride_id), GPS_VERSION)).fetchone()
+    level = None
+    if head is not None:
+        level = conn.execute(
+            "SELECT zoom, points, polyline FROM track_levels WHERE track_id = ? "
+            "ORDER BY (zoom >= ?) DESC, CASE WHEN zoom >= ? THEN zoom ELSE -zoom END LIMIT 1",
+            (head["track_id"], zoom or max(ZOOMS), zoom or max(ZOOMS))).fetchone()
+    conn.close()
+    if level is None:
+        return None
+    return {"ride_id": head["ride_id"], "date": head["date"], "zoom": level["zoom"], "points": level["points"],
+            "recorded_points": head["points"], "polyline": level["polyline"],
+            "bbox": [head["min_lat"], head["max_lat"], head["min_lng"], head["max_lng"]]}
+
+
+def _segments_touch(a: np.ndarray, b: np.ndarray, area: tuple) -> np.ndarray:
+    """Per segment a[i] → b[i] (degrees): does it touch ``area``? Liang–Barsky clipping, all at once."""
+    min_lat, max_lat, min_lng, max_lng = area
+    y0, x0 = a[:, 0], a[:, 1]
+    dy, dx = b[:, 0] - y0, b[:, 1] - x0
+    lo, hi = np.zeros(len(a)), np.ones(len(a))
+    ok = np.ones(len(a), dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for p, q in ((-dx, x0 - min_lng), (dx, max_lng - x0), (-dy, y0 - min_lat), (dy, max_lat - y0)):
+            ok &= (p != 0) | (q >= 0)
+            t = q / p
+            lo = np.where(p < 0, np.maximum(lo, t), lo)
+            hi = np.where(p > 0, np.minimum(hi, t), hi)
+    return ok & (lo <= hi)
+
+
+def _chunks_touch(lines: list, counts: list, area: tuple) -> np.ndarray:
+    """Per chunk (polyline, point count): does any of its segments touch ``area``? All chunks are
+    decoded and clipped in one batch."""
+    counts = np.asarray(counts, dtype=np.int64)
+    steps = _polyline_steps("".join(lines))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    fixes = np.cumsum(steps, axis=0)
+    fixes -= np.repeat(fixes[starts] - steps[starts], counts, axis=0)  # each polyline restarts at 0
+    points = fixes / 10 ** PRECISION
+    # segment i joins points i and i + 1 of the same chunk (a one-point chunk is a point)
+    last = np.repeat(starts + counts - 1, counts)
+    seg = np.flatnonzero((np.arange(len(points)) < last) | (counts == 1).repeat(counts))
+    hit = _segments_touch(points[seg], points[np.minimum(seg + 1, last[seg])], area)
+    chunk_of = np.repeat(np.arange(len(lines)), counts)[seg]
+    return np.bincount(chunk_of[hit], minlength=len(lines)) > 0
+
+
+def rides_through(min_lat: float, max_lat: float, min_lng: float, max_lng: float,
+                  start=None, end=None, exact: bool = True, limit: int = None) -> list:
+    """Rides whose track passes through the area, newest first.
+
+    With ``exact=False`` any ride whose bounding box overlaps the area is returned.
+    """
+    area = (min_lat, max_lat, min_lng, max_lng)
+    where, params = ["t.version = ?"], [GPS_VERSION]
+    for clause, value in (("t.date >= ?", start), ("t.date <= ?", end)):
+        if value is not None:
+            where.append(clause)
+            params.append(str(value))
+    cols = "t.track_id, t.ride_id, t.date, t.points, t.min_lat, t.max_lat, t.min_lng, t.max_lng"
+    overlap = "b.max_lat >= ? AND b.min_lat <= ? AND b.max_lng >= ? AND b.min_lng <= ?"
+    box = [min_lat, max_lat, min_lng, max_lng]
+    conn = connect()
+    rows = {r["track_id"]: dict(r) for r in conn.execute(
+        f"SELECT {cols} FROM ride_boxes b JOIN ride_tracks t USING (track_id) "
+        f"WHERE {overlap} AND {' AND '.join(where)}", box + params)}
+    found = set(rows) if not exact else set()
+    if exact and rows:
+        inside = "b.min_lat >= ? AND b.max_lat <= ? AND b.min_lng >= ? AND b.max_lng <= ?"
+        found = {t for t, r in rows.items() if r["min_lat"] >= min_lat and r["max_lat"] <= max_lat
+                 and r["min_lng"] >= min_lng and r["max_lng"] <= max_lng}  # whole ride inside
+        if len(found) < len(rows):
+            found |= {t for (t,) in conn.execute(
+                f"SELECT DISTINCT track_id FROM track_chunks b WHERE {inside}", box)} & set(rows)
+        pending = [(r["track_id"], r["points"], r["polyline"]) for r in conn.execute(
+            f"SELECT track_id, points, polyline FROM track_chunks b WHERE {overlap}", box)
+            if r["track_id"] in rows and r["track_id"] not in found] if len(found) < len(rows) else []
+        if pending:
+            track_ids, counts, lines = zip(*pending)
+            hits = _chunks_touch(lines, counts, area)
+            found.update(t for t, hit in zip(track_ids, hits) if hit)
+    conn.close()
+    out = sorted((rows[t] for t in found), key=lambda r: (r["date"] or "", r["ride_id"]), reverse=True)
+    for r in out:
+        r.pop("track_id")
+    return out[:limit] if limit else out
@@ -0,0 +1,183 @@
+# ===============================================================
+# 📶 HISTOGRAMS — per-ride stream distributions, summed per window
+# ===============================================================
+#
+# Every stream key has fixed bin edges, so a ride's distribution is a
+# small count vector computed once at ingest. A library-wide or season
+# distribution is the sum of those vectors and never loads a stream.
+#
+# Counts are stored trimmed to their non-zero span (first bin + uint32
+# blob) in ride_data/histograms.sqlite, keyed by ride id and content hash.
+
+import os
+import sqlite3
+import numpy as np
+from utils import ride_store, catalog
+from utils.telemetry import count
+
+HIST_PATH = "ride_data/histograms.sqlite"
+HIST_VERSION = 1
+
+# key → (low edge, high edge, bin width); values outside fall in the end bins
+BINS = {
+    "watts": (0, 2000, 5),
+    "heartrate": (0, 250, 1),
+    "cadence": (0, 200, 1),
+    "velocity_smooth": (0, 25, 0.25),
+    "altitude": (-500, 5000, 10),
+    "temp": (-30, 60, 1),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stream_hist (
+    ride_id TEXT,
+    key TEXT,
+    content_hash TEXT,
+    version INTEGER,
+    first INTEGER,
+    counts BLOB,
+    PRIMARY KEY (ride_id, key)
+);
+"""
+
+
+def connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(HIST_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(HIST_PATH, timeout=30)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def edges(key: str) -> np.ndarray:
+    lo, hi, step = BINS[key]
+    return lo + step * np.arange(round((hi - lo) / step) + 1)
+
+
+def _nbins(key: str) -> int:
+    lo, hi, step = BINS[key]
+    return round((hi - lo) / step)
+
+
+# ===============================================================
+# 🧮 PER RIDE
+# ===============================================================
+
+def stream_histogram(key: str, values) -> np.ndarray:
+    """Sample counts of one stream on the key's fixed bins (NaNs dropped)."""
+    lo, _, step = BINS[key]
+    v = np.asarray(values, dtype=np.float64)
+    v = v[~np.isnan(v)]
+    idx = np.clip(((v - lo) / step).astype(np.int64), 0, _nbins(key) - 1)
+    return np.bincount(idx, minlength=_nbins(key)).astype(np.uint32)
+
+
+def ride_histograms(streams: dict) -> dict:
+    """Histograms for every binned key present in a ride's streams."""
+    out = {}
+    for key in BINS:
+        s = streams.get(key)
+        if isinstance(s, dict):
+            s = s.get("data")
+        if s is not None and len(s):
+            out[key] = stream_histogram(key, np.asarray(s, dtype=np.float64))
+    return out
+
+
+def _pack(counts: np.ndarray) -> tuple:
+    nz = np.flatnonzero(counts)
+    if not len(nz):
+        return 0, b""
+    return int(nz[0]), counts[nz[0]:nz[-1] + 1].astype(np.uint32).tobytes()
+
+
+def _unpack_into(total: np.ndarray, first: int, blob: bytes):
+    part = np.frombuffer(blob, dtype=np.uint32)
+    total[first:first + len(part)] += part
+
+
+# ===============================================================
+# 💾 STORAGE
+# ===============================================================
+
+def store(ride_id: str, hists: dict, content_hash: str = None):
+    ride_id = ride_store.ride_id_from_name(ride_id)
+    content_hash = content_hash or (ride_store.load_meta(ride_id).get("_store") or {}).get("hash")
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM stream_hist WHERE ride_id = ?", (ride_id,))
+        conn.executemany(
+            "INSERT INTO stream_hist VALUES (?, ?, ?, ?, ?, ?)",
+            [(ride_id, key, content_hash, HIST_VERSION, *_pack(c)) for key, c in hists.items()],
+        )
+    conn.close()
+
+
+def delete(ride_id: str):
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM stream_hist WHERE ride_id = ?", (ride_store.ride_id_from_name(ride_id),))
+    conn.close()
+
+
+def on_ride_ingested(ride_id: str, hists: dict = None):
+    """Ingest hook: compute (unless given) and store the ride's histograms."""
+    if hists is None:
+        hists = ride_histograms(ride_store.load_streams(ride_id, list(BINS)))
+    store(ride_id, hists)
+
+
+def rebuild(missing_only: bool = True) -> int:
+    """Backfill histograms for rides stored before they existed (or all of them)."""
+    conn = connect()
+    have = {r for (r,) in conn.execute("SELECT DISTINCT ride_id FROM stream_hist WHERE version = ?",
+                                       (HIST_VERSION,))}
+    conn.close()
+    done = 0
+    for ride_id in ride_store.list_ride_ids():
+        if missing_only and ride_id in have:
+            continue
+        try:
+            on_ride_ingested(ride_id)
+            done += 1
+        except Exception:
+            count("rebuild_errors_total", index="histograms")
+            continue
+    return done
+
+
+# ===============================================================
+# 🔎 AGGREGATION
+# ===============================================================
+
+def histogram(key: str, ride_ids=None, start=None, end=None, types=None) -> tuple:
+    """(bin edges, summed counts) for a stream key over a set of rides.
+
+    Rides are given explicitly or selected from the catalog by date window
+    and type; with no filter the whole library is summed.
+    """
+    if ride_ids is None and (start or end or types):
+        ride_ids = [r["ride_id"] for r in catalog.query_rides(start=start, end=end, types=types)]
+    total = np.zeros(_nbins(key), dtype=np.uint64)
+    conn = connect()
+    rows = conn.execute("SELECT ride_id, first, counts FROM stream_hist WHERE key = ? AND version = ?",
+                        (key, HIST_VERSION))
+    wanted = None if ride_ids is None else {ride_store.ride_id_from_name(r) for r in ride_ids}
+    for ride_id, first, blob in rows:
+        if wanted is None or ride_id in wanted:
+            _unpack_into(total, first, blob)
+    conn.close()
+    return edges(key), total
+
+
+def quantile(edges_: np.ndarray, counts: np.ndarray, q: float) -> float:
+    """Approximate quantile (bin midpoint) of a binned distribution."""
+    cum = np.cumsum(counts)
+    if not len(cum) or cum[-1] == 0:
+        return float("nan")
+    i = min(int(np.searchsorted(cum, q * cum[-1])), len(counts) - 1)
+    return float((edges_[i] + edges_[i + 1]) / 2)
+
+
+def mean(edges_: np.ndarray, counts: np.ndarray) -> float:
+    total = counts.sum()
+    return float((counts * (edges_[:-1] + edges_[1:]) / 2).sum() / total) if total else float("nan")
@@ -0,0 +1,72 @@
+# ===============================================================
+# 📥 INGEST — single entry point for new or updated rides
+# ===============================================================
+
+import numpy as np
+from utils import ride_store, catalog, metrics_cache, pmc, power_curve, histograms, intervals, thresholds, zones, gps
+from utils.telemetry import timed
+
+
+def compute_derived(data: dict, hr_max: int = None) -> dict:
+    """Stream-heavy results for a ride; safe to run in a worker process before storing.
+
+    None for a ride without a time stream (ingest then works from its summary).
+    """
+    from utils.ride_analysis_utils import strava_json_to_df, base_ride_metrics, ride_grid, _hr_zones
+
+    day = (data.get("_meta") or {}).get("start_date") or data.get("start_date_local") or data.get("start_date")
+    hr_max = hr_max or int(thresholds.value_at("hr_max", day))  # HR max in effect on the ride's date
+    if not isinstance(data.get("time"), dict) or "data" not in data["time"]:
+        return None
+    df = strava_json_to_df(data)
+    grid = ride_grid(df)  # one 1 Hz resample shared by NP, zones and the power curve
+    derived = {"base": base_ride_metrics(df, grid), "hr_max": hr_max, "hists": histograms.ride_histograms(data),
+               "zone_hists": zones.ride_time_hists(data, grid)}
+    if "heartrate" in df.columns:
+        derived["hr_zones"] = _hr_zones(df, hr_max, grid)
+    if "watts" in data:
+        derived["curve"] = power_curve.ride_curve_from_streams(
+            {"time": np.asarray(data["time"]["data"]), "watts": np.asarray(data["watts"]["data"])}, grid
+        )
+        derived["ftp"] = thresholds.value_at("ftp", day)
+        derived["intervals"] = intervals.ride_intervals_from_streams(data, derived["ftp"], grid)
+    derived["track"] = gps.ride_track_from_streams(data)
+    return derived
+
+
+@timed("ingest")
+def ingest_ride(data: dict, ride_id: str = None, derived: dict = None, refresh_pmc: bool = True) -> str:
+    """Store a ride and bring every derived index up to date.
+
+    ``derived`` (from ``compute_derived``) skips recomputing stream metrics;
+    bulk callers pass ``refresh_pmc=False`` and refresh the PMC once at the end.
+    """
+    ride_id = ride_store.save_ride(data, ride_id)
+    if derived:
+        metrics_cache.store_parts(ride_id, derived["base"], derived.get("hr_zones"), derived.get("hr_max"),
+                                  derived.get("zone_hists", {}).get("power"))
+    metrics_cache.warm(ride_id)
+    power_curve.on_ride_ingested(ride_id, (derived or {}).get("curve"))
+    histograms.on_ride_ingested(ride_id, (derived or {}).get("hists"))
+    row = catalog.upsert_ride(ride_id)
+    zones.on_ride_ingested(ride_id, (derived or {}).get("zone_hists"), row["date"])
+    intervals.on_ride_ingested(ride_id, (derived or {}).get("intervals"), row["date"], (derived or {}).get("ftp"))
+    gps.on_ride_ingested(ride_id, (derived or {}).get("track"), row["date"])
+    if refresh_pmc:
+        pmc.on_ride_changed(row["date"])
+    return ride_id
+
+
+@timed("remove_ride")
+def remove_ride(ride_id: str):
+    """Delete a ride from the store and all derived indexes."""
+    rows = catalog.query_rides(ride_ids=[ride_id])
+    ride_store.delete_ride(ride_id)
+    catalog.remove_ride(ride_id)
+    power_curve.delete_curve(ride_id)
+    histograms.delete(ride_id)
+    zones.delete(ride_id)
+    intervals.delete(ride_id)
+    gps.delete(ride_id)
+    if rows:
+        pmc.on_ride_changed(rows[0]["date"])
@@ -0,0 +1,266 @@
+# ===============================================================
+# 🏁 INTERVALS — detected efforts and peak efforts per ride
+# ===============================================================
+#
+# Detection runs on the ride's 1 Hz grid (utils/resample.py; pauses and
+# dropouts count as 0 W) with array operations only:
+#
+#   1. power is smoothed with a centred SMOOTH_S rolling mean
+#   2. threshold hysteresis: an effort starts when the smoothed power
+#      reaches ON × FTP and ends once it falls below OFF × FTP; the state
+#      at each second is the last crossing before it (forward-filled with
+#      an accumulated index, no per-sample loop)
+#   3. efforts separated by less than MERGE_S are merged (a lap-like
+#      block with a short soft-pedal inside stays one interval), and
+#      those shorter than MIN_S are dropped
+#
+# Besides the detected "effort" rows every ride stores its "peak" rows:
+# the best window for each of PEAK_DURATIONS. Per-interval power, NP, HR
+# and duration come from cumulative sums and reduceat over the grid.
+#
+# FTP is the one in effect on the ride's date (utils/thresholds.py) and
+# is stored with the rows. Rows live in ride_data/intervals.sqlite with
+# the ride's date, so library-wide questions ("every 5-min effort above
+# 300 W this year") are one indexed SQL query and never touch a stream.
+
+import os
+import sqlite3
+import numpy as np
+from utils import ride_store, catalog, resample
+from utils.telemetry import count
+
+INTERVALS_PATH = "ride_data/intervals.sqlite"
+INTERVALS_VERSION = 1
+
+SMOOTH_S = 10
+ON, OFF = 0.90, 0.75
+MERGE_S = 15
+MIN_S = 30
+PEAK_DURATIONS = (5, 60, 300, 1200, 3600)
+KINDS = ("effort", "peak")
+
+FIELDS = ["kind", "start_s", "duration_s", "avg_power", "np_power", "max_power", "avg_hr", "max_hr"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ride_intervals (
+    ride_id TEXT,
+    date TEXT,
+    content_hash TEXT,
+    version INTEGER,
+    ftp REAL,
+    kind TEXT,
+    start_s INTEGER,
+    duration_s INTEGER,
+    avg_power REAL,
+    np_power REAL,
+    max_power REAL,
+    avg_hr REAL,
+    max_hr REAL
+);
+CREATE INDEX IF NOT EXISTS ride_intervals_ride ON ride_intervals (ride_id);
+CREATE INDEX IF NOT EXISTS ride_intervals_search ON ride_intervals (kind, duration_s, avg_power);
+CREATE INDEX IF NOT EXISTS ride_intervals_date ON ride_intervals (date);
+"""
+
+
+def connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(INTERVALS_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(INTERVALS_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# ===============================================================
+# 🧮 ENGINE
+# ===============================================================
+
+def _rolling(p: np.ndarray, window: int, centred: bool = False) -> np.ndarray:
+    """Rolling mean over ``window`` seconds (trailing, or centred); windows are clipped at the ends."""
+    cs = np.concatenate([[0.0], np.cumsum(p)])
+    i = np.arange(len(p))
+    lo = i - (window // 2 if centred else window - 1)
+    lo = np.clip(lo, 0, len(p))
+    hi = np.clip(lo + window, 0, len(p))
+    return (cs[hi] - cs[lo]) / np.maximum(hi - lo, 1)
+
+
+def _hysteresis(signal: np.ndarray, on: float, off: float) -> np.ndarray:
+    """True from each rise to ``on`` until the next fall below ``off``."""
+    event = np.where(signal >= on, 1, np.where(signal < off, 0, -1))
+    idx = np.where(event >= 0, np.arange(len(signal)), -1)
+    last = np.maximum.accumulate(idx)
+    return np.where(last >= 0, event[np.maximum(last, 0)], 0) == 1
+
+
+def _runs(mask: np.ndarray) -> tuple:
+    """(starts, ends) of the True runs in ``mask`` (ends exclusive)."""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _stats(power: np.ndarray, hr, starts: np.ndarray, ends: np.ndarray) -> dict:
+    """Per-interval columns for [starts, ends) windows of the 1 Hz grid."""
+    dur = ends - starts
+    cs = np.concatenate([[0.0], np.cumsum(power)])
+    avg = (cs[ends] - cs[starts]) / dur
+    pairs = np.ravel(np.column_stack([starts, ends]))
+    max_power = np.maximum.reduceat(np.append(power, 0.0), pairs)[::2]
+
+    # NP from 30 s rolling means whose window lies inside the interval
+    r4 = np.concatenate([[0.0], np.cumsum(_rolling(power, 30) ** 4)])
+    first = np.minimum(starts + 29, ends)
+    full = ends - first
+    np_power = np.where(full > 0, ((r4[ends] - r4[first]) / np.maximum(full, 1)) ** 0.25, avg)
+
+    out = {"start_s": starts, "duration_s": dur, "avg_power": avg, "np_power": np_power, "max_power": max_power}
+    if hr is not None:
+        ok = ~np.isnan(hr)
+        hs = np.concatenate([[0.0], np.cumsum(np.where(ok, hr, 0.0))])
+        hn = np.concatenate([[0], np.cumsum(ok)])
+        n = hn[ends] - hn[starts]
+        out["avg_hr"] = np.where(n > 0, (hs[ends] - hs[starts]) / np.maximum(n, 1), np.nan)
+        top = np.maximum.reduceat(np.append(np.where(ok, hr, -np.inf), -np.inf), pairs)[::2]
+        out["max_hr"] = np.where(np.isfinite(top), top, np.nan)
+    return out
+
+
+def detect(power_1hz, ftp: float, hr_1hz=None) -> list:
+    """Sustained efforts and peak windows for one ride's 1 Hz grid: [{field: value}], by start."""
+    p = np.nan_to_num(np.asarray(power_1hz, dtype=np.float64), nan=0.0)
+    hr = None if hr_1hz is None else np.asarray(hr_1hz, dtype=np.float64)
+    if not len(p):
+        return []
+
+    on = _hysteresis(_rolling(p, SMOOTH_S, centred=True), ON * ftp, OFF * ftp)
+    starts, ends = _runs(on)
+    if len(starts):
+        keep = np.concatenate([[True], starts[1:] - ends[:-1] >= MERGE_S])
+        starts, ends = starts[keep], np.append(ends[np.flatnonzero(keep)[1:] - 1], ends[-1])
+        long = ends - starts >= MIN_S
+        starts, ends = starts[long], ends[long]
+
+    durations = np.array([d for d in PEAK_DURATIONS if d <= len(p)], dtype=np.int64)
+    cs = np.concatenate([[0.0], np.cumsum(p)])
+    peak_starts = np.array([int(np.argmax(cs[d:] - cs[:-d])) for d in durations], dtype=np.int64)
+
+    rows = []
+    for kind, s, e in (("effort", starts, ends), ("peak", peak_starts, peak_starts + durations)):
+        if not len(s):
+            continue
+        cols = _stats(p, hr, s, e)
+        for i in range(len(s)):
+            rows.append({"kind": kind, **{k: v[i].item() for k, v in cols.items()}})
+    return sorted(rows, key=lambda r: (r["start_s"], r["kind"]))
+
+
+def ride_intervals_from_streams(streams: dict, ftp: float, grid: dict = None) -> list:
+    """``detect`` for a ride's streams; ``grid`` is its ``resample.ride_1hz`` grid when the caller has one."""
+    if grid is None:
+        grid = resample.ride_1hz(streams, ("watts", "heartrate"))
+    if "watts" not in grid or not len(grid["watts"]):
+        return []
+    power = np.where(grid["moving"], np.nan_to_num(grid["watts"], nan=0.0), 0.0)
+    return detect(power, ftp, grid.get("heartrate"))
+
+
+# ===============================================================
+# 💾 STORAGE
+# ===============================================================
+
+def store(ride_id: str, rows: list, day=None, ftp: float = None, content_hash: str = None):
+    ride_id = ride_store.ride_id_from_name(ride_id)
+    if day is None:
+        found = catalog.query_rides(ride_ids=[ride_id])
+        day = found[0]["date"] if found else None
+    content_hash = content_hash or (ride_store.load_meta(ride_id).get("_store") or {}).get("hash")
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM ride_intervals WHERE ride_id = ?", (ride_id,))
+        conn.executemany(
+            f"INSERT INTO ride_intervals VALUES ({', '.join('?' * (5 + len(FIELDS)))})",
+            [(ride_id, day, content_hash, INTERVALS_VERSION, ftp, *[r.get(f) for f in FIELDS]) for r in rows],
+        )
+    conn.close()
+
+
+def delete(ride_id: str):
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM ride_intervals WHERE ride_id = ?", (ride_store.ride_id_from_name(ride_id),))
+    conn.close()
+
+
+def on_ride_ingested(ride_id: str, rows: list = None, day=None, ftp: float = None):
+    """Ingest hook: detect (unless given) and store a ride's intervals."""
+    from utils import thresholds
+
+    ftp = ftp or thresholds.value_at("ftp", day)
+    if rows is None:
+        rows = ride_intervals_from_streams(ride_store.load_streams(ride_id, ["time", "watts", "heartrate"]), ftp)
+    store(ride_id, rows, day, ftp)
+
+
+def rebuild(missing_only: bool = True) -> int:
+    """Detect intervals for rides without current rows (all rides unless ``missing_only``).
+
+    Rides whose stored FTP no longer matches the FTP history count as missing.
+    """
+    from utils import thresholds
+
+    conn = connect()
+    have = {r["ride_id"]: r["ftp"] for r in conn.execute(
+        "SELECT DISTINCT ride_id, ftp FROM ride_intervals WHERE version = ?", (INTERVALS_VERSION,))}
+    conn.close()
+    rows = catalog.query_rides()
+    ftps = thresholds.values_at("ftp", [r["date"] for r in rows])
+    done = 0
+    for row, ftp in zip(rows, ftps):
+        if missing_only and have.get(row["ride_id"]) == ftp:
+            continue
+        try:
+            on_ride_ingested(row["ride_id"], day=row["date"], ftp=float(ftp))
+            done += 1
+        except Exception:
+            count("rebuild_errors_total", index="intervals")
+            continue
+    return done
+
+
+# ===============================================================
+# 🔎 QUERIES
+# ===============================================================
+
+def for_ride(ride_id: str, kind: str = None) -> list:
+    """A ride's stored intervals, by start time."""
+    sql = f"SELECT {', '.join(FIELDS)}, ftp FROM ride_intervals WHERE ride_id = ? AND version = ?"
+    params = [ride_store.ride_id_from_name(ride_id), INTERVALS_VERSION]
+    if kind:
+        sql += " AND kind = ?"
+        params.append(kind)
+    conn = connect()
+    rows = [dict(r) for r in conn.execute(sql + " ORDER BY start_s, kind", params)]
+    conn.close()
+    return rows
+
+
+def search(kind: str = "effort", min_duration=None, max_duration=None, min_power=None, max_power=None,
+           start=None, end=None, order: str = "avg_power", limit: int = 100) -> list:
+    """Intervals across the library, e.g. ``search("peak", 300, 300, min_power=300, start="2026-01-01")``."""
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {KINDS}")
+    if order not in ("avg_power", "np_power", "duration_s", "date"):
+        raise ValueError("order must be avg_power, np_power, duration_s or date")
+    where, params = ["kind = ?", "version = ?"], [kind, INTERVALS_VERSION]
+    for clause, value in (("duration_s >= ?", min_duration), ("duration_s <= ?", max_duration),
+                          ("avg_power >= ?", min_power), ("avg_power <= ?", max_power),
+                          ("date >= ?", start), ("date <= ?", end)):
+        if value is not None:
+            where.append(clause)
+            params.append(value if isinstance(value, (int, float)) else str(value))
+    sql = (f"SELECT ride_id, date, ftp, {', '.join(FIELDS)} FROM ride_intervals WHERE {' AND '.join(where)} "
+           f"ORDER BY {order} DESC, ride_id, start_s LIMIT ?")
+    conn = connect()
+    rows = [dict(r) for r in conn.execute(sql, params + [limit])]
+    conn.close()
+    return rows
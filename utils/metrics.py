@@ -1,62 +1,46 @@
-import os, json, pandas as pd, numpy as np
-from datetime import datetime
+import pandas as pd
+from utils import ride_store, catalog, pmc
 
-RAW_DIR = "ride_data/raw"
+RAW_DIR = ride_store.RAW_DIR
 
-def build_tss_dataframe(rides, ftp=222):
+def build_tss_dataframe(rides=None, ftp=None, ctl_days=pmc.CTL_DAYS, atl_days=pmc.ATL_DAYS):
     """
-    Build a dataframe of rides with TSS, CTL, ATL, and TSB metrics.
-    Handles both FIT and Strava JSON formats.
+    Build a day-by-day dataframe with TSS, CTL, ATL, and TSB metrics.
+    The full library is served from the stored PMC series; a subset of
+    rides is computed on the fly with the same engine. ``ftp=None`` scores
+    each ride with the FTP in effect on its date.
     """
-    rows = []
-    for file in rides:
-        path = os.path.join(RAW_DIR, file)
-        try:
-            with open(path) as f:
-                data = json.load(f)
-            meta = data.get("_meta", {})
-            date = meta.get("start_date") or meta.get("start_date_local") or None
-            if date:
-                try:
-                    date = datetime.fromisoformat(date.replace("Z", "+00:00")).date()
-                except Exception:
-                    continue
-            else:
-                continue
-
-            # compute basic metrics
-            avg_watts = meta.get("average_watts") or np.nan
-            moving_time = meta.get("moving_time_s") or meta.get("moving_time") or 0
-            tss = np.nan
-            if avg_watts and ftp and moving_time:
-                tss = (moving_time * avg_watts * (avg_watts / ftp)) / (ftp * 3600) * 100
-
-            rows.append({
-                "date": date,
-                "name": meta.get("name", os.path.basename(file)),
-                "tss": round(tss, 1) if not np.isnan(tss) else np.nan,
-                "distance_m": meta.get("distance_m", 0),
-                "type": meta.get("type", "Ride"),
-            })
-        except Exception as e:
-            print(f"⚠️ Error processing {file}: {e}")
-
-    if not rows:
-        return pd.DataFrame(columns=["date", "name", "tss", "distance_m", "type"])
-
-    df = pd.DataFrame(rows)
-    df = df.dropna(subset=["date"])
-    df = df.sort_values("date")
-
-    # calculate rolling metrics
-    df["CTL"] = df["tss"].rolling(window=42, min_periods=1).mean()
-    df["ATL"] = df["tss"].rolling(window=7, min_periods=1).mean()
-    df["TSB"] = df["CTL"] - df["ATL"]
-
-    return df
+    columns = ["date", "name", "tss", "distance_m", "type", "rides", "CTL", "ATL", "TSB"]
+    all_ids = None if rides is None else {r["ride_id"] for r in catalog.query_rides()}
+    if rides is None or {ride_store.ride_id_from_name(r) for r in rides} >= all_ids:
+        df = pmc.get_pmc(ftp, ctl_days, atl_days)
+        if df.empty:
+            return pd.DataFrame(columns=columns)
+        df["date"] = pd.to_datetime(df["date"]).dt.date
+        df = df.rename(columns={"names": "name", "types": "type"})
+        df["tss"] = df["tss"].round(1)
+        return df[columns]
+
+    cat = catalog.rides_dataframe(ride_ids=rides, order="date ASC")
+    cat = cat[cat["date"].notna()]
+    if cat.empty:
+        return pd.DataFrame(columns=columns)
+    day = pd.to_datetime(cat["date"])
+    df = pmc.compute_pmc(pd.Series(pmc.ride_tss(cat, ftp).to_numpy(), index=day), ctl_days, atl_days)
+    per_day = cat.assign(day=day).groupby("day").agg(
+        name=("name", lambda s: ", ".join(str(n) for n in s if n)),
+        type=("type", lambda s: ", ".join(sorted({str(t) for t in s if t}))),
+        distance_m=("distance_m", "sum"),
+        rides=("ride_id", "size"),
+    ).reindex(df["date"])
+    for col in ["name", "type"]:
+        df[col] = per_day[col].fillna("").to_numpy()
+    for col in ["distance_m", "rides"]:
+        df[col] = per_day[col].fillna(0).to_numpy()
+    df["date"] = df["date"].dt.date
+    df["tss"] = df["tss"].round(1)
+    return df[columns]
 
 def get_all_ride_files():
-    """Helper to list all ride JSON files"""
-    if not os.path.exists(RAW_DIR):
-        return []
-    return [f for f in os.listdir(RAW_DIR) if f.endswith(".json")]
+    """Helper to list all catalogued ride ids"""
+    return [r["ride_id"] for r in catalog.query_rides()]
@@ -0,0 +1,162 @@
+# ===============================================================
+# 🗃️ METRICS CACHE — content-addressed ride metrics
+# ===============================================================
+#
+# Entries are keyed by the ride's stream content hash, the metric-engine
+# version and only the setting each part depends on:
+#
+#   part "base"        → no setting (NP, averages, maxima, duration)
+#   part "power_hist"  → no setting (seconds per 1 W bin, utils/zones.py)
+#   part "hr_zones"    → HR max
+#
+# IF, TSS and the power zone split are derived from the cached NP and
+# histogram at read time, so changing FTP invalidates nothing and changing
+# HR max only misses the zone entries. Unless given, FTP and HR max are the
+# values in effect on the ride's date (utils/thresholds.py). A hit reads
+# meta.json, the threshold history and one cache query; no streams.
+
+import os
+import json
+import sqlite3
+import numpy as np
+from utils import ride_store, thresholds, zones
+from utils.ride_analysis_utils import (
+    METRICS_VERSION, base_ride_metrics, apply_ftp, ride_grid, strava_json_to_df, summary_ride_metrics, _hr_zones,
+)
+from utils.settings import get_hr_max
+from utils.telemetry import timed, count
+
+CACHE_PATH = "ride_data/metrics_cache.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics_cache (
+    content_hash TEXT,
+    part TEXT,
+    param TEXT,
+    version INTEGER,
+    payload TEXT,
+    PRIMARY KEY (content_hash, part, param, version)
+);
+"""
+
+
+def connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(CACHE_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=30)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _ride_hash(ride_id: str, summary: dict) -> str:
+    h = (summary.get("_store") or {}).get("hash")
+    return h or ride_store.content_hash(ride_store.load_streams(ride_id))
+
+
+def _has_streams(ride_id: str, summary: dict) -> bool:
+    streams = summary.get("_streams")  # stored rides list their streams in meta.json
+    return "time" in streams if streams is not None else bool(ride_store.load_streams(ride_id, ["time"]))
+
+
+def _pack_hist(hist) -> list:
+    nz = np.flatnonzero(hist)
+    return [int(nz[0]), np.round(hist[nz[0]:nz[-1] + 1], 3).tolist()] if len(nz) else [0, []]
+
+
+def _unpack_hist(packed: list) -> np.ndarray:
+    hist = np.zeros(zones.ZONES["power"][1])
+    first, seconds = packed
+    hist[first:first + len(seconds)] = seconds
+    return hist
+
+
+def _read(conn, content_hash: str, hr_max: int) -> dict:
+    """One query for every part this request can use."""
+    rows = conn.execute(
+        "SELECT part, payload FROM metrics_cache WHERE content_hash = ? AND version = ? "
+        "AND ((part IN ('base', 'power_hist') AND param = '') OR (part = 'hr_zones' AND param = ?))",
+        (content_hash, METRICS_VERSION, str(hr_max)),
+    ).fetchall()
+    return {part: json.loads(payload) for part, payload in rows}
+
+
+def _write(conn, content_hash: str, parts: dict):
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO metrics_cache VALUES (?, ?, ?, ?, ?)",
+            [(content_hash, part, param, METRICS_VERSION, json.dumps(value)) for (part, param), value in parts.items()],
+        )
+
+
+# ===============================================================
+# 🔎 PUBLIC API
+# ===============================================================
+
+@timed("metrics", stage="cached")
+def cached_ride_metrics(ride_id: str, ftp: float = None, hr_max: int = None, df=None) -> dict:
+    """``compute_ride_metrics`` for a stored ride, served from the cache when possible."""
+    summary = ride_store.load_meta(ride_id)
+    if ftp is None or hr_max is None:
+        at = thresholds.values_on((summary.get("_meta") or {}).get("start_date"))
+        ftp, hr_max = ftp or at["ftp"], hr_max or int(at["hr_max"])
+    if df is None and not _has_streams(ride_id, summary):
+        # summary-only ride (e.g. a manual activity); not cached, every such ride shares the empty hash
+        count("metrics_cache_lookups_total", result="summary_only")
+        return apply_ftp(summary_ride_metrics(summary.get("_meta") or {}), ftp)
+    content_hash = _ride_hash(ride_id, summary)
+
+    conn = connect()
+    cached = _read(conn, content_hash, hr_max)
+    missing = {}
+    base = cached.get("base")
+    if (base is None or ("hr_zones" not in cached and "avg_hr" in base)
+            or ("power_hist" not in cached and "np_seconds" in base)):
+        if df is None:
+            df = strava_json_to_df(ride_store.load_ride(ride_id))
+        grid = ride_grid(df)
+        if "base" not in cached:
+            cached["base"] = missing[("base", "")] = base_ride_metrics(df, grid)
+        if "heartrate" in df.columns and "hr_zones" not in cached:
+            cached["hr_zones"] = missing[("hr_zones", str(hr_max))] = _hr_zones(df, hr_max, grid)
+        if "watts" in df.columns and "power_hist" not in cached:
+            hist = zones.ride_time_hists({}, grid).get("power", np.zeros(0))
+            cached["power_hist"] = missing[("power_hist", "")] = _pack_hist(hist)
+    if missing:
+        _write(conn, content_hash, missing)
+    conn.close()
+    count("metrics_cache_lookups_total", result="miss" if missing else "hit")
+
+    metrics = dict(cached["base"])
+    if "hr_zones" in cached:
+        metrics["hr_zone_dist"] = cached["hr_zones"]
+    if "power_hist" in cached:
+        metrics["power_zone_dist"] = zones.split(_unpack_hist(cached["power_hist"]), "power", ftp, percent=True)
+    return apply_ftp(metrics, ftp)
+
+
+def store_parts(ride_id: str, base: dict, hr_zones: dict = None, hr_max: int = None, power_hist=None):
+    """Seed the cache with metrics computed elsewhere (e.g. in an import worker)."""
+    parts = {("base", ""): base}
+    if hr_zones is not None:
+        parts[("hr_zones", str(hr_max or get_hr_max()))] = hr_zones
+    if power_hist is not None:
+        parts[("power_hist", "")] = _pack_hist(power_hist)
+    conn = connect()
+    _write(conn, _ride_hash(ride_id, ride_store.load_meta(ride_id)), parts)
+    conn.close()
+
+
+def warm(ride_id: str, hr_max: int = None, df=None):
+    """Populate the cache for a freshly ingested ride."""
+    cached_ride_metrics(ride_id, hr_max=hr_max, df=df)
+
+
+def prune(keep_hashes=None):
+    """Drop entries from older engine versions (and, optionally, for rides no longer stored)."""
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM metrics_cache WHERE version != ?", (METRICS_VERSION,))
+        if keep_hashes is not None:
+            keep = set(keep_hashes)
+            stale = [h for (h,) in conn.execute("SELECT DISTINCT content_hash FROM metrics_cache") if h not in keep]
+            conn.executemany("DELETE FROM metrics_cache WHERE content_hash = ?", [(h,) for h in stale])
+    conn.close()
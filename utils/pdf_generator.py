@@ -16,24 +16,31 @@ from reportlab.platypus import (
     Image,
     PageBreak,
 )
-import matplotlib.pyplot as plt
-import tempfile
 import pandas as pd
+import io
 import os
 from datetime import datetime, timedelta
 
+# The report cache key includes utils.report_jobs.GENERATOR_VERSION: bump it
+# whenever this module's layout or content changes. Charts (matplotlib) are
+# imported where they are drawn.
 
 # --------------------------------------------------------------
 # 🧩 MAIN REPORT FUNCTION
 # --------------------------------------------------------------
 
-def generate_ride_report(df: pd.DataFrame, metrics: dict, ride_name: str):
-    """Generate a PDF ride report and athlete progress summary."""
+def generate_ride_report(df: pd.DataFrame, metrics: dict, ride_name: str, pdf_path: str = None, ftp: float = None,
+                         progress: dict = None):
+    """Generate a PDF ride report and athlete progress summary.
+
+    ``progress`` (from ``build_progress``) lets batch callers share page 2.
+    """
 
     # --- Paths ---
-    os.makedirs("ride_reports", exist_ok=True)
-    safe_name = ride_name.replace(".json", "").replace(" ", "_")
-    pdf_path = os.path.join("ride_reports", f"{safe_name}_report.pdf")
+    if pdf_path is None:
+        os.makedirs("ride_reports", exist_ok=True)
+        safe_name = ride_name.replace(".json", "").replace(" ", "_")
+        pdf_path = os.path.join("ride_reports", f"{safe_name}_report.pdf")
 
     # --- Layout setup ---
     doc = SimpleDocTemplate(pdf_path, pagesize=letter)
@@ -91,20 +98,9 @@ def generate_ride_report(df: pd.DataFrame, metrics: dict, ride_name: str):
     # --- Power / HR / Speed Chart ---
     plot_cols = [c for c in ["watts", "heartrate", "speed_mph"] if c in df.columns]
     if plot_cols:
-        plt.figure(figsize=(6.2, 3))
-        for col in plot_cols:
-            plt.plot(df["time_s"], df[col], label=col.capitalize())
-        plt.xlabel("Time (s)")
-        plt.ylabel("Value")
-        plt.title("Ride Data")
-        plt.legend()
-        plt.tight_layout()
-
-        chart_path = tempfile.mktemp(suffix=".png")
-        plt.savefig(chart_path, dpi=150)
-        plt.close()
-
-        elements.append(Image(chart_path, width=6.5 * inch, height=3 * inch))
+        from utils import charts
+        chart = charts.ride_chart(df, plot_cols)
+        elements.append(Image(chart, width=6.5 * inch, height=3 * inch))
         elements.append(Spacer(1, 16))
 
     # --- HR Zones ---
@@ -129,15 +125,28 @@ def generate_ride_report(df: pd.DataFrame, metrics: dict, ride_name: str):
     # 📈 PAGE 2 — ATHLETE PROGRESS REPORT
     # ----------------------------------------------------------
     elements.append(PageBreak())
-    elements.append(Paragraph("📊 Athlete Progress Summary", title_style))
-    elements.append(Spacer(1, 12))
+    if progress is None:
+        progress = build_progress(ftp)
+    elements += _progress_elements(progress, styles, title_style, secondary_bg, accent)
+
+    # ----------------------------------------------------------
+    # 🧾 BUILD PDF
+    # ----------------------------------------------------------
+    doc.build(elements)
+    return pdf_path
+
+
+# --------------------------------------------------------------
+# 📈 PROGRESS SECTION — computed once, reusable across reports
+# --------------------------------------------------------------
+
+def build_progress(ftp: float = None) -> dict:
+    """Library-wide progress data for page 2 (plain values + chart PNG bytes, picklable)."""
+    from utils import charts
 
-    # --- Load all previous ride summaries ---
-    all_data = _load_all_rides_for_summary("ride_data/raw")
+    all_data = _load_all_rides_for_summary(ftp)
     if all_data.empty:
-        elements.append(Paragraph("No additional rides found for summary.", styles["Normal"]))
-        doc.build(elements)
-        return pdf_path
+        return {"total_rides": 0}
 
     # --- Compute trends (weekly TSS, avg power, volume) ---
     weekly = (
@@ -147,51 +156,107 @@ def generate_ride_report(df: pd.DataFrame, metrics: dict, ride_name: str):
         .mean()
         .reset_index()
     )
+    return {
+        "total_rides": len(all_data),
+        "total_distance_km": float(all_data["distance_km"].sum()),
+        "avg_power": float(all_data["avg_power"].mean()),
+        "avg_tss": float(all_data["tss"].mean()),
+        "trend_png": charts.trend_chart(weekly).getvalue() if not weekly.empty else None,
+    }
+
+
+def _progress_elements(progress: dict, styles, title_style, header_bg, header_fg) -> list:
+    elements = [Paragraph("📊 Athlete Progress Summary", title_style), Spacer(1, 12)]
+    if not progress.get("total_rides"):
+        elements.append(Paragraph("No additional rides found for summary.", styles["Normal"]))
+        return elements
 
     # --- Trend Charts ---
-    if not weekly.empty:
-        plt.figure(figsize=(6, 3))
-        plt.plot(weekly["date"], weekly["distance_km"], label="Weekly Distance (km)")
-        plt.plot(weekly["date"], weekly["tss"], label="Weekly TSS")
-        plt.title("Training Volume & Stress Trends")
-        plt.xlabel("Week")
-        plt.legend()
-        plt.tight_layout()
-        chart2_path = tempfile.mktemp(suffix=".png")
-        plt.savefig(chart2_path, dpi=150)
-        plt.close()
-        elements.append(Image(chart2_path, width=6.5 * inch, height=3 * inch))
+    if progress.get("trend_png"):
+        elements.append(Image(io.BytesIO(progress["trend_png"]), width=6.5 * inch, height=3 * inch))
         elements.append(Spacer(1, 16))
 
     # --- Summary Table ---
-    avg_power = all_data["avg_power"].mean()
-    avg_tss = all_data["tss"].mean()
-    total_dist = all_data["distance_km"].sum()
-    total_rides = len(all_data)
-
     summary_data = [
         ["Summary Metric", "Value"],
-        ["Total Rides", total_rides],
-        ["Total Distance (km)", f"{total_dist:.1f}"],
-        ["Average Power (W)", f"{avg_power:.1f}"],
-        ["Average TSS", f"{avg_tss:.1f}"],
+        ["Total Rides", progress["total_rides"]],
+        ["Total Distance (km)", f"{progress['total_distance_km']:.1f}"],
+        ["Average Power (W)", f"{progress['avg_power']:.1f}"],
+        ["Average TSS", f"{progress['avg_tss']:.1f}"],
     ]
     summary_table = Table(summary_data, hAlign="LEFT")
     summary_table.setStyle(
         TableStyle(
             [
-                ("BACKGROUND", (0, 0), (-1, 0), secondary_bg),
-                ("TEXTCOLOR", (0, 0), (-1, 0), accent),
+                ("BACKGROUND", (0, 0), (-1, 0), header_bg),
+                ("TEXTCOLOR", (0, 0), (-1, 0), header_fg),
                 ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
                 ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
             ]
         )
     )
     elements.append(summary_table)
+    return elements
 
-    # ----------------------------------------------------------
-    # 🧾 BUILD PDF
-    # ----------------------------------------------------------
+
+# --------------------------------------------------------------
+# 🗓️ SEASON SUMMARY — one table over many rides + progress page
+# --------------------------------------------------------------
+
+def generate_season_report(rides: list, pdf_path: str, title: str = "Season Summary",
+                           progress: dict = None, ftp: float = None):
+    """Combined report: one row per ride (catalog rows) followed by the progress section."""
+    doc = SimpleDocTemplate(pdf_path, pagesize=letter)
+    styles = getSampleStyleSheet()
+    secondary_bg = colors.HexColor("#EDE7F6")
+    accent = colors.HexColor("#311B92")
+    title_style = ParagraphStyle(
+        "title",
+        parent=styles["Heading1"],
+        textColor=colors.HexColor("#6200EE"),
+        fontSize=20,
+        spaceAfter=12,
+    )
+    elements = [Paragraph(f"🗓️ {title}", title_style), Spacer(1, 12)]
+
+    def num(v):
+        return float(v) if v is not None and v == v else 0.0
+
+    rows = [["Date", "Ride", "Distance (mi)", "Duration (min)", "NP (W)", "TSS"]]
+    for r in rides:
+        rows.append([
+            r.get("date") or "",
+            (r.get("name") or r["ride_id"])[:40],
+            f"{num(r.get('distance_m')) / 1609.34:.1f}",
+            f"{num(r.get('moving_time_s')) / 60:.0f}",
+            f"{num(r.get('np_power')):.0f}",
+            f"{num(r.get('tss')):.0f}",
+        ])
+    rows.append([
+        "Total", f"{len(rides)} rides",
+        f"{sum(num(r.get('distance_m')) for r in rides) / 1609.34:.1f}",
+        f"{sum(num(r.get('moving_time_s')) for r in rides) / 60:.0f}",
+        "",
+        f"{sum(num(r.get('tss')) for r in rides):.0f}",
+    ])
+    table = Table(rows, hAlign="LEFT", repeatRows=1)
+    table.setStyle(
+        TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, 0), secondary_bg),
+                ("TEXTCOLOR", (0, 0), (-1, 0), accent),
+                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+                ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+                ("FONTSIZE", (0, 0), (-1, -1), 8),
+            ]
+        )
+    )
+    elements.append(table)
+    elements.append(PageBreak())
+    if progress is None:
+        progress = build_progress(ftp)
+    elements += _progress_elements(progress, styles, title_style, secondary_bg, accent)
     doc.build(elements)
     return pdf_path
 
@@ -200,79 +265,26 @@ def generate_ride_report(df: pd.DataFrame, metrics: dict, ride_name: str):
 # 🗂️ HELPER — Load All Rides for Summary
 # --------------------------------------------------------------
 
-def _load_all_rides_for_summary(raw_dir: str) -> pd.DataFrame:
-    """Aggregate key stats from all saved ride JSONs, using FTP from Streamlit session if available."""
-    import json
-    import pandas as pd
-    import os
-    import streamlit as st
+def _load_all_rides_for_summary(ftp: float = None) -> pd.DataFrame:
+    """Aggregate key stats for all rides from the catalog, scored with ``ftp`` or the dated FTP history."""
+    from utils import catalog, pmc
 
-    # --- Get FTP from settings tab (fallback 250W) ---
-    ftp = st.session_state.get("ftp", 250.0)
+    cat = catalog.rides_dataframe(order="date ASC")
 
-    if not os.path.exists(raw_dir):
+    # ---- Parse Date ----
+    cat["date"] = pd.to_datetime(cat["date"], errors="coerce")
+    cat = cat.dropna(subset=["date"])
+    if cat.empty:
         return pd.DataFrame(columns=["date", "distance_km", "avg_power", "tss"])
 
-    records = []
-    for fname in os.listdir(raw_dir):
-        if not fname.endswith(".json"):
-            continue
-        try:
-            with open(os.path.join(raw_dir, fname), "r") as f:
-                data = json.load(f)
-
-            # ---- Parse Date ----
-            date_val = data.get("start_date_local") or data.get("start_date")
-            if not date_val:
-                continue
-            date = pd.to_datetime(date_val, errors="coerce")
-            if pd.isna(date):
-                continue
-
-            # ---- Distance ----
-            dist = data.get("distance", 0)
-            if isinstance(dist, dict):
-                dist = dist.get("data", [0])[-1] if "data" in dist else 0
-
-            # ---- Duration ----
-            moving_time = float(data.get("moving_time", 0))
-            hours = moving_time / 3600 if moving_time else 0
-
-            # ---- Power Metrics ----
-            avg_power = data.get("average_watts", 0) or 0
-            np_power = data.get("np_power", avg_power)
-            intensity_factor = data.get("intensity_factor")
-
-            # ---- Compute / Estimate TSS ----
-            tss = data.get("tss", None)
-            if not tss or tss == 0:
-                if not intensity_factor and np_power and ftp:
-                    intensity_factor = np_power / ftp
-                if hours > 0 and intensity_factor:
-                    tss = (hours * (intensity_factor ** 2) * 100)
-                elif hours > 0 and avg_power and ftp:
-                    tss = (hours * ((avg_power / ftp) ** 2) * 100)
-                else:
-                    tss = 0
-
-            records.append({
-                "date": date,
-                "distance_km": dist / 1000 if dist else 0,
-                "avg_power": avg_power,
-                "tss": tss,
-            })
-
-        except Exception:
-            continue
-
-    # ---- Always Return a Valid DF ----
-    if not records:
-        return pd.DataFrame(columns=["date", "distance_km", "avg_power", "tss"])
-
-    df = pd.DataFrame(records)
-    if "date" not in df.columns:
-        df["date"] = pd.NaT
-
-    df = df.dropna(subset=["date"], how="all")
-    df = df.sort_values("date").reset_index(drop=True)
-    return df
+    # ---- TSS (NP when known, else avg power) ----
+    avg_power = cat["average_watts"].fillna(0).astype(float)
+    tss = pmc.ride_tss(cat, ftp)
+
+    df = pd.DataFrame({
+        "date": cat["date"],
+        "distance_km": cat["distance_m"].fillna(0).astype(float) / 1000,
+        "avg_power": avg_power,
+        "tss": tss,
+    })
+    return df.sort_values("date").reset_index(drop=True)
@@ -0,0 +1,212 @@
+# ===============================================================
+# 📈 PERFORMANCE MANAGER — day-resolution CTL / ATL / TSB
+# ===============================================================
+#
+# Ride TSS is summed per calendar day (rest days count as 0) and smoothed
+# with exponentially weighted averages:
+#
+#   CTL[d] = CTL[d-1] + (TSS[d] - CTL[d-1]) * (1 - exp(-1 / ctl_days))
+#
+# The daily series for the default parameters (dated FTP, CTL_DAYS,
+# ATL_DAYS) is stored next to the catalog, so a new ride only recomputes
+# from its date forward, seeded with the stored day before. Any other FTP
+# or time constants are computed on the fly and never overwrite it.
+#
+# ``ftp=None`` (the default) scores each ride with the FTP in effect on its
+# date (utils/thresholds.py); a number scores every ride with that FTP.
+# Either way TSS comes from catalog statistics, so a changed FTP history
+# re-scores the whole library in one vectorized pass.
+
+import json
+import numpy as np
+import pandas as pd
+from datetime import date as date_cls, timedelta
+from utils import catalog, thresholds
+from utils.telemetry import timed
+
+CTL_DAYS = 42
+ATL_DAYS = 7
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pmc_days (
+    date TEXT PRIMARY KEY,
+    tss REAL,
+    rides INTEGER,
+    distance_m REAL,
+    names TEXT,
+    types TEXT,
+    ctl REAL,
+    atl REAL
+);
+"""
+
+
+# ===============================================================
+# 🧮 BULK ENGINE
+# ===============================================================
+
+def ride_tss(rides: pd.DataFrame, ftp: float = None) -> pd.Series:
+    """Per-ride TSS from catalog rows: NP-based, falling back to average power over moving time."""
+    moving = rides["moving_time_s"].fillna(0).astype(float)
+    seconds = rides["np_seconds"].astype(float).fillna(moving) if "np_seconds" in rides else moving
+    watts = rides["np_power"].astype(float).fillna(rides["average_watts"].astype(float))
+    ftp = thresholds.values_at("ftp", rides["date"].tolist()) if ftp is None else ftp
+    _, tss = thresholds.training_stress(watts.to_numpy(), seconds.to_numpy(), ftp)
+    return pd.Series(tss, index=rides.index).fillna(0)
+
+
+def _ewm(values: np.ndarray, days: float, seed: float) -> np.ndarray:
+    alpha = 1 - np.exp(-1 / days)
+    seeded = pd.Series(np.concatenate([[seed], values]))
+    return seeded.ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+
+
+def compute_pmc(tss: pd.Series, ctl_days: float = CTL_DAYS, atl_days: float = ATL_DAYS,
+                ctl0: float = 0.0, atl0: float = 0.0, start=None, end=None) -> pd.DataFrame:
+    """Bulk PMC for any TSS history (indexed by date/datetime, several entries per day allowed).
+
+    Returns one row per calendar day from ``start`` (default: first entry) to
+    ``end`` (default: last entry), seeded with ``ctl0`` / ``atl0``.
+    """
+    daily = tss.groupby(pd.to_datetime(tss.index).normalize()).sum()
+    start = pd.Timestamp(start) if start is not None else (daily.index.min() if len(daily) else None)
+    end = pd.Timestamp(end) if end is not None else (daily.index.max() if len(daily) else None)
+    if start is None or end is None or end < start:
+        return pd.DataFrame(columns=["date", "tss", "CTL", "ATL", "TSB"])
+
+    days = pd.date_range(start, end, freq="D")
+    load = daily.reindex(days, fill_value=0.0).to_numpy(dtype=float)
+    ctl = _ewm(load, ctl_days, ctl0)
+    atl = _ewm(load, atl_days, atl0)
+    return pd.DataFrame({"date": days, "tss": load, "CTL": ctl, "ATL": atl, "TSB": ctl - atl})
+
+
+# ===============================================================
+# 💾 STORED STATE
+# ===============================================================
+
+def _connect():
+    conn = catalog.connect()
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _params() -> str:
+    """Tag of the stored series: the FTP history it was scored with."""
+    return json.dumps({"ftp": thresholds.signature(), "ctl_days": float(CTL_DAYS), "atl_days": float(ATL_DAYS)})
+
+
+def _daily_rides(start=None) -> pd.DataFrame:
+    """Catalog rows from ``start`` on, as a DataFrame with a datetime ``day`` column."""
+    rides = catalog.rides_dataframe(start=start, order="date ASC")
+    rides = rides[rides["date"].notna()].copy()
+    rides["day"] = pd.to_datetime(rides["date"])
+    return rides
+
+
+def _series(rides: pd.DataFrame, ftp, ctl_days, atl_days, ctl0, atl0, start, end) -> pd.DataFrame:
+    """Daily rows in the ``pmc_days`` layout for ``rides`` between ``start`` and ``end``."""
+    pmc = compute_pmc(pd.Series(ride_tss(rides, ftp).to_numpy(), index=rides["day"]),
+                      ctl_days, atl_days, ctl0, atl0, start=start, end=end)
+    if pmc.empty:
+        return pd.DataFrame(columns=["date", "tss", "rides", "distance_m", "names", "types", "ctl", "atl"])
+    per_day = rides.groupby("day").agg(
+        rides=("ride_id", "size"),
+        distance_m=("distance_m", "sum"),
+        names=("name", lambda s: ", ".join(str(n) for n in s if n)),
+        types=("type", lambda s: ", ".join(sorted({str(t) for t in s if t}))),
+    ).reindex(pmc["date"])
+    return pd.DataFrame({
+        "date": pmc["date"].dt.strftime("%Y-%m-%d").to_numpy(),
+        "tss": pmc["tss"].to_numpy(dtype=float),
+        "rides": per_day["rides"].fillna(0).astype(int).to_numpy(),
+        "distance_m": per_day["distance_m"].fillna(0.0).astype(float).to_numpy(),
+        "names": per_day["names"].fillna("").to_numpy(),
+        "types": per_day["types"].fillna("").to_numpy(),
+        "ctl": pmc["CTL"].to_numpy(dtype=float),
+        "atl": pmc["ATL"].to_numpy(dtype=float),
+    })
+
+
+@timed("pmc_update")
+def update_from(day, conn=None):
+    """Recompute the stored (default-parameter) series from ``day`` (None = everything) through today."""
+    own = conn is None
+    conn = conn or _connect()
+    params = _params()
+    stored = conn.execute("SELECT value FROM catalog_info WHERE key = 'pmc_params'").fetchone()
+    if stored is None or stored[0] != params:
+        day = None
+
+    start = pd.Timestamp(day).normalize() if day is not None else None
+    last = conn.execute("SELECT MAX(date) FROM pmc_days").fetchone()[0]
+    if start is not None and last is not None:
+        # never leave a hole between the stored series and the recomputed part
+        start = min(start, pd.Timestamp(last) + pd.Timedelta(days=1))
+    ctl0 = atl0 = 0.0
+    if start is not None:
+        prev = conn.execute(
+            "SELECT ctl, atl FROM pmc_days WHERE date < ? ORDER BY date DESC LIMIT 1", (start.date().isoformat(),)
+        ).fetchone()
+        if prev is not None:
+            ctl0, atl0 = prev
+
+    rides = _daily_rides(start.date().isoformat() if start is not None else None)
+    if start is None:
+        start = rides["day"].min() if len(rides) else None
+    if start is None:
+        with conn:
+            conn.execute("DELETE FROM pmc_days")
+            conn.execute("INSERT OR REPLACE INTO catalog_info VALUES ('pmc_params', ?)", (params,))
+        if own:
+            conn.close()
+        return
+
+    end = max(pd.Timestamp(date_cls.today()), rides["day"].max() if len(rides) else start)
+    rows = _series(rides, None, CTL_DAYS, ATL_DAYS, ctl0, atl0, start, end)
+    with conn:
+        conn.execute("DELETE FROM pmc_days WHERE date >= ?", (start.date().isoformat(),))
+        if day is None:
+            conn.execute("DELETE FROM pmc_days")
+        conn.executemany("INSERT INTO pmc_days VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         rows.itertuples(index=False, name=None))
+        conn.execute("INSERT OR REPLACE INTO catalog_info VALUES ('pmc_params', ?)", (params,))
+    if own:
+        conn.close()
+
+
+def get_pmc(ftp: float = None, ctl_days: float = CTL_DAYS, atl_days: float = ATL_DAYS, start=None, end=None) -> pd.DataFrame:
+    """Daily PMC: the stored series (brought up to date incrementally) for the default
+    parameters, computed on the fly from catalog statistics for any other ``ftp`` / time constants."""
+    conn = _connect()
+    catalog._ensure_built(conn)
+    if ftp is not None or float(ctl_days) != CTL_DAYS or float(atl_days) != ATL_DAYS:
+        conn.close()
+        rides = _daily_rides()
+        first, end_day = (rides["day"].min(), max(pd.Timestamp(date_cls.today()), rides["day"].max())) \
+            if len(rides) else (None, None)
+        df = _series(rides, ftp, ctl_days, atl_days, 0.0, 0.0, first, end_day)
+        if start is not None or end is not None:
+            df = df[(df["date"] >= str(start or "0000-00-00")) & (df["date"] <= str(end or "9999-99-99"))]
+        df = df.reset_index(drop=True)
+    else:
+        stored = conn.execute("SELECT value FROM catalog_info WHERE key = 'pmc_params'").fetchone()
+        last = conn.execute("SELECT MAX(date) FROM pmc_days").fetchone()[0]
+        if stored is None or stored[0] != _params():
+            update_from(None, conn)
+        elif last is not None and last < date_cls.today().isoformat():
+            update_from(date_cls.fromisoformat(last) + timedelta(days=1), conn)
+
+        sql, params = "SELECT * FROM pmc_days", []
+        if start is not None or end is not None:
+            sql += " WHERE date >= ? AND date <= ?"
+            params = [str(start or "0000-00-00"), str(end or "9999-99-99")]
+        df = pd.read_sql_query(sql + " ORDER BY date", conn, params=params)
+        conn.close()
+    return df.rename(columns={"ctl": "CTL", "atl": "ATL"}).assign(TSB=lambda d: d["CTL"] - d["ATL"])
+
+
+def on_ride_changed(ride_date):
+    """Ingest hook: refresh the stored series from the ride's date forward."""
+    if ride_date:
+        update_from(ride_date)
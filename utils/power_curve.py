@@ -0,0 +1,225 @@
+# ===============================================================
+# ⚡ POWER CURVE — mean-maximal power (MMP) per ride + best-ever envelope
+# ===============================================================
+#
+# For a duration d the best average power is
+#   max(cumsum[d:] - cumsum[:-d]) / d
+# over the ride's 1 Hz grid (utils/resample.py): short recording gaps hold
+# the last value, pauses and dropouts count as 0 W so no effort spans a
+# stop. Each duration is one O(n) pass, so the curve is evaluated exactly
+# for every duration up to EXACT_S and for log-spaced durations (LOG_STEP
+# apart, plus ANCHORS) beyond; the stored curve interpolates between them
+# in log time. MMP never rises with duration, so interpolated values stay
+# between their exact neighbours. A 5-hour ride is ~800 passes instead of
+# 18 000, and the cost grows as n·log n, not n².
+#
+# Per-ride curves are stored as float32 .npy files; the library-wide
+# envelope (best power and the ride that set it, per duration) is updated
+# incrementally on ingest. Date-window curves are built from the stored
+# per-ride curves and never touch streams.
+
+import os
+import numpy as np
+from utils import ride_store, catalog, resample
+from utils.telemetry import count
+
+CURVE_DIR = "ride_data/power_curves"
+ENVELOPE_FILE = "_envelope.npz"
+
+EXACT_S = 600
+LOG_STEP = 1.02
+ANCHORS = (1200, 1800, 3600, 7200)  # standard best efforts, always exact
+
+
+# ===============================================================
+# 🧮 ENGINE
+# ===============================================================
+
+def power_1hz(time_s: np.ndarray, watts: np.ndarray) -> np.ndarray:
+    """Power on the ride's elapsed 1 Hz grid; paused and dropped-out seconds count as 0 W."""
+    watts = np.asarray(watts, dtype=np.float64)
+    if time_s is None or len(time_s) != len(watts):
+        return np.nan_to_num(watts, nan=0.0)
+    return np.nan_to_num(resample.to_1hz(time_s, {"watts": watts}, pause="zero")["watts"], nan=0.0)
+
+
+def _best_means(cs: np.ndarray, durations: np.ndarray) -> np.ndarray:
+    """Best average power at each duration from the power cumsum (one O(n) pass per duration)."""
+    n = len(cs) - 1
+    return np.array([(cs[d:] - cs[:n - d + 1]).max() / d for d in durations])
+
+
+def mmp_durations(n: int) -> np.ndarray:
+    """Durations ``mmp_curve`` evaluates exactly for a ride of ``n`` seconds."""
+    dense = np.arange(1, min(n, EXACT_S) + 1)
+    if n <= EXACT_S:
+        return dense
+    steps = int(np.ceil(np.log(n / EXACT_S) / np.log(LOG_STEP)))
+    sparse = np.geomspace(EXACT_S, n, steps + 1).round().astype(np.int64)
+    sparse = np.unique(np.concatenate([sparse, np.array([a for a in ANCHORS if a <= n] + [n], dtype=np.int64)]))
+    return np.concatenate([dense, sparse[sparse > EXACT_S]])
+
+
+def mmp_curve(power: np.ndarray) -> np.ndarray:
+    """Best average power for every duration 1 … len(power) seconds (index = duration - 1)."""
+    power = np.nan_to_num(np.asarray(power, dtype=np.float64), nan=0.0)
+    n = len(power)
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    cs = np.concatenate([[0.0], np.cumsum(power)])
+    durations = mmp_durations(n)
+    best = _best_means(cs, durations)
+    if n > EXACT_S:
+        best = np.interp(np.log(np.arange(1, n + 1)), np.log(durations), best)
+    return best.astype(np.float32)
+
+
+def ride_curve_from_streams(streams: dict, grid: dict = None) -> np.ndarray:
+    """MMP curve for a ride; ``grid`` is its ``resample.ride_1hz`` grid when the caller has one."""
+    if "watts" not in streams:
+        return np.zeros(0, dtype=np.float32)
+    if grid is not None and "watts" in grid and len(grid["watts"]) == len(grid["moving"]):
+        return mmp_curve(np.where(grid["moving"], np.nan_to_num(grid["watts"], nan=0.0), 0.0))
+    return mmp_curve(power_1hz(streams.get("time"), streams["watts"]))
+
+
+# ===============================================================
+# 💾 PER-RIDE CURVES
+# ===============================================================
+
+def _curve_path(ride_id: str) -> str:
+    return os.path.join(CURVE_DIR, f"{ride_store.ride_id_from_name(ride_id)}.npy")
+
+
+def save_curve(ride_id: str, curve: np.ndarray):
+    os.makedirs(CURVE_DIR, exist_ok=True)
+    tmp = _curve_path(ride_id) + ".tmp.npy"
+    np.save(tmp, np.asarray(curve, dtype=np.float32))
+    os.replace(tmp, _curve_path(ride_id))
+
+
+def load_curve(ride_id: str, mmap: bool = True):
+    path = _curve_path(ride_id)
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode="r" if mmap else None)
+
+
+def delete_curve(ride_id: str):
+    """Remove a ride's curve; the envelope is only rebuilt if the ride held one of its records."""
+    if os.path.exists(_curve_path(ride_id)):
+        os.remove(_curve_path(ride_id))
+        if (load_envelope()[1] == ride_store.ride_id_from_name(ride_id)).any():
+            rebuild_envelope()
+
+
+# ===============================================================
+# 🏆 ENVELOPE
+# ===============================================================
+
+def _envelope_path() -> str:
+    return os.path.join(CURVE_DIR, ENVELOPE_FILE)
+
+
+def load_envelope():
+    """(best power per duration, ride id per duration)."""
+    if not os.path.exists(_envelope_path()):
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype="U1")
+    with np.load(_envelope_path()) as z:
+        return z["power"], z["ride_ids"]
+
+
+def _save_envelope(power: np.ndarray, ride_ids: np.ndarray):
+    os.makedirs(CURVE_DIR, exist_ok=True)
+    tmp = _envelope_path() + ".tmp.npz"
+    np.savez(tmp, power=power.astype(np.float32), ride_ids=ride_ids)
+    os.replace(tmp, _envelope_path())
+
+
+def _merge(power, ride_ids, curve, ride_id):
+    """Fold one curve into an envelope (in place where possible)."""
+    n = len(curve)
+    if n > len(power):
+        power = np.concatenate([power, np.zeros(n - len(power), dtype=np.float32)])
+        ride_ids = np.concatenate([ride_ids.astype(object), np.full(n - len(ride_ids), "", dtype=object)])
+    else:
+        ride_ids = ride_ids.astype(object)
+    better = curve > power[:n]
+    power[:n][better] = curve[better]
+    ride_ids[:n][better] = ride_id
+    return power, ride_ids
+
+
+def update_envelope(ride_id: str, curve: np.ndarray):
+    """Incrementally fold a new or re-ingested ride's curve into the envelope."""
+    ride_id = ride_store.ride_id_from_name(ride_id)
+    power, ride_ids = load_envelope()
+    held = ride_ids == ride_id
+    if held.any():
+        # the ride already holds records; a changed curve may lower them
+        n = min(len(curve), len(power))
+        if (np.asarray(curve[:n]) < power[:n])[held[:n]].any() or held[n:].any():
+            return rebuild_envelope()
+    power, ride_ids = _merge(power.copy(), ride_ids, np.asarray(curve, dtype=np.float32), ride_id)
+    _save_envelope(power, ride_ids.astype(str))
+
+
+def rebuild_envelope():
+    """Recompute the envelope from every stored per-ride curve."""
+    power, ride_ids = np.zeros(0, dtype=np.float32), np.zeros(0, dtype=object)
+    if os.path.exists(CURVE_DIR):
+        for fname in sorted(os.listdir(CURVE_DIR)):
+            if fname.endswith(".npy") and not fname.endswith(".tmp.npy"):
+                power, ride_ids = _merge(power, ride_ids, np.load(os.path.join(CURVE_DIR, fname)), fname[:-4])
+    _save_envelope(power, ride_ids.astype(str))
+
+
+# ===============================================================
+# 🔎 QUERIES
+# ===============================================================
+
+def curve_for_rides(ride_ids) -> tuple:
+    """Best power per duration across the given rides, from stored curves."""
+    power, holders = np.zeros(0, dtype=np.float32), np.zeros(0, dtype=object)
+    for ride_id in ride_ids:
+        curve = load_curve(ride_id)
+        if curve is not None and len(curve):
+            power, holders = _merge(power, holders, np.asarray(curve), ride_store.ride_id_from_name(ride_id))
+    return power, holders.astype(str)
+
+
+def curve_for_window(start=None, end=None, types=None) -> tuple:
+    """Best power per duration for rides dated in [start, end] (e.g. the last 90 days)."""
+    if start is None and end is None and not types:
+        return load_envelope()
+    rows = catalog.query_rides(start=start, end=end, types=types)
+    return curve_for_rides(r["ride_id"] for r in rows)
+
+
+def best_efforts(power: np.ndarray, durations=(5, 60, 300, 1200, 3600)) -> dict:
+    """Pick standard durations (seconds) off a curve."""
+    return {d: float(power[d - 1]) for d in durations if d <= len(power)}
+
+
+def on_ride_ingested(ride_id: str, curve: np.ndarray = None):
+    """Ingest hook: compute (unless given), store and fold in the ride's curve."""
+    if curve is None:
+        curve = ride_curve_from_streams(ride_store.load_streams(ride_id, ["time", "watts"]))
+    save_curve(ride_id, curve)
+    update_envelope(ride_id, curve)
+
+
+def rebuild_curves(missing_only: bool = True) -> int:
+    """Backfill per-ride curves for the library, then rebuild the envelope."""
+    done = 0
+    for ride_id in ride_store.list_ride_ids():
+        if missing_only and os.path.exists(_curve_path(ride_id)):
+            continue
+        try:
+            save_curve(ride_id, ride_curve_from_streams(ride_store.load_streams(ride_id, ["time", "watts"])))
+            done += 1
+        except Exception:
+            count("rebuild_errors_total", index="power_curve")
+            continue
+    rebuild_envelope()
+    return done
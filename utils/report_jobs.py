@@ -0,0 +1,220 @@
+# ===============================================================
+# 🧾 REPORT JOBS — background PDF rendering with cached outputs
+# ===============================================================
+#
+# A report is identified by everything that shapes its content:
+#
+#   ride content hash + FTP + HR max + GENERATOR_VERSION + METRICS_VERSION
+#   + catalog change stamp (page 2 summarises the whole library)
+#
+# The key is also the job id. Job state lives on disk next to the output:
+#
+#   ride_data/reports/<key>.pdf        finished report
+#   ride_data/reports/<key>.job.json   submitted (ride id, time)
+#   ride_data/reports/<key>.err.json   render failed (error text)
+#
+# so a poll or download that lands on another process (or after a cold
+# start) sees the same job; a render with no result after RENDER_TIMEOUT_S
+# counts as failed and is retried by the next submit. Renders run in a
+# process pool (matplotlib's pyplot state is per process); concurrent
+# requests for the same key in one process share one future and therefore
+# one render, and that future is the fast path for status.
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from utils import ride_store, catalog, thresholds
+from utils.ride_analysis_utils import METRICS_VERSION
+from utils.telemetry import timed, count, task_flush
+
+REPORT_DIR = "ride_data/reports"
+# bump when utils/pdf_generator.py's layout or content changes
+GENERATOR_VERSION = 2
+RENDER_TIMEOUT_S = 600
+
+
+def report_key(ride_id: str, ftp: float, hr_max: int) -> str:
+    content_hash = (ride_store.load_meta(ride_id).get("_store") or {}).get("hash") \
+        or ride_store.content_hash(ride_store.load_streams(ride_id))
+    raw = f"{content_hash}|{ftp}|{hr_max}|{GENERATOR_VERSION}|{METRICS_VERSION}|{catalog.changed_at()!r}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:24]
+
+
+def report_path(key: str) -> str:
+    return os.path.join(REPORT_DIR, f"{key}.pdf")
+
+
+def _marker(path: str, kind: str) -> str:
+    """``<key>.job.json`` / ``<key>.err.json`` beside a report's PDF path."""
+    return path[:-len(".pdf")] + f".{kind}.json"
+
+
+def _write_json(path: str, doc: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + f".{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(doc, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@task_flush
+@timed("report_render", kind="ride")
+def render_report(ride_id: str, ftp: float, hr_max: int, path: str, progress: dict = None) -> str:
+    """Render one ride's PDF to ``path`` (runs in a worker process).
+
+    ``progress`` is the shared page-2 section from ``pdf_generator.build_progress``.
+    """
+    from utils.pdf_generator import generate_ride_report
+    from utils.metrics_cache import cached_ride_metrics
+    from utils.ride_analysis_utils import strava_json_to_df
+
+    try:
+        df = strava_json_to_df(ride_store.load_ride(ride_id))
+        metrics = cached_ride_metrics(ride_id, ftp=ftp, hr_max=hr_max, df=df)
+        name = ride_store.load_meta(ride_id).get("_meta", {}).get("name") or ride_id
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + f".{os.getpid()}.tmp"
+        generate_ride_report(df, metrics, name, pdf_path=tmp, ftp=ftp, progress=progress)
+        os.replace(tmp, path)
+    except Exception as e:
+        _write_json(_marker(path, "err"), {"error": f"{type(e).__name__}: {e}"})
+        raise
+    return path
+
+
+# ===============================================================
+# 🧵 QUEUE
+# ===============================================================
+
+class ReportQueue:
+    """Submit → job id → poll → download, with one render per report key."""
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self._pool = None
+        self._lock = threading.Lock()
+        self._inflight = {}  # key (= job id) → Future
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def submit(self, ride_id: str, ftp: float = None, hr_max: int = None) -> dict:
+        """Queue a report (or reuse a cached file / an identical running render).
+
+        Unless given, FTP and HR max are the values in effect on the ride's date, as in the catalog.
+        """
+        ride_id = ride_store.ride_id_from_name(ride_id)
+        if ftp is None or hr_max is None:
+            at = thresholds.values_on((ride_store.load_meta(ride_id).get("_meta") or {}).get("start_date"))
+            ftp, hr_max = ftp or at["ftp"], hr_max or int(at["hr_max"])
+        key = report_key(ride_id, ftp, hr_max)
+        path = report_path(key)
+
+        with self._lock:
+            cached = os.path.exists(path)
+            if cached:
+                count("report_requests_total", result="cached")
+            elif key in self._inflight:
+                count("report_requests_total", result="joined")
+            else:
+                count("report_requests_total", result="rendered")
+                if os.path.exists(_marker(path, "err")):
+                    os.remove(_marker(path, "err"))  # resubmitting retries a failed render
+                _write_json(_marker(path, "job"), {"ride_id": ride_id, "submitted_at": time.time()})
+                fut = self._executor().submit(render_report, ride_id, ftp, hr_max, path)
+                self._inflight[key] = fut
+                fut.add_done_callback(lambda f, k=key: self._done(k, f))
+        if cached and not os.path.exists(_marker(path, "job")):
+            _write_json(_marker(path, "job"), {"ride_id": ride_id, "submitted_at": time.time()})
+        return dict(self.status(key), cached=cached)
+
+    def _done(self, key: str, fut):
+        err = _marker(report_path(key), "err")
+        if fut.exception() is not None and not os.path.exists(err):  # e.g. the worker process died
+            _write_json(err, {"error": f"{type(fut.exception()).__name__}: {fut.exception()}"})
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def status(self, job_id: str) -> dict:
+        """Public view of a job: state is queued / running / done / failed (KeyError if unknown)."""
+        if not re.fullmatch(r"[0-9a-f]{24}", job_id):
+            raise KeyError(job_id)
+        path = report_path(job_id)
+        job = _read_json(_marker(path, "job"))
+        if job is None:
+            raise KeyError(job_id)
+        fut = self._inflight.get(job_id)
+        error = None
+        if os.path.exists(path):
+            state = "done"
+        elif fut is not None and not fut.done():
+            state = "running" if fut.running() else "queued"
+        elif os.path.exists(_marker(path, "err")):
+            state, error = "failed", (_read_json(_marker(path, "err")) or {}).get("error")
+        elif fut is None and time.time() - job["submitted_at"] > RENDER_TIMEOUT_S:
+            state, error = "failed", "render did not finish"
+        else:
+            state = "running"  # rendering in another process
+        return {"job_id": job_id, "ride_id": job["ride_id"], "state": state,
+                "submitted_at": job["submitted_at"], "error": error}
+
+    def result_path(self, job_id: str) -> str:
+        """PDF path of a finished job (KeyError if unknown, RuntimeError if not ready)."""
+        st = self.status(job_id)
+        if st["state"] != "done":
+            raise RuntimeError(f"Report is {st['state']}")
+        return report_path(job_id)
+
+    def wait(self, job_id: str, timeout: float = None) -> dict:
+        fut = self._inflight.get(job_id)
+        if fut is not None:
+            try:
+                fut.result(timeout)
+            except Exception:
+                pass
+        return self.status(job_id)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> ReportQueue:
+    """Process-wide queue shared by the API handlers."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = ReportQueue()
+        return _queue
+
+
+def prune(max_age_days: float = 30) -> int:
+    """Remove cached reports (and their job markers) not written for ``max_age_days``."""
+    if not os.path.exists(REPORT_DIR):
+        return 0
+    cutoff, removed = time.time() - max_age_days * 86400, 0
+    for fname in os.listdir(REPORT_DIR):
+        path = os.path.join(REPORT_DIR, fname)
+        if fname.endswith((".pdf", ".json")) and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            removed += 1
+    return removed
@@ -0,0 +1,123 @@
+# ===============================================================
+# ⏱️ RESAMPLE — gap-aware 1 Hz grid for windowed metrics
+# ===============================================================
+#
+# Recorded streams are irregular: smart recording skips seconds, auto-pause
+# leaves long holes, sensors drop out (null → NaN samples) and some head
+# units log faster than 1 Hz. Windowed metrics (NP's 30 s average, MMP,
+# time in zone) need exactly one value per second, so they all run on the
+# grid built by ``to_1hz``:
+#
+#   1. samples are binned to whole seconds since the first one
+#      (several samples in one second are averaged)
+#   2. a hole in the timeline longer than PAUSE_GAP_S is a pause: its
+#      seconds are marked not ``moving`` and filled per ``pause``
+#   3. shorter holes — and NaN runs in one channel that are no longer —
+#      are filled per ``fill``; longer NaN runs while moving are dropouts
+#      and stay NaN (``np.isnan(grid[key]) & grid["moving"]``)
+#
+#   fill   "hold" (last value; what smart recording implies), "linear", "nan"
+#   pause  "nan" (keep elapsed seconds), "zero", "drop" (moving seconds only)
+#
+# Everything is bincount / accumulate arithmetic — no per-sample Python —
+# so ingestion resamples each ride once and hands the grid to every metric.
+
+import numpy as np
+
+PAUSE_GAP_S = 10
+FILLS = ("hold", "linear", "nan")
+PAUSES = ("nan", "zero", "drop")
+CHANNELS = ("watts", "heartrate", "cadence", "velocity_smooth", "altitude")
+
+
+# ===============================================================
+# 🧩 HELPERS
+# ===============================================================
+
+def _neighbours(have: np.ndarray) -> tuple:
+    """Index of the last ``have`` second at or before, and the first at or after, each second.
+
+    -1 / len(have) where there is none.
+    """
+    n = len(have)
+    idx = np.arange(n)
+    prev = np.maximum.accumulate(np.where(have, idx, -1))
+    nxt = np.minimum.accumulate(np.where(have, idx, n)[::-1])[::-1]
+    return prev, nxt
+
+
+def _fill(vals: np.ndarray, have: np.ndarray, fill: str, max_gap: float) -> np.ndarray:
+    """Fill holes in ``vals`` bounded on both sides and spanning at most ``max_gap`` seconds."""
+    if fill == "nan" or have.all() or not have.any():
+        return vals
+    prev, nxt = _neighbours(have)
+    short = ~have & (prev >= 0) & (nxt < len(vals)) & (nxt - prev <= max_gap)
+    p, q = prev[short], nxt[short]
+    if fill == "hold":
+        vals[short] = vals[p]
+    else:
+        frac = (np.flatnonzero(short) - p) / (q - p)
+        vals[short] = vals[p] + (vals[q] - vals[p]) * frac
+    return vals
+
+
+# ===============================================================
+# ⏱️ GRID
+# ===============================================================
+
+def to_1hz(time_s, channels: dict, fill: str = "hold", pause: str = "nan",
+           max_gap: float = PAUSE_GAP_S) -> dict:
+    """Resample ``channels`` (name → samples aligned with ``time_s``) onto a 1 Hz grid.
+
+    Returns {"time": seconds since the first sample, "moving": bool, name: float64 values}.
+    Channels whose length differs from ``time_s`` are skipped.
+    """
+    if fill not in FILLS or pause not in PAUSES:
+        raise ValueError(f"fill must be one of {FILLS} and pause one of {PAUSES}")
+    t = np.asarray(time_s, dtype=np.float64)
+    channels = {k: np.asarray(v, dtype=np.float64) for k, v in channels.items()
+                if v is not None and len(v) == len(t)}
+    if not len(t):
+        return {"time": np.zeros(0, dtype=np.int64), "moving": np.zeros(0, dtype=bool),
+                **{k: np.zeros(0) for k in channels}}
+    if (np.diff(t) < 0).any():
+        order = np.argsort(t, kind="stable")
+        t = t[order]
+        channels = {k: v[order] for k, v in channels.items()}
+
+    sec = np.floor(t - t[0] + 1e-6).astype(np.int64)
+    n = int(sec[-1]) + 1
+    present = np.bincount(sec, minlength=n) > 0
+    prev, nxt = _neighbours(present)
+    moving = present | (nxt - prev <= max_gap)
+
+    out = {"time": np.arange(n), "moving": moving}
+    for key, v in channels.items():
+        ok = ~np.isnan(v)
+        hits = np.bincount(sec[ok], minlength=n)
+        sums = np.bincount(sec[ok], weights=v[ok], minlength=n)
+        have = hits > 0
+        vals = np.divide(sums, hits, out=np.full(n, np.nan), where=have)
+        vals = _fill(vals, have, fill, max_gap)
+        vals[~moving] = 0.0 if pause == "zero" else np.nan
+        out[key] = vals
+    if pause == "drop":
+        out = {k: a[moving] for k, a in out.items()}
+    return out
+
+
+def ride_1hz(streams: dict, keys=CHANNELS, **policy) -> dict:
+    """``to_1hz`` over a ride's streams (Strava layout or plain arrays); absent keys are skipped."""
+    def get(key):
+        s = streams.get(key)
+        return s.get("data") if isinstance(s, dict) else s
+
+    t = get("time")
+    if t is None:
+        t = []
+    return to_1hz(t, {k: get(k) for k in keys if get(k) is not None}, **policy)
+
+
+def moving(grid: dict, key: str) -> np.ndarray:
+    """A channel's values over moving seconds only (dropouts remain NaN)."""
+    return grid[key][grid["moving"]]
@@ -1,26 +1,36 @@
-import json
+from __future__ import annotations
+
+import sys
 import numpy as np
-import pandas as pd
 from datetime import datetime
-import streamlit as st
+from typing import TYPE_CHECKING
+from utils import ride_store, resample, thresholds, wbal, zones
+from utils.telemetry import timed
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 # ===============================================================
 # 📄 LOAD & CONVERT
 # ===============================================================
 
 def load_ride_json(file_path: str):
-    """Load a single ride JSON from Strava (summary + streams)."""
+    """Load a single ride (summary + streams) by store id, filename or JSON path."""
     try:
-        with open(file_path, "r") as f:
-            data = json.load(f)
-        return data
+        return ride_store.load_ride(file_path)
     except Exception as e:
-        st.error(f"⚠️ Failed to load ride file {file_path}: {e}")
+        if "streamlit" in sys.modules:  # only report in the UI when running under the dashboard
+            sys.modules["streamlit"].error(f"⚠️ Failed to load ride file {file_path}: {e}")
+        else:
+            print(f"⚠️ Failed to load ride file {file_path}: {e}")
         return None
 
 
+@timed("parse", format="strava_json")
 def strava_json_to_df(data: dict) -> pd.DataFrame:
     """Convert Strava stream data into a clean time-indexed DataFrame."""
+    import pandas as pd  # only here, so light paths (report keys, the API) can import this module
+
     # Ensure stream data exists
     if "time" not in data or "data" not in data["time"]:
         raise ValueError("Missing time stream in Strava data")
@@ -31,7 +41,7 @@ def strava_json_to_df(data: dict) -> pd.DataFrame:
     # Optional data streams
     for key in ["distance", "velocity_smooth", "watts", "heartrate", "altitude"]:
         if key in data and isinstance(data[key], dict) and "data" in data[key]:
-            df[key] = np.array(data[key]["data"])
+            df[key] = np.array(data[key]["data"], dtype=float)  # null samples → NaN
 
     # Derived metrics
     if "distance" in df.columns:
@@ -46,8 +56,38 @@ def strava_json_to_df(data: dict) -> pd.DataFrame:
 # 🧮 METRICS ENGINE
 # ===============================================================
 
-def compute_ride_metrics(df: pd.DataFrame, ftp: float = 250, hr_max: int = 190) -> dict:
-    """Compute key cycling performance metrics."""
+# Bump when any metric formula changes so cached results are recomputed
+METRICS_VERSION = 4
+
+
+@timed("metrics", stage="compute")
+def compute_ride_metrics(df: pd.DataFrame, ftp: float = 250, hr_max: int = 190,
+                         cp: float = None, w_prime: float = None) -> dict:
+    """Compute key cycling performance metrics (plus W′ balance when CP and W′ are given)."""
+    grid = ride_grid(df)
+    metrics = base_ride_metrics(df, grid)
+    if "heartrate" in df.columns:
+        metrics["hr_zone_dist"] = _hr_zones(df, hr_max, grid)
+    if "watts" in df.columns:
+        metrics["power_zone_dist"] = zones.zone_distribution(df["time_s"], df["watts"], "power", ftp, grid)
+        if cp and w_prime:
+            metrics.update(wbal_metrics(grid, cp, w_prime))
+    return apply_ftp(metrics, ftp)
+
+
+def wbal_metrics(grid: dict, cp: float, w_prime: float, model: str = "differential") -> dict:
+    """Lowest W′bal and time spent deep in W′ (see utils/wbal.py), from the ride's 1 Hz grid."""
+    power = np.where(grid["moving"], np.nan_to_num(grid["watts"], nan=0.0), 0.0)
+    return wbal.summary(wbal.wbal(power, cp, w_prime, model), w_prime)
+
+
+def ride_grid(df: pd.DataFrame) -> dict:
+    """The ride's gap-aware 1 Hz grid (see utils/resample.py) for every windowed metric."""
+    return resample.to_1hz(df["time_s"], {k: df[k].to_numpy() for k in resample.CHANNELS if k in df.columns})
+
+
+def base_ride_metrics(df: pd.DataFrame, grid: dict = None) -> dict:
+    """Metrics that depend only on the ride's streams (not on FTP or HR max)."""
     metrics = {}
 
     # Distance
@@ -60,17 +100,18 @@ def compute_ride_metrics(df: pd.DataFrame, ftp: float = 250, hr_max: int = 190)
 
     # Power metrics
     if "watts" in df.columns:
+        if grid is None or "watts" not in grid:
+            grid = resample.to_1hz(df["time_s"], {"watts": df["watts"].to_numpy()})
         metrics["avg_power"] = float(np.nanmean(df["watts"]))
         metrics["max_power"] = float(np.nanmax(df["watts"]))
-        metrics["np_power"] = _normalized_power(df["watts"])
-        metrics["intensity_factor"] = metrics["np_power"] / ftp
-        metrics["tss"] = (metrics["duration_min"] / 60) * (metrics["intensity_factor"]**2) * 100
+        power = resample.moving(grid, "watts")
+        metrics["np_power"] = _normalized_power(power)
+        metrics["np_seconds"] = float(len(power))  # moving time NP covers; with NP, enough for TSS at any FTP
 
     # HR metrics
     if "heartrate" in df.columns:
         metrics["avg_hr"] = float(np.nanmean(df["heartrate"]))
         metrics["max_hr"] = float(np.nanmax(df["heartrate"]))
-        metrics["hr_zone_dist"] = _hr_zones(df["heartrate"], hr_max)
 
     # Speed
     if "speed_mph" in df.columns:
@@ -80,34 +121,50 @@ def compute_ride_metrics(df: pd.DataFrame, ftp: float = 250, hr_max: int = 190)
     return metrics
 
 
+def summary_ride_metrics(meta: dict) -> dict:
+    """Metrics for a ride without streams (e.g. a manual activity): what its summary states, no NP."""
+    metrics = {"distance_mi": float(meta.get("distance_m") or 0) / 1609.34,
+               "duration_min": float(meta.get("moving_time_s") or 0) / 60, "np_power": None}
+    if meta.get("average_watts") is not None:
+        metrics["avg_power"] = float(meta["average_watts"])
+    if meta.get("average_heartrate") is not None:
+        metrics["avg_hr"] = float(meta["average_heartrate"])
+    return metrics
+
+
+def apply_ftp(metrics: dict, ftp: float) -> dict:
+    """Add IF and TSS from NP and moving time (no stream access needed)."""
+    if metrics.get("np_power") is not None:
+        seconds = metrics.get("np_seconds", metrics["duration_min"] * 60)
+        metrics["intensity_factor"], metrics["tss"] = thresholds.training_stress(metrics["np_power"], seconds, ftp)
+    return metrics
+
+
 # ===============================================================
 # 🧩 HELPER FUNCTIONS
 # ===============================================================
 
-def _normalized_power(power_series: np.ndarray) -> float:
-    """Calculate Normalized Power per Coggan method."""
-    if len(power_series) < 30:
+def _normalized_power(power_1hz: np.ndarray) -> float:
+    """Calculate Normalized Power per Coggan method over 1 Hz moving-time power.
+
+    30 s rolling averages (full windows only, none spanning a dropout) → 4th-power mean → 4th root.
+    """
+    p = np.asarray(power_1hz, dtype=np.float64)
+    if len(p) < 30:
+        return np.nan
+    ok = ~np.isnan(p)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(ok, p, 0.0))])
+    hits = np.concatenate([[0], np.cumsum(ok)])
+    full = (hits[30:] - hits[:-30]) == 30
+    if not full.any():
         return np.nan
-    rolling_avg = pd.Series(power_series).rolling(window=30, min_periods=1).mean()
-    fourth_power = rolling_avg ** 4
-    np_power = (np.nanmean(fourth_power)) ** 0.25
+    rolling_avg = (sums[30:] - sums[:-30])[full] / 30
+    np_power = np.mean(rolling_avg ** 4) ** 0.25
     return float(np_power)
 
 
-def _hr_zones(hr_series: np.ndarray, hr_max: int) -> dict:
-    """Compute time spent in 5 heart rate zones."""
-    if len(hr_series) == 0:
+def _hr_zones(df: pd.DataFrame, hr_max: int, grid: dict = None) -> dict:
+    """Share of moving time (%) in the 5 heart rate zones, from the 1 Hz grid."""
+    if len(df) == 0:
         return {}
-    zones = {
-        "Z1 (<68%)": (0, 0.68 * hr_max),
-        "Z2 (69–83%)": (0.69 * hr_max, 0.83 * hr_max),
-        "Z3 (84–94%)": (0.84 * hr_max, 0.94 * hr_max),
-        "Z4 (95–105%)": (0.95 * hr_max, 1.05 * hr_max),
-        "Z5 (>106%)": (1.06 * hr_max, 300),
-    }
-    zone_dist = {}
-    total = len(hr_series)
-    for z, (low, high) in zones.items():
-        pct = np.sum((hr_series >= low) & (hr_series < high)) / total * 100
-        zone_dist[z] = round(pct, 1)
-    return zone_dist
+    return zones.zone_distribution(df["time_s"], df["heartrate"], "hr", hr_max, grid)
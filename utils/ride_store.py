@@ -0,0 +1,353 @@
+# ===============================================================
+# 🗄️ RIDE STORE — summary JSON + columnar stream arrays
+# ===============================================================
+#
+# Layout (one directory per ride):
+#
+#   ride_data/store/<ride_id>/meta.json     summary fields + normalized "_meta"
+#   ride_data/store/<ride_id>/<stream>.npy  one typed array per stream
+#
+# Streams are plain .npy files so they can be memory-mapped; reading the
+# summary never touches them. GPS (latlng) is the exception: it is stored
+# delta-encoded in 1e-6° integers (see _encode_latlng) at a quarter of the
+# float64 size and decoded on load. Rides still sitting in ride_data/raw as legacy
+# JSON are served through the same API until migrated.
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+
+RAW_DIR = "ride_data/raw"
+STORE_DIR = "ride_data/store"
+META_FILE = "meta.json"
+STORE_VERSION = 1
+
+# Streams that need full precision; everything else is stored as float32
+_FLOAT64_STREAMS = {"time", "distance", "latlng"}
+
+LATLNG_SCALE = 1e6  # 1e-6° ≈ 11 cm; Strava sends 6 decimals, so its tracks round-trip exactly
+
+
+# ===============================================================
+# 🔑 IDS & PATHS
+# ===============================================================
+
+def ride_id_from_name(name: str) -> str:
+    """Turn a filename, path or id (``activity_1.json``) into a ride id."""
+    base = os.path.basename(str(name))
+    for ext in (".json", ".fit", ".csv"):
+        if base.endswith(ext):
+            return base[: -len(ext)]
+    return base
+
+
+def ride_dir(ride_id: str) -> str:
+    return os.path.join(STORE_DIR, ride_id_from_name(ride_id))
+
+
+def _legacy_path(ride_id: str) -> str:
+    return os.path.join(RAW_DIR, f"{ride_id_from_name(ride_id)}.json")
+
+
+def ride_exists(ride_id: str) -> bool:
+    """True if the ride is in the store or still a legacy JSON file."""
+    return os.path.exists(os.path.join(ride_dir(ride_id), META_FILE)) or os.path.exists(_legacy_path(ride_id))
+
+
+def list_ride_ids() -> list:
+    """All known ride ids (store + not-yet-migrated legacy JSON), newest name first."""
+    ids = set()
+    if os.path.exists(STORE_DIR):
+        ids.update(
+            d for d in os.listdir(STORE_DIR)
+            if not d.startswith(".") and os.path.exists(os.path.join(STORE_DIR, d, META_FILE))
+        )
+    if os.path.exists(RAW_DIR):
+        ids.update(f[:-5] for f in os.listdir(RAW_DIR) if f.endswith(".json"))
+    return sorted(ids, reverse=True)
+
+
+# ===============================================================
+# 🧩 SPLIT & NORMALIZE
+# ===============================================================
+
+def _is_stream(value) -> bool:
+    return isinstance(value, dict) and isinstance(value.get("data"), (list, np.ndarray))
+
+
+def _to_array(key: str, values) -> np.ndarray:
+    """Convert a stream's values to a typed array (None → NaN)."""
+    if isinstance(values, np.ndarray):
+        arr = values
+    elif values and all(isinstance(v, bool) for v in values):
+        return np.asarray(values, dtype=bool)
+    else:
+        arr = np.array(values, dtype=np.float64)
+    if arr.dtype == bool:
+        return arr
+    return arr.astype(np.float64 if key in _FLOAT64_STREAMS else np.float32, copy=False)
+
+
+def split_ride(data: dict):
+    """Split a ride dict into (summary, streams, stream_attrs)."""
+    summary, streams, attrs = {}, {}, {}
+    for key, value in data.items():
+        if _is_stream(value):
+            streams[key] = _to_array(key, value["data"])
+            extra = {k: v for k, v in value.items() if k != "data"}
+            if extra:
+                attrs[key] = extra
+        else:
+            summary[key] = value
+    return summary, streams, attrs
+
+
+def normalize_meta(summary: dict, streams: dict, ride_id: str) -> dict:
+    """Build the ``_meta`` block from FIT-style ``_meta`` or Strava summary fields."""
+    m = dict(summary.get("_meta") or {})
+
+    def first(*keys):
+        for k in keys:
+            v = summary.get(k)
+            if v is not None and not isinstance(v, dict):
+                return v
+        return None
+
+    m.setdefault("id", first("id") or ride_id)
+    m.setdefault("name", first("name"))
+    m.setdefault("type", first("sport_type", "type") or "Ride")
+    m.setdefault("start_date", first("start_date_local", "start_date"))
+    if m.get("distance_m") is None:
+        dist = first("distance")
+        if dist is None and "distance" in streams and len(streams["distance"]):
+            dist = float(np.nanmax(streams["distance"]))
+        m["distance_m"] = float(dist or 0)
+    if m.get("moving_time_s") is None:
+        mt = first("moving_time", "elapsed_time")
+        if mt is None and "time" in streams and len(streams["time"]):
+            mt = float(streams["time"][-1])
+        m["moving_time_s"] = float(mt or 0)
+    m.setdefault("average_watts", first("average_watts"))
+    m.setdefault("average_heartrate", first("average_heartrate"))
+    return m
+
+
+def content_hash(streams: dict) -> str:
+    """Stable hash of a ride's stream content (keys, dtypes and bytes)."""
+    h = hashlib.sha1()
+    for key in sorted(streams):
+        arr = np.ascontiguousarray(streams[key])
+        h.update(key.encode())
+        h.update(str(arr.dtype).encode())
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+# ===============================================================
+# 🗜️ GPS CODEC
+# ===============================================================
+#
+# latlng.npy holds (n + 2)×2 integers: rows 0–1 are the high and low 16-bit
+# words of the first fix in 1e-6°, every following row the step from the
+# previous fix. The narrowest of int16 / int32 that fits every step is used
+# (int16 covers ±3.6 km per sample, i.e. any ride without a gap in the
+# recording). Samples without a fix are the dtype's minimum value.
+
+def _encode_latlng(arr: np.ndarray) -> np.ndarray:
+    arr = np.asarray(arr, dtype=np.float64).reshape(-1, 2)
+    valid = ~np.isnan(arr).any(axis=1)
+    fixes = np.zeros(arr.shape, dtype=np.int64)
+    fixes[valid] = np.round(arr[valid] * LATLNG_SCALE)
+    if valid.any():
+        last = np.maximum.accumulate(np.where(valid, np.arange(len(arr)), -1))
+        fixes = fixes[np.where(last >= 0, last, np.argmax(valid))]  # gaps hold the previous fix
+    origin = fixes[0] if len(fixes) else np.zeros(2, dtype=np.int64)
+    steps = np.diff(fixes, axis=0, prepend=origin[None, :])
+    dtype = np.int16 if not len(steps) or np.abs(steps).max() < 2 ** 15 - 1 else np.int32
+    steps[~valid] = np.iinfo(dtype).min
+    header = np.stack([origin >> 16, (origin & 0xFFFF) - ((origin & 0x8000) << 1)])
+    return np.concatenate([header, steps]).astype(dtype)
+
+
+def _decode_latlng(stored: np.ndarray) -> np.ndarray:
+    if stored.dtype.kind != "i":
+        return stored  # written before the codec: plain float64 degrees
+    origin = (stored[0].astype(np.int64) << 16) | (stored[1].astype(np.int64) & 0xFFFF)
+    steps = stored[2:]
+    missing = (steps == np.iinfo(stored.dtype).min).any(axis=1)
+    fixes = origin + np.cumsum(np.where(missing[:, None], 0, steps).astype(np.int64), axis=0)
+    out = fixes / LATLNG_SCALE
+    out[missing] = np.nan
+    return out
+
+
+# stream → (encode, decode) for streams not stored as plain arrays
+_CODECS = {"latlng": (_encode_latlng, _decode_latlng)}
+
+
+# ===============================================================
+# 💾 WRITE
+# ===============================================================
+
+def save_ride(data: dict, ride_id: str = None) -> str:
+    """Write a ride (summary + streams) atomically into the store and return its id."""
+    summary, streams, attrs = split_ride(data)
+    if ride_id is None:
+        meta_id = (summary.get("_meta") or {}).get("id") or summary.get("id")
+        if meta_id is None:
+            raise ValueError("Ride has no id")
+        ride_id = str(meta_id)
+    ride_id = ride_id_from_name(ride_id)
+
+    summary["_meta"] = normalize_meta(summary, streams, ride_id)
+    summary["_streams"] = {
+        k: {"dtype": str(v.dtype), "shape": list(v.shape), **({"codec": "delta-e6"} if k in _CODECS else {}),
+            **attrs.get(k, {})} for k, v in streams.items()
+    }
+    summary["_store"] = {"version": STORE_VERSION, "hash": content_hash(streams)}
+
+    os.makedirs(STORE_DIR, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f".{ride_id}.", dir=STORE_DIR)
+    try:
+        for key, arr in streams.items():
+            if key in _CODECS:
+                arr = _CODECS[key][0](arr)
+            np.save(os.path.join(tmp, f"{key}.npy"), arr, allow_pickle=False)
+        with open(os.path.join(tmp, META_FILE), "w") as f:
+            json.dump(summary, f, default=_json_default)
+
+        final = ride_dir(ride_id)
+        if os.path.exists(final):
+            trash = tempfile.mkdtemp(prefix=f".{ride_id}.old.", dir=STORE_DIR)
+            os.replace(final, os.path.join(trash, "ride"))
+            os.replace(tmp, final)
+            shutil.rmtree(trash, ignore_errors=True)
+        else:
+            os.replace(tmp, final)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return ride_id
+
+
+def delete_ride(ride_id: str):
+    """Remove a ride from the store (legacy JSON is left untouched)."""
+    shutil.rmtree(ride_dir(ride_id), ignore_errors=True)
+
+
+def _json_default(o):
+    if isinstance(o, np.generic):
+        return o.item()
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    raise TypeError(f"Not JSON serializable: {type(o).__name__}")
+
+
+# ===============================================================
+# 📖 READ
+# ===============================================================
+
+def _load_legacy(ride_id: str):
+    path = _legacy_path(ride_id)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Ride not found: {ride_id}")
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_meta(ride_id: str) -> dict:
+    """Load only the summary of a ride (never reads stream arrays)."""
+    path = os.path.join(ride_dir(ride_id), META_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    summary, streams, _ = split_ride(_load_legacy(ride_id))
+    summary["_meta"] = normalize_meta(summary, streams, ride_id_from_name(ride_id))
+    return summary
+
+
+def load_streams(ride_id: str, keys=None, mmap: bool = True) -> dict:
+    """Load stream arrays for a ride, optionally restricted to ``keys``."""
+    d = ride_dir(ride_id)
+    if not os.path.exists(os.path.join(d, META_FILE)):
+        _, streams, _ = split_ride(_load_legacy(ride_id))
+        return {k: v for k, v in streams.items() if keys is None or k in keys}
+
+    if keys is None:
+        keys = [f[:-4] for f in os.listdir(d) if f.endswith(".npy")]
+    out = {}
+    for key in keys:
+        path = os.path.join(d, f"{key}.npy")
+        if os.path.exists(path):
+            out[key] = np.load(path, mmap_mode="r" if mmap else None, allow_pickle=False)
+            if key in _CODECS:
+                out[key] = _CODECS[key][1](out[key])
+    return out
+
+
+def load_ride(ride_id: str, keys=None, mmap: bool = True) -> dict:
+    """Load a ride in the Strava layout: summary fields + ``{stream: {"data": array}}``."""
+    if not os.path.exists(os.path.join(ride_dir(ride_id), META_FILE)) and os.path.isfile(str(ride_id)):
+        # Arbitrary JSON path outside the store (e.g. an upload)
+        with open(ride_id) as f:
+            return json.load(f)
+    data = load_meta(ride_id)
+    for key, arr in load_streams(ride_id, keys, mmap=mmap).items():
+        data[key] = {"data": arr}
+    return data
+
+
+def ride_to_json(data: dict) -> dict:
+    """Make a loaded ride JSON-serializable (arrays → lists, NaN → None)."""
+    out = {}
+    for key, value in data.items():
+        if _is_stream(value) and isinstance(value["data"], np.ndarray):
+            arr = np.asarray(value["data"])
+            if arr.dtype.kind == "f":
+                arr = np.where(np.isnan(arr), None, arr.astype(object))
+            out[key] = {**value, "data": arr.tolist()}
+        else:
+            out[key] = value
+    return out
+
+
+# ===============================================================
+# 🔁 MIGRATION — ride_data/raw/*.json → ride_data/store
+# ===============================================================
+
+def migrate_json_dir(raw_dir: str = RAW_DIR, remove: bool = False, verbose: bool = True) -> int:
+    """One-shot migration of legacy ride JSON files into the store."""
+    if not os.path.exists(raw_dir):
+        return 0
+    migrated = 0
+    for fname in sorted(os.listdir(raw_dir)):
+        if not fname.endswith(".json"):
+            continue
+        path = os.path.join(raw_dir, fname)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            save_ride(data, ride_id_from_name(fname))
+            migrated += 1
+            if remove:
+                os.remove(path)
+        except Exception as e:
+            if verbose:
+                print(f"⚠️ Could not migrate {fname}: {e}")
+    if verbose:
+        print(f"✅ Migrated {migrated} rides into {STORE_DIR}")
+    return migrated
+
+
+if __name__ == "__main__":
+    # python -m utils.ride_store migrate [--remove]
+    if len(sys.argv) > 1 and sys.argv[1] == "migrate":
+        from utils import catalog
+        migrate_json_dir(remove="--remove" in sys.argv)
+        catalog.rebuild_catalog(verbose=True)
+    else:
+        print("usage: python -m utils.ride_store migrate [--remove]")
@@ -0,0 +1,42 @@
+# ===============================================================
+# ⚙️ ATHLETE SETTINGS — FTP / HR max
+# ===============================================================
+
+from datetime import date as date_cls
+
+DEFAULT_FTP = 222
+DEFAULT_HR_MAX = 200
+
+
+def _in_effect(kind: str, default):
+    """Value recorded for today (utils/thresholds.py), or ``default`` without history."""
+    from utils import thresholds
+
+    try:
+        return thresholds.value_at(kind, date_cls.today())
+    except Exception:
+        return default
+
+
+def get_ftp() -> float:
+    """FTP in effect today (the dated history the Settings tab writes; the default without history)."""
+    return float(_in_effect("ftp", DEFAULT_FTP))
+
+
+def get_hr_max() -> int:
+    """HR max in effect today (the dated history the Settings tab writes; the default without history)."""
+    return int(_in_effect("hr_max", DEFAULT_HR_MAX))
+
+
+def set_ftp(value: float, since=None):
+    """Settings tab: record a new FTP from ``since`` (default: today); stored rides are re-scored."""
+    from utils import thresholds
+
+    thresholds.record("ftp", float(value), since)
+
+
+def set_hr_max(value: int, since=None):
+    """Settings tab: record a new HR max from ``since`` (default: today)."""
+    from utils import thresholds
+
+    thresholds.record("hr_max", int(value), since)
@@ -0,0 +1,323 @@
+# ===============================================================
+# 🌐 STRAVA CLIENT — pooled, concurrent, rate-limit aware sync engine
+# ===============================================================
+#
+# Headless counterpart of utils/strava_sync.py (no Streamlit imports):
+#   • one requests.Session with a connection pool sized to the workers
+#   • a scheduler fed by X-RateLimit-Limit / X-RateLimit-Usage headers
+#     (15-minute and daily windows), backing off on HTTP 429
+#   • activity streams fetched concurrently; every ride written once
+#
+# base_url is configurable so the engine can run against a local stand-in
+# server (see benchmarks/strava_stub.py).
+
+import os
+import json
+import time
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from utils.telemetry import timed, count
+
+STRAVA_API_URL = "https://www.strava.com/api/v3"
+RIDE_TYPES = ("Ride", "VirtualRide", "GravelRide")
+STREAM_KEYS = "time,distance,velocity_smooth,watts,heartrate,altitude,latlng"
+SYNC_STATE = "ride_data/sync_state.json"
+
+
+class RateLimitExceeded(Exception):
+    """Daily quota used up; the sync has to stop until tomorrow (UTC)."""
+
+
+# ===============================================================
+# ⏱️ RATE LIMIT SCHEDULER
+# ===============================================================
+
+class RateLimiter:
+    """Request scheduler for Strava's 15-minute and daily windows.
+
+    Usage is taken from response headers when available and counted locally
+    in between, so concurrent workers never overshoot a window.
+    """
+
+    def __init__(self, short_limit: int = 100, daily_limit: int = 1000, headroom: int = 2,
+                 clock=time.time, sleep=time.sleep):
+        self.short_limit, self.daily_limit, self.headroom = short_limit, daily_limit, headroom
+        self.short_used = self.daily_used = 0
+        self.clock, self.sleep = clock, sleep
+        self._window = self._short_window(clock())
+        self._day = self._day_of(clock())
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _short_window(ts: float) -> int:
+        return int(ts // 900)  # Strava windows reset on the quarter hour
+
+    @staticmethod
+    def _day_of(ts: float) -> int:
+        return int(ts // 86400)  # daily window resets at midnight UTC
+
+    def _roll(self, now: float):
+        if self._short_window(now) != self._window:
+            self._window, self.short_used = self._short_window(now), 0
+        if self._day_of(now) != self._day:
+            self._day, self.daily_used = self._day_of(now), 0
+
+    def acquire(self):
+        """Block until a request may be sent (raises when the daily quota is gone)."""
+        with self._lock:
+            while True:
+                now = self.clock()
+                self._roll(now)
+                if self.daily_used >= self.daily_limit - self.headroom:
+                    raise RateLimitExceeded(f"Strava daily limit reached ({self.daily_used}/{self.daily_limit})")
+                if self.short_used < self.short_limit - self.headroom:
+                    self.short_used += 1
+                    self.daily_used += 1
+                    return
+                # window spent: wait it out (holding the lock parks every worker)
+                self.sleep((self._window + 1) * 900 - now + 1)
+                self._window, self.short_used = self._window + 1, 0
+
+    def update(self, headers):
+        """Sync counters with X-RateLimit-* (or the stricter X-ReadRateLimit-*) headers."""
+        for prefix in ("X-ReadRateLimit", "X-RateLimit"):
+            limit, usage = headers.get(f"{prefix}-Limit"), headers.get(f"{prefix}-Usage")
+            if limit and usage:
+                try:
+                    (sl, dl), (su, du) = [int(x) for x in limit.split(",")[:2]], [int(x) for x in usage.split(",")[:2]]
+                except ValueError:
+                    continue
+                with self._lock:
+                    self._roll(self.clock())
+                    self.short_limit, self.daily_limit = sl, dl
+                    self.short_used, self.daily_used = max(self.short_used, su), max(self.daily_used, du)
+                return
+
+    def backoff(self, retry_after=None):
+        """After a 429: wait for Retry-After or the next 15-minute window."""
+        now = self.clock()
+        wait = float(retry_after) if retry_after else (self._short_window(now) + 1) * 900 - now + 1
+        with self._lock:
+            self.sleep(max(wait, 0))
+            self.short_used = 0  # corrected by the next response's headers
+
+
+# ===============================================================
+# 🔌 CLIENT
+# ===============================================================
+
+class StravaClient:
+    """Pooled HTTP client for the activities and streams endpoints."""
+
+    def __init__(self, access_token: str, base_url: str = STRAVA_API_URL, max_workers: int = 8,
+                 limiter: RateLimiter = None, max_retries: int = 5, timeout: float = 30):
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {access_token}"
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.requests_made = 0
+
+    def get(self, path: str, params: dict = None):
+        """GET with rate limiting, 429 backoff and retries on transient errors."""
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                with timed("strava_request"):
+                    r = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+            except requests.ConnectionError:
+                count("strava_requests_total", status="connection_error")
+                if attempt == self.max_retries:
+                    raise
+                self.limiter.sleep(min(2 ** attempt, 30))
+                continue
+            self.requests_made += 1
+            count("strava_requests_total", status=str(r.status_code))
+            self.limiter.update(r.headers)
+            if r.status_code == 429:
+                self.limiter.backoff(r.headers.get("Retry-After"))
+                continue
+            if r.status_code >= 500 and attempt < self.max_retries:
+                self.limiter.sleep(min(2 ** attempt, 30))
+                continue
+            return r
+        return r
+
+    def activities_page(self, after: int, page: int, per_page: int = 200) -> list:
+        r = self.get("/athlete/activities", {"after": after, "page": page, "per_page": per_page})
+        if r.status_code != 200:
+            raise RuntimeError(f"Failed to fetch activities (page {page}): {r.text}")
+        return r.json()
+
+    def streams(self, activity_id) -> dict:
+        r = self.get(f"/activities/{activity_id}/streams", {"keys": STREAM_KEYS, "key_by_type": "true"})
+        if r.status_code != 200:
+            raise RuntimeError(f"Could not fetch streams for {activity_id}: {r.text}")
+        return r.json()
+
+    def close(self):
+        self.session.close()
+
+
+# ===============================================================
+# 🔁 SYNC
+# ===============================================================
+
+def sync_rides(client: StravaClient, after: int, exists=None, ingest=None, ride_types=RIDE_TYPES,
+               per_page: int = 200, on_error=None, on_page=None) -> dict:
+    """Page activities after ``after`` (unix ts) and ingest new rides with their streams.
+
+    Streams are fetched concurrently; ingestion happens on the calling thread,
+    so each ride is written exactly once by a single writer. ``on_page`` is
+    called with each page's activities once all of them have been handled.
+    """
+    from utils import ride_store, pmc
+    from utils.ingest import ingest_ride
+
+    exists = exists or ride_store.ride_exists
+    ingest = ingest or (lambda act, ride_id: ingest_ride(act, ride_id, refresh_pmc=False))
+    result = {"new": 0, "failed": 0, "pages": 0, "earliest": None, "errors": []}
+
+    with ThreadPoolExecutor(max_workers=client.max_workers) as pool:
+        page = 1
+        while True:
+            activities = client.activities_page(after, page, per_page)
+            result["pages"] += 1
+            if not activities:
+                break
+            todo = [a for a in activities
+                    if a.get("type") in ride_types and not exists(f"activity_{a['id']}")]
+            futures = [(a, pool.submit(client.streams, a["id"])) for a in todo]
+            for act, fut in futures:
+                try:
+                    act.update(fut.result())
+                    ingest(act, f"activity_{act['id']}")
+                    result["new"] += 1
+                    count("sync_rides_total", result="new")
+                    day = (act.get("start_date") or "")[:10]
+                    if day and (result["earliest"] is None or day < result["earliest"]):
+                        result["earliest"] = day
+                except RateLimitExceeded:
+                    raise
+                except Exception as e:
+                    result["failed"] += 1
+                    count("sync_rides_total", result="failed")
+                    result["errors"].append({"id": act["id"], "error": str(e)})
+                    if on_error:
+                        on_error(act, e)
+            if on_page:
+                on_page(activities, result)
+            if len(activities) < per_page:
+                break
+            page += 1
+
+    if result["earliest"]:
+        pmc.on_ride_changed(result["earliest"])
+    result["requests"] = client.requests_made
+    return result
+
+
+def year_start(year: int) -> int:
+    return int(datetime(year, 1, 1, tzinfo=timezone.utc).timestamp())
+
+
+def _start_ts(value: str) -> int:
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return int((dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp())
+
+
+# ===============================================================
+# 📍 CURSOR + CHECKPOINTS
+# ===============================================================
+#
+# Strava returns activities oldest-first when ``after`` is given, so the
+# high-water mark (latest start time/id handled) doubles as the checkpoint:
+# it is saved after every completed page, an interrupted sync resumes from
+# there, and a routine sync is one activities call plus one streams call
+# per new ride. Activities whose streams failed are kept and retried.
+
+def load_sync_state() -> dict:
+    if not os.path.exists(SYNC_STATE):
+        return {"cursor": None, "pending": [], "last_sync": None}
+    with open(SYNC_STATE) as f:
+        return json.load(f)
+
+
+def save_sync_state(state: dict):
+    os.makedirs(os.path.dirname(SYNC_STATE) or ".", exist_ok=True)
+    tmp = SYNC_STATE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, SYNC_STATE)
+
+
+def _library_cursor():
+    """Bootstrap the cursor from the newest Strava ride already in the catalog."""
+    from utils import catalog
+
+    rows = [r for r in catalog.query_rides(order="date DESC") if r["ride_id"].startswith("activity_")]
+    starts = [r["start_date"] for r in rows if r.get("start_date")]
+    if not starts:
+        return None
+    # stored start dates may be local time; back off a day to cover any UTC offset
+    return {"start_ts": _start_ts(max(starts)) - 86400, "id": None}
+
+
+def sync_incremental(client: StravaClient, default_after: int, full: bool = False, **kwargs) -> dict:
+    """Sync only activities newer than the saved cursor, checkpointing per page.
+
+    ``default_after`` is used when no cursor exists yet (and none can be
+    derived from the library); ``full=True`` ignores the cursor.
+    """
+    state = load_sync_state()
+    cursor = None if full else (state.get("cursor") or _library_cursor())
+    # one second of overlap so rides sharing the cursor's start second are not missed;
+    # they are already stored and cost no extra request
+    after = max(cursor["start_ts"] - 1, 0) if cursor else default_after
+
+    retried = _retry_pending(client, state, kwargs.get("ingest"))
+
+    def checkpoint(activities, result):
+        failed = {e["id"] for e in result["errors"]}
+        for act in activities:
+            if act["id"] in failed and not any(p["id"] == act["id"] for p in state["pending"]):
+                state["pending"].append({k: v for k, v in act.items() if not isinstance(v, dict)})
+        last = max(activities, key=lambda a: (a.get("start_date") or "", a["id"]))
+        ts = _start_ts(last["start_date"]) if last.get("start_date") else None
+        if ts and (state.get("cursor") is None or ts >= state["cursor"]["start_ts"]):
+            state["cursor"] = {"start_ts": ts, "id": last["id"]}
+        save_sync_state(state)
+
+    result = sync_rides(client, after, on_page=checkpoint, **kwargs)
+    result["new"] += retried
+    result["after"] = after
+    state["last_sync"] = time.time()
+    save_sync_state(state)
+    return result
+
+
+def _retry_pending(client: StravaClient, state: dict, ingest=None) -> int:
+    """Re-fetch streams for activities that failed on an earlier run."""
+    from utils.ingest import ingest_ride
+
+    ingest = ingest or (lambda act, ride_id: ingest_ride(act, ride_id))
+    done, keep = 0, []
+    for act in state.get("pending", []):
+        try:
+            act = dict(act, **client.streams(act["id"]))
+            ingest(act, f"activity_{act['id']}")
+            done += 1
+        except RateLimitExceeded:
+            raise
+        except Exception:
+            keep.append(act)
+    state["pending"] = keep
+    return done
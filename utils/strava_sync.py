@@ -1,7 +1,5 @@
 import streamlit as st
 import requests
-import os
-import json
 from datetime import datetime, timezone
 
 STRAVA_API_URL = "https://www.strava.com/api/v3"
@@ -65,21 +63,22 @@ def refresh_token_if_needed(tokens):
 # ============================================================
 
 from datetime import datetime, timezone
-import os, json, requests, streamlit as st
+import requests, streamlit as st
+from utils.strava_client import StravaClient, RateLimitExceeded, sync_incremental, year_start
 
 def fetch_activity_stream(activity_id: int, access_token: str):
     """Fetch full time-series streams (distance, power, HR, etc.) for a given activity."""
-    url = f"{STRAVA_API_URL}/activities/{activity_id}/streams"
-    params = {"keys": "time,distance,velocity_smooth,watts,heartrate,altitude", "key_by_type": "true"}
-    headers = {"Authorization": f"Bearer {access_token}"}
-    r = requests.get(url, headers=headers, params=params)
-    if r.status_code != 200:
-        st.warning(f"⚠️ Could not fetch streams for {activity_id}: {r.text}")
+    client = StravaClient(access_token, max_workers=1)
+    try:
+        return client.streams(activity_id)
+    except RuntimeError as e:
+        st.warning(f"⚠️ {e}")
         return None
-    return r.json()
+    finally:
+        client.close()
 
-def fetch_strava_rides(after_year: int = 2025):
-    """Fetch rides from Jan 1 after_year onward, with full stream data saved."""
+def fetch_strava_rides(after_year: int = 2025, full: bool = False):
+    """Fetch rides newer than the last sync (Jan 1 after_year on a first or full sync)."""
     try:
         tokens = load_tokens()
     except Exception as e:
@@ -88,46 +87,20 @@ def fetch_strava_rides(after_year: int = 2025):
         return "Missing Strava credentials."
 
     tokens = refresh_token_if_needed(tokens)
-    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
-    after_timestamp = int(datetime(after_year, 1, 1, tzinfo=timezone.utc).timestamp())
-
-    page = 1
-    total_new = 0
-    os.makedirs(RAW_DIR, exist_ok=True)
-
-    while True:
-        params = {"after": after_timestamp, "per_page": 100, "page": page}
-        r = requests.get(f"{STRAVA_API_URL}/athlete/activities", headers=headers, params=params)
-        if r.status_code != 200:
-            st.error(f"⚠️ Failed to fetch activities (page {page}): {r.text}")
-            break
-
-        activities = r.json()
-        if not activities:
-            break
-
-        for act in activities:
-            if act.get("type") not in ["Ride", "VirtualRide", "GravelRide"]:
-                continue
-            activity_id = act["id"]
-            file_path = os.path.join(RAW_DIR, f"activity_{activity_id}.json")
-
-            if not os.path.exists(file_path):
-                # save summary first
-                with open(file_path, "w") as f:
-                    json.dump(act, f, indent=2)
-                total_new += 1
-
-                # fetch detailed streams and merge
-                stream_data = fetch_activity_stream(activity_id, tokens["access_token"])
-                if stream_data:
-                    act.update(stream_data)
-                    with open(file_path, "w") as f:
-                        json.dump(act, f, indent=2)
-
-        page += 1
-
-    return f"✅ Synced {total_new} new rides with full stream data from {after_year} onward."
+    client = StravaClient(tokens["access_token"], base_url=STRAVA_API_URL)
+    try:
+        result = sync_incremental(client, year_start(after_year), full=full,
+                                  on_error=lambda act, e: st.warning(f"⚠️ Could not sync {act['id']}: {e}"))
+    except RateLimitExceeded as e:
+        return f"⚠️ {e}. Progress is saved; the next sync resumes from there."
+    except RuntimeError as e:
+        st.error(f"⚠️ {e}")
+        return f"⚠️ Sync failed: {e}"
+    finally:
+        client.close()
+
+    since = datetime.fromtimestamp(result["after"], tz=timezone.utc).strftime("%Y-%m-%d")
+    return f"✅ Synced {result['new']} new rides with full stream data since {since}."
 
 # ============================================================
 # 🧠 AUTO SYNC
@@ -136,7 +109,7 @@ def fetch_strava_rides(after_year: int = 2025):
 def auto_sync_if_ready():
     """Run automatic sync if tokens and permissions are valid."""
     try:
-        msg = fetch_strava_rides(after_year=2025)
+        msg = fetch_strava_rides()
         if "Missing Strava" in msg or "Authorization" in msg:
             st.session_state["STRAVA_AUTH_REQUIRED"] = True
         return msg
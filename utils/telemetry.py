@@ -0,0 +1,454 @@
+# ===============================================================
+# 📡 TELEMETRY — timers, counters and a Prometheus text endpoint
+# ===============================================================
+#
+# Hot paths are wrapped with ``timed("ingest")`` (decorator or context
+# manager), which feeds one histogram family:
+#
+#   dashboard_op_seconds{op="ingest"}        latency histogram
+#   dashboard_op_errors_total{op="ingest"}   calls that raised
+#
+# plus ad-hoc counters via ``count()``. HTTP apps get per-route latency
+# histograms from ``install(app)``.
+#
+# Each process keeps its own registry. When snapshots are enabled (the API
+# apps do it in ``install()``, anything else with RIDE_TELEMETRY=1) it is
+# written to ride_data/telemetry/<pid>-<token>.json at most once a second
+# and at the end of every pool task (``task_flush``; pool workers exit
+# without running atexit), so ``render()`` can merge the API functions,
+# report workers and import workers into one exposition (the same idea as
+# prometheus_client's multiprocess mode). CLIs and benchmarks stay
+# process-local and leave nothing on disk. Snapshots of exited processes are folded into
+# ride_data/telemetry/_totals.json on the next scrape, so the directory
+# holds one file per live process plus the totals.
+#
+# Profiling: with RIDE_PROFILING=1, a request carrying ``?profile=1`` (or an
+# ``X-Profile: 1`` header) gets the endpoint's profile back instead of its
+# response — pyinstrument HTML when installed, else cProfile text
+# (``?profile=cprofile`` forces cProfile).
+
+import io
+import os
+import json
+import time
+import uuid
+import atexit
+import bisect
+import threading
+import contextvars
+from functools import wraps
+
+TELEMETRY_DIR = "ride_data/telemetry"
+SNAPSHOTS_ENV = "RIDE_TELEMETRY"
+TOTALS_FILE = "_totals.json"
+FLUSH_INTERVAL = 1.0
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    "dashboard_op_seconds": ("histogram", "Duration of instrumented operations."),
+    "dashboard_op_errors_total": ("counter", "Instrumented operations that raised."),
+    "http_request_duration_seconds": ("histogram", "HTTP request latency by route."),
+    "metrics_cache_lookups_total": ("counter", "Ride metric lookups served from / missing the cache."),
+    "report_requests_total": ("counter", "Report requests: cached file, joined render, new render."),
+    "import_files_total": ("counter", "Bulk-import files by outcome."),
+    "strava_requests_total": ("counter", "Strava API responses by status."),
+    "sync_rides_total": ("counter", "Strava activities synced or failed."),
+    "rebuild_errors_total": ("counter", "Rides skipped while rebuilding an index."),
+}
+
+
+class Registry:
+    """Counters and fixed-bucket histograms keyed by (name, sorted labels)."""
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}  # key → [bucket counts..., +Inf count, sum]
+        self.token = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.dirty, self.flushed_at = False, 0.0
+
+    def count(self, name: str, value: float = 1, labels: dict = None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            self.dirty = True
+        self.maybe_flush()
+
+    def observe(self, name: str, seconds: float, labels: dict = None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self.lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+            h[bisect.bisect_left(BUCKETS, seconds)] += 1
+            h[-1] += seconds
+            self.dirty = True
+        self.maybe_flush()
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"counters": [[n, list(map(list, l)), v] for (n, l), v in self.counters.items()],
+                    "histograms": [[n, list(map(list, l)), list(h)] for (n, l), h in self.histograms.items()]}
+
+    def path(self) -> str:
+        return os.path.join(TELEMETRY_DIR, f"{self.token}.json")
+
+    def maybe_flush(self, force: bool = False):
+        if not snapshots_enabled() or not self.dirty or (not force and time.monotonic() - self.flushed_at < FLUSH_INTERVAL):
+            return
+        self.flushed_at, self.dirty = time.monotonic(), False
+        try:
+            os.makedirs(TELEMETRY_DIR, exist_ok=True)
+            tmp = self.path() + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.snapshot(), f)
+            os.replace(tmp, self.path())
+        except OSError:
+            self.dirty = True  # read-only filesystem: metrics stay process-local
+
+
+def snapshots_enabled() -> bool:
+    return os.environ.get(SNAPSHOTS_ENV, "").lower() in ("1", "true", "yes")
+
+
+def enable_snapshots():
+    """Write this process's snapshots (and those of pool workers started after this call)."""
+    os.environ[SNAPSHOTS_ENV] = "1"
+
+
+REGISTRY = Registry()
+atexit.register(lambda: REGISTRY.maybe_flush(force=True))
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=REGISTRY._reset)  # don't double-count the parent's values
+
+
+def count(name: str, value: float = 1, **labels):
+    """Increment counter ``name`` (conventionally ending in ``_total``)."""
+    REGISTRY.count(name, value, labels)
+
+
+def task_flush(fn):
+    """Flush the snapshot when a process-pool task returns; apply outside ``timed``."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            REGISTRY.maybe_flush(force=True)
+    return wrapper
+
+
+class timed:
+    """Time a block or function into ``dashboard_op_seconds{op=...}``.
+
+        with timed("catalog_query", query="page_rides"): ...
+
+        @timed("parse", format="fit")
+        def parse_fit_to_json(file): ...
+    """
+
+    def __init__(self, op: str, **labels):
+        self.labels = {"op": op, **labels}
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        REGISTRY.observe("dashboard_op_seconds", time.perf_counter() - self._t0, self.labels)
+        if exc_type is not None:
+            REGISTRY.count("dashboard_op_errors_total", 1, self.labels)
+        return False
+
+    def __call__(self, fn):
+        labels = self.labels
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except BaseException:
+                REGISTRY.count("dashboard_op_errors_total", 1, labels)
+                raise
+            finally:
+                REGISTRY.observe("dashboard_op_seconds", time.perf_counter() - t0, labels)
+        return wrapper
+
+
+# ===============================================================
+# 📄 PROMETHEUS TEXT
+# ===============================================================
+
+def _add(counters: dict, histograms: dict, snap: dict):
+    """Sum one snapshot into ``counters`` / ``histograms``."""
+    for name, labels, value in snap["counters"]:
+        key = (name, tuple(map(tuple, labels)))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, h in snap["histograms"]:
+        key = (name, tuple(map(tuple, labels)))
+        cur = histograms.get(key)
+        histograms[key] = list(h) if cur is None else [a + b for a, b in zip(cur, h)]
+
+
+def _load(path: str):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists, owned by someone else
+    return True
+
+
+def compact() -> int:
+    """Fold the snapshots of exited processes into the totals file; returns how many were folded.
+
+    POSIX only (pid liveness and the file lock); elsewhere snapshots simply accumulate.
+    """
+    if os.name != "posix" or not os.path.isdir(TELEMETRY_DIR):
+        return 0
+    import fcntl
+
+    def dead(fname):
+        pid = fname.split("-", 1)[0]
+        return pid.isdigit() and not _pid_alive(int(pid))
+
+    stale = [f for f in os.listdir(TELEMETRY_DIR) if f.endswith((".json", ".tmp")) and dead(f)]
+    if not stale:
+        return 0
+    with open(os.path.join(TELEMETRY_DIR, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)  # one compactor at a time, so nothing is folded twice
+        totals_path = os.path.join(TELEMETRY_DIR, TOTALS_FILE)
+        counters, histograms = {}, {}
+        _add(counters, histograms, _load(totals_path) or {"counters": [], "histograms": []})
+        folded = []
+        for fname in stale:
+            snap = _load(os.path.join(TELEMETRY_DIR, fname)) if fname.endswith(".json") else None
+            if snap is not None:
+                _add(counters, histograms, snap)
+            folded.append(fname)
+        tmp = totals_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"counters": [[n, list(map(list, l)), v] for (n, l), v in counters.items()],
+                       "histograms": [[n, list(map(list, l)), h] for (n, l), h in histograms.items()]}, f)
+        os.replace(tmp, totals_path)
+        for fname in folded:
+            try:
+                os.remove(os.path.join(TELEMETRY_DIR, fname))
+            except FileNotFoundError:
+                continue
+    return len(folded)
+
+
+def _merged() -> tuple:
+    """Counters and histograms summed over this process and every snapshot on disk."""
+    counters, histograms = {}, {}
+    try:
+        compact()
+    except OSError:
+        pass  # read-only filesystem: merge what is there
+    _add(counters, histograms, REGISTRY.snapshot())
+    own = os.path.basename(REGISTRY.path())
+    if os.path.isdir(TELEMETRY_DIR):
+        for fname in os.listdir(TELEMETRY_DIR):
+            if fname.endswith(".json") and fname != own:
+                snap = _load(os.path.join(TELEMETRY_DIR, fname))
+                if snap is not None:
+                    _add(counters, histograms, snap)
+    return counters, histograms
+
+
+def _labels(pairs, extra: tuple = ()) -> str:
+    pairs = list(pairs) + list(extra)
+    if not pairs:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+
+def _header(out: list, name: str, kind: str):
+    help_text = HELP.get(name, (kind, name.replace("_", " ")))[1]
+    out.append(f"# HELP {name} {help_text}")
+    out.append(f"# TYPE {name} {kind}")
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    counters, histograms = _merged()
+    out = []
+    for name in sorted({n for n, _ in counters}):
+        _header(out, name, "counter")
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                out.append(f"{name}{_labels(labels)} {value:g}")
+    for name in sorted({n for n, _ in histograms}):
+        _header(out, name, "histogram")
+        for (n, labels), h in sorted(histograms.items()):
+            if n != name:
+                continue
+            cumulative = 0
+            for bound, c in zip(BUCKETS + ("+Inf",), h[:-1]):
+                cumulative += c
+                out.append(f"{name}_bucket{_labels(labels, (('le', bound),))} {cumulative}")
+            out.append(f"{name}_sum{_labels(labels)} {h[-1]:.6f}")
+            out.append(f"{name}_count{_labels(labels)} {cumulative}")
+    return "\n".join(out) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ===============================================================
+# 🌐 FASTAPI
+# ===============================================================
+
+_profile_request = contextvars.ContextVar("profile_request", default=None)
+
+
+def profiling_enabled() -> bool:
+    return os.environ.get("RIDE_PROFILING", "").lower() in ("1", "true", "yes")
+
+
+def _profiler(holder: dict):
+    """Start pyinstrument (HTML) or cProfile (text); the returned stop() leaves the report in ``holder``."""
+    if holder["mode"] != "cprofile":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            Profiler = None
+        if Profiler is not None:
+            profiler = Profiler(async_mode="enabled")
+            profiler.start()
+
+            def stop():
+                profiler.stop()
+                holder["body"], holder["type"] = profiler.output_html(), "text/html; charset=utf-8"
+            return stop
+
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+    def stop():
+        profiler.disable()
+        buf = io.StringIO()
+        pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(60)
+        holder["body"], holder["type"] = buf.getvalue(), "text/plain; charset=utf-8"
+    return stop
+
+
+def _wrap_endpoint(endpoint):
+    """Endpoint that profiles itself when the current request asked for it.
+
+    Sync endpoints run in a worker thread, so the profiler has to start there
+    rather than in the middleware; the request context carries the flag.
+    """
+    import inspect
+
+    if inspect.iscoroutinefunction(endpoint):
+        @wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            holder = _profile_request.get()
+            if holder is None:
+                return await endpoint(*args, **kwargs)
+            stop = _profiler(holder)
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                stop()
+    else:
+        @wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            holder = _profile_request.get()
+            if holder is None:
+                return endpoint(*args, **kwargs)
+            stop = _profiler(holder)
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                stop()
+    return wrapper
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-route latency histogram, plus the per-request profile hook."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        holder = self._profile_holder(scope)
+        token = _profile_request.set(holder) if holder else None
+        status, t0 = [500], time.perf_counter()
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            if holder is None:
+                await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REGISTRY.observe("http_request_duration_seconds", time.perf_counter() - t0,
+                             {"route": route, "method": scope["method"], "status": str(status[0])})
+            if token is not None:
+                _profile_request.reset(token)
+        if holder is not None:
+            body = (holder.get("body") or "No endpoint was profiled for this request.\n").encode()
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", holder.get("type", "text/plain").encode()),
+                                    (b"content-length", str(len(body)).encode())]})
+            await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _profile_holder(scope):
+        if not profiling_enabled():
+            return None
+        from urllib.parse import parse_qs
+
+        query = parse_qs(scope.get("query_string", b"").decode()).get("profile", [""])[-1]
+        header = dict(scope.get("headers") or []).get(b"x-profile", b"").decode()
+        mode = query or header
+        if mode.lower() in ("", "0", "false"):
+            return None
+        return {"mode": "cprofile" if mode.lower() == "cprofile" else "auto"}
+
+
+def install(app):
+    """Instrument a FastAPI app; call right after ``FastAPI()``, before routes are declared."""
+    from fastapi.routing import APIRoute
+
+    class InstrumentedRoute(APIRoute):
+        def __init__(self, path, endpoint, **kwargs):
+            super().__init__(path, _wrap_endpoint(endpoint), **kwargs)
+
+    app.router.route_class = InstrumentedRoute
+    app.add_middleware(MetricsMiddleware)
+    enable_snapshots()
+    return app
+
+
+def metrics_response():
+    """The ``/api/metrics`` response body."""
+    from fastapi.responses import Response
+
+    REGISTRY.maybe_flush(force=True)
+    return Response(render(), media_type=CONTENT_TYPE)
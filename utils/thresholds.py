@@ -0,0 +1,191 @@
+# ===============================================================
+# 📅 THRESHOLDS — dated FTP / HR max history and ride scoring
+# ===============================================================
+#
+# FTP and HR max change over a season. Each change is recorded with the
+# day it takes effect, and a ride is scored with the values in effect on
+# its date (before the first entry the earliest one applies; with no
+# history at all, the Settings defaults apply to every ride, so scoring
+# never depends on a Streamlit session).
+#
+# Rides keep only FTP-independent statistics: NP (the 4th root of the mean
+# 30 s-rolling power⁴) and the moving seconds it was taken over. From those
+#
+#   IF  = NP / FTP
+#   TSS = hours × IF² × 100
+#
+# is one array expression for any number of rides, so a new FTP, or a
+# corrected historical one, re-scores the library without reading a stream.
+# This module is the only place the formula lives.
+#
+#   python -m utils.thresholds                       (show history)
+#   python -m utils.thresholds set ftp 265 [--since 2026-03-01]
+#   python -m utils.thresholds remove ftp 2026-03-01
+
+import os
+import sys
+import json
+import sqlite3
+from datetime import date as date_cls
+import numpy as np
+
+THRESHOLDS_PATH = "ride_data/thresholds.sqlite"
+KINDS = ("ftp", "hr_max")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS thresholds (
+    kind TEXT,
+    since TEXT,
+    value REAL,
+    PRIMARY KEY (kind, since)
+);
+"""
+
+
+def connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(THRESHOLDS_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(THRESHOLDS_PATH, timeout=30)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _check(kind: str):
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {KINDS}")
+
+
+# ===============================================================
+# 📅 HISTORY
+# ===============================================================
+
+def history(kind: str) -> list:
+    """[(since ISO date, value)], oldest first."""
+    _check(kind)
+    if not os.path.exists(THRESHOLDS_PATH):
+        return []
+    conn = connect()
+    rows = conn.execute("SELECT since, value FROM thresholds WHERE kind = ? ORDER BY since", (kind,)).fetchall()
+    conn.close()
+    return rows
+
+
+def histories() -> dict:
+    """{kind: [(since, value)]} for every kind, from one read."""
+    out = {kind: [] for kind in KINDS}
+    if not os.path.exists(THRESHOLDS_PATH):
+        return out
+    conn = connect()
+    for kind, since, value in conn.execute("SELECT kind, since, value FROM thresholds ORDER BY since"):
+        if kind in out:
+            out[kind].append((since, value))
+    conn.close()
+    return out
+
+
+def latest(kind: str):
+    """Most recent recorded value, or None without history."""
+    rows = history(kind)
+    return rows[-1][1] if rows else None
+
+
+def record(kind: str, value: float, since=None):
+    """Record ``value`` as in effect from ``since`` (default: today) and re-score stored rides."""
+    _check(kind)
+    since = str(since or date_cls.today())[:10]
+    date_cls.fromisoformat(since)
+    conn = connect()
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO thresholds VALUES (?, ?, ?)", (kind, since, float(value)))
+    conn.close()
+    _on_change(kind)
+
+
+def remove(kind: str, since):
+    _check(kind)
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM thresholds WHERE kind = ? AND since = ?", (kind, str(since)[:10]))
+    conn.close()
+    _on_change(kind)
+
+
+def _on_change(kind: str):
+    # catalog TSS is re-scored in one pass; the PMC notices the new signature on its next read
+    if kind == "ftp":
+        from utils import catalog
+
+        catalog.rescore()
+
+
+def signature() -> str:
+    """Identifies the FTP in effect for every date (stored with derived series such as the PMC)."""
+    from utils.settings import DEFAULT_FTP
+
+    return json.dumps(history("ftp") or [["", float(DEFAULT_FTP)]])
+
+
+# ===============================================================
+# 🔎 LOOKUP
+# ===============================================================
+
+def values_at(kind: str, dates, rows: list = None) -> np.ndarray:
+    """Value in effect on each date (ISO strings or dates; missing dates get the latest value).
+
+    ``rows`` is the kind's ``history`` when the caller already has it.
+    """
+    from utils.settings import DEFAULT_FTP, DEFAULT_HR_MAX
+
+    rows = history(kind) if rows is None else rows
+    n = len(dates)
+    if not rows:
+        return np.full(n, float(DEFAULT_FTP if kind == "ftp" else DEFAULT_HR_MAX))
+    since = np.array([s for s, _ in rows])
+    values = np.array([v for _, v in rows], dtype=np.float64)
+    days = np.array([str(d)[:10] if d is not None and d == d else "9999-12-31" for d in dates], dtype=since.dtype)
+    idx = np.searchsorted(since, days, side="right") - 1
+    return values[np.clip(idx, 0, len(values) - 1)]
+
+
+def value_at(kind: str, day=None) -> float:
+    """Value in effect on ``day`` (default: the latest one)."""
+    return float(values_at(kind, [day])[0])
+
+
+def values_on(day=None) -> dict:
+    """{kind: value in effect on ``day``} for every kind, from one read of the history."""
+    rows = histories()
+    return {kind: float(values_at(kind, [day], rows[kind])[0]) for kind in KINDS}
+
+
+# ===============================================================
+# 🧮 SCORING
+# ===============================================================
+
+def training_stress(np_power, seconds, ftp) -> tuple:
+    """(IF, TSS) for scalars or arrays of NP, moving seconds and FTP."""
+    np_power = np.asarray(np_power, dtype=np.float64)
+    ftp = np.asarray(ftp, dtype=np.float64)
+    intensity = np.divide(np_power, ftp, out=np.full(np.broadcast(np_power, ftp).shape, np.nan), where=ftp > 0)
+    tss = np.asarray(seconds, dtype=np.float64) / 3600 * intensity ** 2 * 100
+    if intensity.ndim == 0:
+        return float(intensity), float(tss)
+    return intensity, tss
+
+
+def _cli(argv):
+    if argv[:1] == ["set"] and len(argv) >= 3:
+        since = argv[argv.index("--since") + 1] if "--since" in argv else None
+        record(argv[1], float(argv[2]), since)
+    elif argv[:1] == ["remove"] and len(argv) == 3:
+        remove(argv[1], argv[2])
+    elif argv:
+        print("usage: python -m utils.thresholds [set <ftp|hr_max> <value> [--since YYYY-MM-DD] | "
+              "remove <ftp|hr_max> <YYYY-MM-DD>]")
+        return 1
+    for kind in KINDS:
+        print(f"📅 {kind}: " + (", ".join(f"{v:g} since {s}" for s, v in history(kind)) or "no history"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_cli(sys.argv[1:]))
@@ -0,0 +1,181 @@
+# ===============================================================
+# 🔋 W′ BALANCE & CRITICAL POWER
+# ===============================================================
+#
+# W′bal is the work capacity above CP left in the tank. Both common models
+# reduce to a first-order linear recurrence over the 1 Hz power series
+# (utils/resample.py; paused seconds count as 0 W, i.e. recovery):
+#
+#   D[t] = a[t] · D[t-1] + b[t]          D = W′ - W′bal (the deficit)
+#
+#   "differential" (Skiba / Clarke 2015)
+#       P ≥ CP:  a = 1,                      b = P - CP   (spend)
+#       P < CP:  a = exp(-(CP - P) / W′),    b = 0        (recover toward W′)
+#   "integral" (Skiba 2012): every second's expenditure decays with τ
+#       a = exp(-1 / τ),  b = max(P - CP, 0),  τ = 546 · exp(-0.01 · D_CP) + 316
+#       (D_CP: CP minus the mean power while below CP)
+#
+# Summing the integral over every earlier second is O(n²). The recurrence
+# is solved in closed form per block of BLOCK seconds with cumulative
+# sums in log space, D[t] = A[t] · (D0 + Σ b[k] / A[k]) with A the running
+# product of a, and each block's last value seeds the next. a ≤ 1 and
+# b ≥ 0 keep every term non-negative (no cancellation), and clipping
+# log a at -1 keeps 1 / A inside float range.
+#
+# CP and W′ come from the 2-parameter model, work = CP · t + W′, fitted by
+# least squares to mean-maximal power at log-spaced durations of 2–20 min.
+# Best efforts are read off the stored per-ride power curves
+# (utils/power_curve.py) once, for every ride the windows cover, so fitting
+# any number of date windows never loads a stream.
+
+from datetime import date as date_cls, timedelta
+import numpy as np
+from utils import ride_store, catalog, power_curve
+
+BLOCK = 512
+MODELS = ("differential", "integral")
+FIT_RANGE = (120, 1200)
+FIT_POINTS = 12
+WINDOW_DAYS = 90
+DEFAULT_W_PRIME = 20000.0
+
+
+# ===============================================================
+# 🔋 W′ BALANCE
+# ===============================================================
+
+def _recurrence(log_a: np.ndarray, b: np.ndarray, d0: float = 0.0) -> np.ndarray:
+    """Solve D[t] = exp(log_a[t]) · D[t-1] + b[t] for every t (D[-1] = d0)."""
+    log_a = np.maximum(log_a, -1.0)
+    out = np.empty(len(b))
+    for lo in range(0, len(b), BLOCK):
+        hi = min(lo + BLOCK, len(b))
+        log_prod = np.cumsum(log_a[lo:hi])
+        out[lo:hi] = np.exp(log_prod) * (d0 + np.cumsum(b[lo:hi] * np.exp(-log_prod)))
+        d0 = out[hi - 1]
+    return out
+
+
+def wbal(power_1hz, cp: float, w_prime: float, model: str = "differential") -> np.ndarray:
+    """W′bal (J) after each second of a 1 Hz power series (NaN seconds count as 0 W)."""
+    if model not in MODELS:
+        raise ValueError(f"model must be one of {MODELS}")
+    p = np.nan_to_num(np.asarray(power_1hz, dtype=np.float64), nan=0.0)
+    if not len(p):
+        return np.zeros(0)
+    above = np.maximum(p - cp, 0.0)
+    if model == "differential":
+        log_a = np.where(p < cp, -(cp - p) / w_prime, 0.0)
+    else:
+        below = p < cp
+        d_cp = cp - p[below].mean() if below.any() else 0.0
+        log_a = np.full(len(p), -1.0 / (546.0 * np.exp(-0.01 * d_cp) + 316.0))
+    return w_prime - _recurrence(log_a, above)
+
+
+def ride_wbal(streams: dict, cp: float, w_prime: float, model: str = "differential") -> tuple:
+    """(elapsed seconds, W′bal) for a ride's streams (plain arrays with "time" and "watts")."""
+    power = power_curve.power_1hz(streams.get("time"), streams["watts"])
+    return np.arange(len(power)), wbal(power, cp, w_prime, model)
+
+
+def summary(balance: np.ndarray, w_prime: float) -> dict:
+    """Headline numbers for a W′bal series."""
+    if not len(balance):
+        return {}
+    low = float(balance.min())
+    return {"wbal_min": low, "wbal_min_pct": low / w_prime * 100,
+            "wbal_min_at_s": int(balance.argmin()), "wbal_below_25pct_s": int((balance < 0.25 * w_prime).sum())}
+
+
+# ===============================================================
+# 📐 CRITICAL POWER FIT
+# ===============================================================
+
+def fit_durations(fit_range=FIT_RANGE, points: int = FIT_POINTS) -> np.ndarray:
+    return np.unique(np.geomspace(fit_range[0], fit_range[1], points).round().astype(np.int64))
+
+
+def fit_cp(durations, power) -> dict:
+    """CP / W′ from best power at ``durations`` (s); None when too few efforts are usable."""
+    t = np.asarray(durations, dtype=np.float64)
+    p = np.asarray(power, dtype=np.float64)
+    ok = p > 0
+    if ok.sum() < 3:
+        return None
+    t, p = t[ok], p[ok]
+    work = p * t
+    cp, w_prime = np.polyfit(t, work, 1)
+    resid = work - (cp * t + w_prime)
+    r2 = 1 - (resid ** 2).sum() / ((work - work.mean()) ** 2).sum()
+    if cp <= 0 or w_prime <= 0:
+        return None
+    return {"cp": float(cp), "w_prime": float(w_prime), "r2": float(r2),
+            "durations": t.astype(int).tolist(), "power": p.round(1).tolist()}
+
+
+def _efforts(ride_ids, durations: np.ndarray) -> np.ndarray:
+    """Best power per ride (rows) at ``durations`` (columns), from stored curves; 0 where missing."""
+    out = np.zeros((len(ride_ids), len(durations)), dtype=np.float32)
+    for i, ride_id in enumerate(ride_ids):
+        curve = power_curve.load_curve(ride_id)
+        if curve is not None and len(curve):
+            have = durations <= len(curve)
+            out[i, have] = curve[durations[have] - 1]
+    return out
+
+
+def fit_windows(windows, types=None, fit_range=FIT_RANGE) -> list:
+    """CP / W′ fits for many (start, end) date windows (None = open); curves are read once."""
+    windows = [(str(s)[:10] if s else None, str(e)[:10] if e else None) for s, e in windows]
+    starts = [s for s, _ in windows]
+    ends = [e for _, e in windows]
+    rows = catalog.query_rides(start=None if None in starts else min(starts),
+                               end=None if None in ends else max(ends), types=types)
+    rows = [r for r in rows if r["date"]]
+    durations = fit_durations(fit_range)
+    efforts = _efforts([r["ride_id"] for r in rows], durations)
+    dates = np.array([r["date"] for r in rows], dtype="U10")
+    out = []
+    for start, end in windows:
+        mask = np.ones(len(rows), dtype=bool)
+        if start:
+            mask &= dates >= start
+        if end:
+            mask &= dates <= end
+        best = efforts[mask].max(axis=0) if mask.any() else np.zeros(len(durations))
+        fit = fit_cp(durations, best)
+        if fit is not None:
+            fit.update(start=start, end=end, rides=int(mask.sum()))
+        out.append(fit)
+    return out
+
+
+def fit_window(start=None, end=None, types=None) -> dict:
+    """CP / W′ from every stored ride dated in [start, end]."""
+    return fit_windows([(start, end)], types)[0]
+
+
+def model_for_ride(ride_id: str, days: int = WINDOW_DAYS) -> dict:
+    """CP / W′ for a ride: fitted over the ``days`` up to its date, else FTP and a default W′."""
+    from utils import thresholds
+
+    rows = catalog.query_rides(ride_ids=[ride_id])
+    day = rows[0]["date"] if rows and rows[0]["date"] else date_cls.today().isoformat()
+    start = (date_cls.fromisoformat(day) - timedelta(days=days)).isoformat()
+    fit = fit_window(start, day)
+    if fit is None:
+        fit = {"cp": thresholds.value_at("ftp", day), "w_prime": DEFAULT_W_PRIME, "fitted": False}
+    return fit
+
+
+def stored_ride_wbal(ride_id: str, cp: float = None, w_prime: float = None, model: str = "differential") -> dict:
+    """W′bal for a stored ride, with CP / W′ from ``model_for_ride`` unless given."""
+    fit = {} if cp and w_prime else model_for_ride(ride_id)
+    cp, w_prime = cp or fit["cp"], w_prime or fit["w_prime"]
+    streams = ride_store.load_streams(ride_id, ["time", "watts"])
+    if "watts" not in streams:
+        return {"cp": cp, "w_prime": w_prime, "model": model, "time": np.zeros(0), "wbal": np.zeros(0)}
+    t, balance = ride_wbal(streams, cp, w_prime, model)
+    return {"cp": cp, "w_prime": w_prime, "model": model, "time": t, "wbal": balance,
+            **summary(balance, w_prime)}
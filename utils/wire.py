@@ -0,0 +1,144 @@
+# ===============================================================
+# 📡 WIRE — binary + compressed encoding for ride/stream responses
+# ===============================================================
+#
+# Layout of an application/x-ride-streams body (all little-endian):
+#
+#   b"RSW1" | uint32 header length | header JSON | arrays, 8-byte aligned
+#
+# The header holds the response document with every NumPy array replaced
+# by {"$a": i} and a buffer table (dtype, shape, nbytes and offset into the
+# data section), so the client decodes each array as a zero-copy typed-array
+# view and rebuilds exactly the document the JSON fallback would produce.
+#
+# Bodies are compressed with brotli (when installed) or gzip, following the
+# request's Accept-Encoding.
+
+import gzip
+import json
+import struct
+import numpy as np
+
+try:  # optional dependency
+    import brotli
+except ImportError:
+    brotli = None
+
+MEDIA_TYPE = "application/x-ride-streams"
+MAGIC = b"RSW1"
+ALIGN = 8
+MIN_COMPRESS = 1024
+
+
+# ===============================================================
+# 📦 ENCODING
+# ===============================================================
+
+def _pad(n: int) -> int:
+    return -n % ALIGN
+
+
+def _extract(value, arrays: list):
+    """Copy of ``value`` with arrays swapped for placeholders (and NaN floats for None)."""
+    if isinstance(value, np.ndarray):
+        arrays.append(np.ascontiguousarray(value).astype(value.dtype.newbyteorder("<"), copy=False))
+        return {"$a": len(arrays) - 1}
+    if isinstance(value, dict):
+        return {k: _extract(v, arrays) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_extract(v, arrays) for v in value]
+    if isinstance(value, (float, np.floating)):
+        return None if value != value else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def encode(doc: dict) -> bytes:
+    """Pack a response document (NumPy arrays anywhere inside) into one binary body."""
+    arrays = []
+    skeleton = _extract(doc, arrays)
+    table, offset = [], 0
+    for a in arrays:
+        table.append({"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset, "nbytes": a.nbytes})
+        offset += a.nbytes + _pad(a.nbytes)
+
+    header = json.dumps({"doc": skeleton, "buffers": table}, separators=(",", ":")).encode()
+    header += b" " * _pad(8 + len(header))  # data section starts aligned
+    parts = [MAGIC, struct.pack("<I", len(header)), header]
+    for a in arrays:
+        parts += [a.tobytes(), b"\0" * _pad(a.nbytes)]
+    return b"".join(parts)
+
+
+def decode(body: bytes) -> dict:
+    """Inverse of ``encode`` (arrays come back as read-only NumPy views)."""
+    if body[:4] != MAGIC:
+        raise ValueError("Not a ride-streams body")
+    (hlen,) = struct.unpack_from("<I", body, 4)
+    header = json.loads(body[8:8 + hlen])
+    base = 8 + hlen
+    arrays = [np.frombuffer(body, dtype=t["dtype"], count=int(np.prod(t["shape"], dtype=np.int64)),
+                            offset=base + t["offset"]).reshape(t["shape"]) for t in header["buffers"]]
+
+    def revive(v):
+        if isinstance(v, dict):
+            return arrays[v["$a"]] if set(v) == {"$a"} else {k: revive(x) for k, x in v.items()}
+        if isinstance(v, list):
+            return [revive(x) for x in v]
+        return v
+
+    return revive(header["doc"])
+
+
+def to_json(doc: dict) -> bytes:
+    """JSON fallback for the same document (arrays → lists, NaN → null)."""
+    def plain(v):
+        if isinstance(v, np.ndarray):
+            if v.dtype.kind == "f":
+                return np.where(np.isnan(v), None, v.astype(object)).tolist()
+            return v.tolist()
+        if isinstance(v, dict):
+            return {k: plain(x) for k, x in v.items()}
+        if isinstance(v, (list, tuple)):
+            return [plain(x) for x in v]
+        if isinstance(v, (float, np.floating)):
+            return None if v != v else float(v)
+        if isinstance(v, np.integer):
+            return int(v)
+        return v
+
+    return json.dumps(plain(doc), separators=(",", ":")).encode()
+
+
+# ===============================================================
+# 🤝 NEGOTIATION
+# ===============================================================
+
+def wants_binary(accept: str) -> bool:
+    return MEDIA_TYPE in (accept or "")
+
+
+def compress(body: bytes, accept_encoding: str) -> tuple:
+    """(body, Content-Encoding or None) for the best encoding the client accepts."""
+    accepted = {e.split(";")[0].strip() for e in (accept_encoding or "").split(",")}
+    if len(body) < MIN_COMPRESS:
+        return body, None
+    if brotli is not None and "br" in accepted:
+        return brotli.compress(body, quality=5), "br"
+    if "gzip" in accepted:
+        return gzip.compress(body, compresslevel=5), "gzip"
+    return body, None
+
+
+def render(doc: dict, accept: str = "", accept_encoding: str = "") -> tuple:
+    """(body, headers) for a document, honoring Accept and Accept-Encoding."""
+    if wants_binary(accept):
+        body, media_type = encode(doc), MEDIA_TYPE
+    else:
+        body, media_type = to_json(doc), "application/json"
+    body, encoding = compress(body, accept_encoding)
+    headers = {"Content-Type": media_type, "Vary": "Accept, Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return body, headers
@@ -0,0 +1,292 @@
+# ===============================================================
+# 🎯 ZONES — time-weighted power / HR zones with weekly & monthly rollups
+# ===============================================================
+#
+# Time in zone counts seconds of the ride's 1 Hz grid (utils/resample.py),
+# so smart recording and high-rate logging no longer skew the split: short
+# holes hold the last value, and pauses longer than PAUSE_GAP_S and sensor
+# dropouts are left out.
+#
+# Zones are contiguous: ``np.digitize`` against the upper bounds of every
+# zone but the last, so each sample lands in exactly one zone.
+#
+#   power  Coggan 7 zones, fractions of FTP
+#   hr     5 zones, fractions of HR max
+#
+# What is stored does not depend on FTP or HR max: per ride, seconds per
+# 1 W / 1 bpm bin (ride_data/zones.sqlite), and the same vectors summed
+# per ISO week and per month. Zone times for any threshold are read off
+# those vectors, so the Analytics views never load a stream and changing
+# FTP invalidates nothing. (Values are binned by their integer part, which
+# is exact for power meters and HR straps; smoothed streams are within 1 W.)
+
+import os
+import sqlite3
+from datetime import date as date_cls, timedelta
+import numpy as np
+from utils import ride_store, catalog, resample
+from utils.telemetry import count
+
+ZONES_PATH = "ride_data/zones.sqlite"
+ZONES_VERSION = 2
+
+# kind → (stream key, bin count at 1 unit per bin, [(label, upper bound as fraction of threshold)])
+ZONES = {
+    "power": ("watts", 2500, [
+        ("Z1 Active Recovery", 0.55), ("Z2 Endurance", 0.75), ("Z3 Tempo", 0.90), ("Z4 Threshold", 1.05),
+        ("Z5 VO2max", 1.20), ("Z6 Anaerobic", 1.50), ("Z7 Neuromuscular", None),
+    ]),
+    "hr": ("heartrate", 250, [
+        ("Z1 (<69%)", 0.69), ("Z2 (69–84%)", 0.84), ("Z3 (84–95%)", 0.95), ("Z4 (95–106%)", 1.06),
+        ("Z5 (>106%)", None),
+    ]),
+}
+PERIODS = ("week", "month")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ride_zone_time (
+    ride_id TEXT,
+    kind TEXT,
+    date TEXT,
+    content_hash TEXT,
+    version INTEGER,
+    first INTEGER,
+    seconds BLOB,
+    PRIMARY KEY (ride_id, kind)
+);
+CREATE INDEX IF NOT EXISTS ride_zone_time_date ON ride_zone_time (kind, date);
+CREATE TABLE IF NOT EXISTS zone_rollup (
+    period TEXT,
+    start TEXT,
+    kind TEXT,
+    rides INTEGER,
+    first INTEGER,
+    seconds BLOB,
+    PRIMARY KEY (period, start, kind)
+);
+"""
+
+
+def connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(ZONES_PATH) or ".", exist_ok=True)
+    conn = sqlite3.connect(ZONES_PATH, timeout=30)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# ===============================================================
+# 🧮 ENGINE
+# ===============================================================
+
+def labels(kind: str) -> list:
+    return [label for label, _ in ZONES[kind][2]]
+
+
+def zone_edges(kind: str, threshold: float) -> np.ndarray:
+    """Upper bounds (W or bpm) of every zone but the last, for ``np.digitize``."""
+    return np.array([f * threshold for _, f in ZONES[kind][2] if f is not None])
+
+
+def zone_seconds(values_1hz, edges: np.ndarray) -> np.ndarray:
+    """Seconds in each zone defined by ``edges``, from moving 1 Hz values (NaN seconds are skipped)."""
+    v = np.asarray(values_1hz, dtype=np.float64)
+    v = v[~np.isnan(v)]
+    return np.bincount(np.digitize(v, edges), minlength=len(edges) + 1).astype(np.float64)
+
+
+def zone_distribution(time_s, values, kind: str, threshold: float, grid: dict = None) -> dict:
+    """{zone label: % of moving time} for one ride, rounded to 0.1.
+
+    ``grid`` is the ride's ``resample.to_1hz`` grid when the caller already has one.
+    """
+    key = ZONES[kind][0]
+    if grid is None or key not in grid:
+        grid = resample.to_1hz(time_s, {key: values})
+    secs = zone_seconds(resample.moving(grid, key), zone_edges(kind, threshold))
+    total = secs.sum()
+    return {z: round(float(s / total * 100), 1) if total else 0.0 for z, s in zip(labels(kind), secs)}
+
+
+def time_histogram(values_1hz, kind: str) -> np.ndarray:
+    """Seconds per 1-unit bin (1 W / 1 bpm) from moving 1 Hz values; values past the last bin fall into it."""
+    nbins = ZONES[kind][1]
+    v = np.asarray(values_1hz, dtype=np.float64)
+    v = v[~np.isnan(v)]
+    return np.bincount(np.clip(v, 0, nbins - 1).astype(np.int64), minlength=nbins).astype(np.float64)
+
+
+def ride_time_hists(streams: dict, grid: dict = None) -> dict:
+    """Per-kind time histograms for a ride's streams (Strava layout or plain arrays).
+
+    ``grid`` is the ride's ``resample.ride_1hz`` grid when the caller already has one.
+    """
+    keys = [key for key, _, _ in ZONES.values()]
+    if grid is None:
+        grid = resample.ride_1hz(streams, keys)
+    return {kind: time_histogram(resample.moving(grid, key), kind)
+            for kind, (key, _, _) in ZONES.items() if key in grid and len(grid[key])}
+
+
+def seconds_by_zone(hist: np.ndarray, kind: str, threshold: float) -> np.ndarray:
+    """Zone seconds from a time histogram under any threshold."""
+    return np.bincount(np.digitize(np.arange(len(hist)), zone_edges(kind, threshold)),
+                       weights=hist, minlength=len(ZONES[kind][2]))
+
+
+# ===============================================================
+# 💾 STORAGE
+# ===============================================================
+
+def _pack(seconds: np.ndarray) -> tuple:
+    nz = np.flatnonzero(seconds)
+    if not len(nz):
+        return 0, b""
+    return int(nz[0]), seconds[nz[0]:nz[-1] + 1].astype(np.float32).tobytes()
+
+
+def _unpack_into(total: np.ndarray, first: int, blob: bytes):
+    part = np.frombuffer(blob, dtype=np.float32)
+    total[first:first + len(part)] += part
+
+
+def period_start(day, period: str) -> date_cls:
+    day = date_cls.fromisoformat(str(day)[:10])
+    return day - timedelta(days=day.weekday()) if period == "week" else day.replace(day=1)
+
+
+def _period_end(start: date_cls, period: str) -> date_cls:
+    if period == "week":
+        return start + timedelta(days=6)
+    nxt = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return nxt - timedelta(days=1)
+
+
+def _refresh_rollups(conn, days):
+    """Re-sum the week and month rollups containing any of ``days``."""
+    for period in PERIODS:
+        for start in sorted({period_start(d, period) for d in days if d}):
+            end = _period_end(start, period)
+            for kind, (_, nbins, _) in ZONES.items():
+                total, rides = np.zeros(nbins), 0
+                for first, blob in conn.execute(
+                        "SELECT first, seconds FROM ride_zone_time "
+                        "WHERE kind = ? AND version = ? AND date BETWEEN ? AND ?",
+                        (kind, ZONES_VERSION, start.isoformat(), end.isoformat())):
+                    _unpack_into(total, first, blob)
+                    rides += 1
+                if rides:
+                    conn.execute("INSERT OR REPLACE INTO zone_rollup VALUES (?, ?, ?, ?, ?, ?)",
+                                 (period, start.isoformat(), kind, rides, *_pack(total)))
+                else:
+                    conn.execute("DELETE FROM zone_rollup WHERE period = ? AND start = ? AND kind = ?",
+                                 (period, start.isoformat(), kind))
+
+
+def store(ride_id: str, hists: dict, day=None, content_hash: str = None):
+    ride_id = ride_store.ride_id_from_name(ride_id)
+    if day is None:
+        rows = catalog.query_rides(ride_ids=[ride_id])
+        day = rows[0]["date"] if rows else None
+    content_hash = content_hash or (ride_store.load_meta(ride_id).get("_store") or {}).get("hash")
+    conn = connect()
+    with conn:
+        old = [d for (d,) in conn.execute("SELECT DISTINCT date FROM ride_zone_time WHERE ride_id = ?", (ride_id,))]
+        conn.execute("DELETE FROM ride_zone_time WHERE ride_id = ?", (ride_id,))
+        conn.executemany(
+            "INSERT INTO ride_zone_time VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(ride_id, kind, day, content_hash, ZONES_VERSION, *_pack(h)) for kind, h in hists.items()],
+        )
+        _refresh_rollups(conn, old + [day])
+    conn.close()
+
+
+def delete(ride_id: str):
+    ride_id = ride_store.ride_id_from_name(ride_id)
+    conn = connect()
+    with conn:
+        old = [d for (d,) in conn.execute("SELECT DISTINCT date FROM ride_zone_time WHERE ride_id = ?", (ride_id,))]
+        conn.execute("DELETE FROM ride_zone_time WHERE ride_id = ?", (ride_id,))
+        _refresh_rollups(conn, old)
+    conn.close()
+
+
+def on_ride_ingested(ride_id: str, hists: dict = None, day=None):
+    """Ingest hook: compute (unless given) and store a ride's time histograms."""
+    if hists is None:
+        hists = ride_time_hists(ride_store.load_streams(ride_id, ["time"] + [k for k, _, _ in ZONES.values()]))
+    store(ride_id, hists, day)
+
+
+def rebuild(missing_only: bool = True) -> int:
+    """Backfill rides stored before zones existed (or all of them), then re-sum every rollup."""
+    conn = connect()
+    have = {r for (r,) in conn.execute("SELECT DISTINCT ride_id FROM ride_zone_time WHERE version = ?",
+                                       (ZONES_VERSION,))}
+    conn.close()
+    dates = {r["ride_id"]: r["date"] for r in catalog.query_rides()}
+    done = 0
+    for ride_id in ride_store.list_ride_ids():
+        if missing_only and ride_id in have:
+            continue
+        try:
+            on_ride_ingested(ride_id, day=dates.get(ride_id))
+            done += 1
+        except Exception:
+            count("rebuild_errors_total", index="zones")
+            continue
+    conn = connect()
+    with conn:
+        conn.execute("DELETE FROM zone_rollup")
+        _refresh_rollups(conn, [d for (d,) in conn.execute("SELECT DISTINCT date FROM ride_zone_time")])
+    conn.close()
+    return done
+
+
+# ===============================================================
+# 🔎 QUERIES
+# ===============================================================
+
+def split(hist: np.ndarray, kind: str, threshold: float, percent: bool = False) -> dict:
+    """{zone label: seconds} (or % of recorded time) from a time histogram."""
+    secs = seconds_by_zone(hist, kind, threshold)
+    if percent:
+        total = secs.sum()
+        return {z: round(float(s / total * 100), 1) if total else 0.0 for z, s in zip(labels(kind), secs)}
+    return dict(zip(labels(kind), secs.round(1).tolist()))
+
+
+def ride_zones(ride_id: str, kind: str, threshold: float, percent: bool = False) -> dict:
+    """{zone label: seconds} (or % of recorded time) for one stored ride."""
+    conn = connect()
+    row = conn.execute("SELECT first, seconds FROM ride_zone_time WHERE ride_id = ? AND kind = ? AND version = ?",
+                       (ride_store.ride_id_from_name(ride_id), kind, ZONES_VERSION)).fetchone()
+    conn.close()
+    if row is None:
+        return {}
+    hist = np.zeros(ZONES[kind][1])
+    _unpack_into(hist, *row)
+    return split(hist, kind, threshold, percent)
+
+
+def rollups(kind: str, threshold: float, period: str = "week", start=None, end=None) -> list:
+    """Zone seconds per week or month: [{"start", "rides", "seconds": [per zone]}], oldest first."""
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {PERIODS}")
+    sql = "SELECT start, rides, first, seconds FROM zone_rollup WHERE period = ? AND kind = ?"
+    params = [period, kind]
+    if start is not None:
+        sql += " AND start >= ?"
+        params.append(period_start(start, period).isoformat())
+    if end is not None:
+        sql += " AND start <= ?"
+        params.append(str(end)[:10])
+    conn = connect()
+    rows = conn.execute(sql + " ORDER BY start", params).fetchall()
+    conn.close()
+    out = []
+    for p_start, rides, first, blob in rows:
+        hist = np.zeros(ZONES[kind][1])
+        _unpack_into(hist, first, blob)
+        out.append({"start": p_start, "rides": rides,
+                    "seconds": seconds_by_zone(hist, kind, threshold).round(1).tolist()})
+    return out